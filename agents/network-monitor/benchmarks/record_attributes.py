@@ -0,0 +1,81 @@
+"""
+Micro-benchmark: per-check HTTP record calls with fresh attribute dicts
+vs interned AttributeSets
+
+Usage: python benchmarks/record_attributes.py [--targets N] [--rounds N] [--repeat N]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.attributes import AttributeCache  # noqa: E402
+
+PHASES = ("dns", "connect", "tls", "ttfb", "transfer")
+
+
+def run(targets: int, rounds: int, interned: bool) -> float:
+    """Returns nanoseconds per record call, after an untimed round creating every series"""
+    provider = MeterProvider(metric_readers=[InMemoryMetricReader()])
+    meter = provider.get_meter("benchmark")
+    duration = meter.create_histogram("http.client.duration", unit="ms")
+    status = meter.create_counter("http.client.requests")
+    phases = [meter.create_histogram(f"http.client.{phase}.duration", unit="ms") for phase in PHASES]
+    response_cache = AttributeCache("target", "http.method", "http.status_code")
+    phase_cache = AttributeCache("target", "http.method", "http.redirect.hop")
+    names = [f"target-{index}.example.com" for index in range(targets)]
+    
+    def check_round():
+        for target in names:
+            if interned:
+                response_attributes = response_cache.get(target, "GET", 200)
+                phase_attributes = phase_cache.get(target, "GET", 0)
+            else:
+                response_attributes = {"target": target, "http.method": "GET", "http.status_code": 200}
+                phase_attributes = {"target": target, "http.method": "GET", "http.redirect.hop": 0}
+            for histogram in phases:
+                histogram.record(1.5, phase_attributes)
+            duration.record(12.5, response_attributes)
+            status.add(1, response_attributes)
+    
+    # Series creation is a one-off cost, not the steady state being compared
+    check_round()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        check_round()
+    elapsed = time.perf_counter() - start
+    provider.shutdown()
+    return elapsed * 1e9 / (targets * rounds * (len(PHASES) + 2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--targets", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=11)
+    args = parser.parse_args()
+    
+    # Interleaved runs, so drift (CPU frequency, other load) hits both variants alike
+    results = {False: [], True: []}
+    for _ in range(args.repeat):
+        for interned in results:
+            results[interned].append(run(args.targets, args.rounds, interned))
+    
+    for label, interned in (("fresh dicts", False), ("interned", True)):
+        samples = sorted(results[interned])
+        print(
+            f"{label:>12}: median {statistics.median(samples):,.0f} ns/call "
+            f"(min {samples[0]:,.0f}, max {samples[-1]:,.0f})"
+        )
+    speedup = statistics.median(results[False]) / statistics.median(results[True]) - 1
+    print(f"{'speedup':>12}: {speedup:+.1%}")
+
+
+if __name__ == "__main__":
+    main()
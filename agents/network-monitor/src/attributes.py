@@ -0,0 +1,69 @@
+"""
+Interned metric attribute sets
+
+Kept identical in both agents (network-monitor and viaipe-collector).
+"""
+from typing import Any, Dict, Hashable, Tuple
+
+
+class AttributeSet(dict):
+    """Immutable attribute dict with a precomputed, pre-hashed items() set"""
+    
+    __slots__ = ('_items',)
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The SDK keys aggregations by frozenset(attributes.items()); for a
+        # frozenset argument that call returns the same, already hashed object
+        self._items = frozenset(super().items())
+        hash(self._items)
+    
+    def items(self):
+        return self._items
+    
+    def __reduce__(self):
+        # dict's default pickling would replay __setitem__
+        return AttributeSet, (dict(self),)
+    
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("AttributeSet is immutable")
+    
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+
+class AttributeCache:
+    """Interns one AttributeSet per combination of attribute values"""
+    
+    def __init__(self, *names: str, max_size: int = 65536):
+        """
+        Initializes the cache
+        
+        Args:
+            names: Attribute keys, in the order values are passed to get()
+            max_size: Interned sets kept before the oldest are evicted
+        """
+        self.names = names
+        self.max_size = max_size
+        self._sets: Dict[Tuple[Hashable, ...], AttributeSet] = {}
+    
+    def get(self, *values: Any) -> AttributeSet:
+        """
+        Returns the interned attribute set for the given values
+        
+        Args:
+            values: One value per attribute name
+        
+        Returns:
+            Shared AttributeSet (must not be modified)
+        """
+        attributes = self._sets.get(values)
+        if attributes is None:
+            if len(self._sets) >= self.max_size:
+                del self._sets[next(iter(self._sets))]
+            attributes = AttributeSet(zip(self.names, values))
+            self._sets[values] = attributes
+        return attributes
+    
+    def __len__(self) -> int:
+        return len(self._sets)
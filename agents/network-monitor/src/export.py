@@ -0,0 +1,475 @@
+"""
+OTLP export pipeline module
+
+Kept identical in both agents (network-monitor and viaipe-collector).
+"""
+import collections
+import dataclasses
+import logging
+import threading
+import time
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from grpc import Compression as GRPCCompression
+from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
+from opentelemetry.sdk.metrics import (
+    Counter,
+    Histogram,
+    ObservableCounter,
+    ObservableGauge,
+    ObservableUpDownCounter,
+    UpDownCounter,
+    _Gauge as Gauge,
+)
+from opentelemetry.sdk.metrics.export import (
+    AggregationTemporality,
+    Metric,
+    MetricExporter,
+    MetricExportResult,
+    MetricsData,
+    ResourceMetrics,
+    ScopeMetrics,
+)
+
+logger = logging.getLogger(__name__)
+
+GRPC = "grpc"
+HTTP_PROTOBUF = "http/protobuf"
+
+DROP_OLDEST = "oldest"
+DROP_NEWEST = "newest"
+DROP_PRIORITY = "priority"
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST, DROP_PRIORITY)
+
+CUMULATIVE = AggregationTemporality.CUMULATIVE
+DELTA = AggregationTemporality.DELTA
+
+# OTEL_EXPORTER_OTLP_METRICS_TEMPORALITY_PREFERENCE values (OTel spec)
+TEMPORALITY_PREFERENCES: Dict[str, Dict[type, AggregationTemporality]] = {
+    "cumulative": {
+        Counter: CUMULATIVE,
+        UpDownCounter: CUMULATIVE,
+        Histogram: CUMULATIVE,
+        Gauge: CUMULATIVE,
+        ObservableCounter: CUMULATIVE,
+        ObservableUpDownCounter: CUMULATIVE,
+        ObservableGauge: CUMULATIVE,
+    },
+    "delta": {
+        Counter: DELTA,
+        UpDownCounter: CUMULATIVE,
+        Histogram: DELTA,
+        Gauge: CUMULATIVE,
+        ObservableCounter: DELTA,
+        ObservableUpDownCounter: CUMULATIVE,
+        ObservableGauge: CUMULATIVE,
+    },
+    "lowmemory": {
+        Counter: DELTA,
+        UpDownCounter: CUMULATIVE,
+        Histogram: DELTA,
+        Gauge: CUMULATIVE,
+        ObservableCounter: CUMULATIVE,
+        ObservableUpDownCounter: CUMULATIVE,
+        ObservableGauge: CUMULATIVE,
+    },
+}
+
+
+def create_otlp_exporter(
+    endpoint: str,
+    protocol: str = GRPC,
+    timeout: float = 10.0,
+    compression: str = "none",
+    temporality: str = "cumulative",
+    max_export_batch_size: int = 0
+) -> MetricExporter:
+    """
+    Creates the OTLP metric exporter
+    
+    Args:
+        endpoint: Collector endpoint (host:4317 for gRPC, host:4318 for HTTP;
+            /v1/metrics is appended to HTTP endpoints without a path)
+        protocol: "grpc" or "http/protobuf"
+        timeout: Export request timeout in seconds
+        compression: "gzip" or "none"
+        temporality: "cumulative", "delta" or "lowmemory"
+        max_export_batch_size: Maximum data points per request (0 = no limit)
+    
+    Returns:
+        Configured exporter
+    """
+    if temporality not in TEMPORALITY_PREFERENCES:
+        raise ValueError(f"Invalid temporality {temporality!r}, expected one of {sorted(TEMPORALITY_PREFERENCES)}")
+    if compression not in ("gzip", "none"):
+        raise ValueError(f"Invalid compression {compression!r}, expected 'gzip' or 'none'")
+    preferred_temporality = TEMPORALITY_PREFERENCES[temporality]
+    gzip = compression == "gzip"
+    
+    if protocol == GRPC:
+        return OTLPMetricExporter(
+            endpoint=endpoint,
+            insecure=True,
+            timeout=timeout,
+            compression=GRPCCompression.Gzip if gzip else GRPCCompression.NoCompression,
+            preferred_temporality=preferred_temporality,
+            max_export_batch_size=max_export_batch_size or None
+        )
+    
+    if protocol == HTTP_PROTOBUF:
+        # Optional dependency: opentelemetry-exporter-otlp-proto-http
+        from opentelemetry.exporter.otlp.proto.http import Compression
+        from opentelemetry.exporter.otlp.proto.http.metric_exporter import (
+            OTLPMetricExporter as HTTPMetricExporter,
+        )
+        
+        if urlparse(endpoint).path in ("", "/"):
+            endpoint = endpoint.rstrip("/") + "/v1/metrics"
+        exporter = HTTPMetricExporter(
+            endpoint=endpoint,
+            timeout=timeout,
+            compression=Compression.Gzip if gzip else Compression.NoCompression,
+            preferred_temporality=preferred_temporality
+        )
+        if max_export_batch_size:
+            # The HTTP exporter does not split requests itself
+            return BatchingExporter(exporter, max_export_batch_size)
+        return exporter
+    
+    raise ValueError(f"Invalid OTLP protocol {protocol!r}, expected '{GRPC}' or '{HTTP_PROTOBUF}'")
+
+
+def split_metrics_data(metrics_data: MetricsData, max_points: int) -> Iterator[MetricsData]:
+    """
+    Splits metrics data into chunks of at most max_points data points
+    
+    Args:
+        metrics_data: Data collected by the reader
+        max_points: Maximum data points per chunk
+    
+    Yields:
+        MetricsData chunks preserving resource, scope and metric metadata
+    """
+    batch: List[ResourceMetrics] = []
+    size = 0
+    
+    for resource_metrics in metrics_data.resource_metrics:
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                points = list(metric.data.data_points)
+                while points:
+                    take = points[:max_points - size]
+                    points = points[len(take):]
+                    append_points(batch, resource_metrics, scope_metrics, metric, take)
+                    size += len(take)
+                    if size >= max_points:
+                        yield MetricsData(resource_metrics=batch)
+                        batch = []
+                        size = 0
+    
+    if size:
+        yield MetricsData(resource_metrics=batch)
+
+
+def append_points(
+    batch: List[ResourceMetrics],
+    resource_metrics: ResourceMetrics,
+    scope_metrics: ScopeMetrics,
+    metric: Metric,
+    points: list
+):
+    """Adds data points of one metric to a batch, reusing its resource/scope entries"""
+    if not batch or batch[-1].resource is not resource_metrics.resource:
+        batch.append(ResourceMetrics(
+            resource=resource_metrics.resource,
+            scope_metrics=[],
+            schema_url=resource_metrics.schema_url
+        ))
+    scopes = batch[-1].scope_metrics
+    if not scopes or scopes[-1].scope is not scope_metrics.scope:
+        scopes.append(ScopeMetrics(scope=scope_metrics.scope, metrics=[], schema_url=scope_metrics.schema_url))
+    scopes[-1].metrics.append(Metric(
+        name=metric.name,
+        description=metric.description,
+        unit=metric.unit,
+        data=dataclasses.replace(metric.data, data_points=points)
+    ))
+
+
+def export_unsent(
+    exporter: MetricExporter,
+    metrics_data: MetricsData,
+    timeout_millis: float = 10_000
+) -> Optional[MetricsData]:
+    """
+    Exports metrics data and returns the part the backend did not accept
+    
+    Exporters sending in several requests implement export_unsent so that a
+    failure halfway only hands back what was not sent yet; for any other
+    exporter a failure means nothing was sent.
+    
+    Args:
+        exporter: Exporter receiving the data
+        metrics_data: Data collected by the reader
+        timeout_millis: Export timeout
+    
+    Returns:
+        The unsent data, or None when everything was exported
+    """
+    # Looked up on the class: only exporters defining it report partial sends
+    if hasattr(type(exporter), "export_unsent"):
+        return exporter.export_unsent(metrics_data, timeout_millis=timeout_millis)
+    result = exporter.export(metrics_data, timeout_millis=timeout_millis)
+    return None if result is MetricExportResult.SUCCESS else metrics_data
+
+
+def concat_metrics_data(chunks: Iterable[MetricsData]) -> MetricsData:
+    """Joins metrics data chunks (e.g. the unsent batches) into one export"""
+    return MetricsData(resource_metrics=[
+        resource_metrics for chunk in chunks for resource_metrics in chunk.resource_metrics
+    ])
+
+
+class ExporterWrapper(MetricExporter):
+    """Base for exporters that forward to another exporter"""
+    
+    def __init__(self, exporter: MetricExporter):
+        """
+        Initializes the wrapper
+        
+        Args:
+            exporter: Exporter receiving the data
+        """
+        # The reader takes temporality and aggregation from the outermost exporter
+        super().__init__(
+            preferred_temporality=exporter._preferred_temporality,
+            preferred_aggregation=exporter._preferred_aggregation
+        )
+        self.exporter = exporter
+    
+    def export(self, metrics_data: MetricsData, timeout_millis: float = 10_000, **kwargs) -> MetricExportResult:
+        return self.exporter.export(metrics_data, timeout_millis=timeout_millis, **kwargs)
+    
+    def force_flush(self, timeout_millis: float = 10_000) -> bool:
+        return self.exporter.force_flush(timeout_millis=timeout_millis)
+    
+    def shutdown(self, timeout_millis: float = 30_000, **kwargs) -> None:
+        self.exporter.shutdown(timeout_millis=timeout_millis, **kwargs)
+
+
+class BatchingExporter(ExporterWrapper):
+    """Splits exports into requests of at most max_points data points"""
+    
+    def __init__(self, exporter: MetricExporter, max_points: int):
+        """
+        Initializes the batching exporter
+        
+        Args:
+            exporter: Exporter receiving each batch
+            max_points: Maximum data points per request
+        """
+        super().__init__(exporter)
+        self.max_points = max_points
+    
+    def export(self, metrics_data: MetricsData, timeout_millis: float = 10_000, **kwargs) -> MetricExportResult:
+        if self.export_unsent(metrics_data, timeout_millis) is None:
+            return MetricExportResult.SUCCESS
+        return MetricExportResult.FAILURE
+    
+    def export_unsent(self, metrics_data: MetricsData, timeout_millis: float = 10_000) -> Optional[MetricsData]:
+        """
+        Exports batch by batch within one timeout shared by all batches
+        
+        Returns:
+            The failed and remaining batches (None when all were sent)
+        """
+        deadline = time.monotonic() + timeout_millis / 1000
+        batches = split_metrics_data(metrics_data, self.max_points)
+        for batch in batches:
+            remaining = deadline - time.monotonic()
+            unsent = export_unsent(self.exporter, batch, remaining * 1000) if remaining > 0 else batch
+            if unsent is not None:
+                logger.warning("Metric export batch failed, returning the remaining batches unsent")
+                return concat_metrics_data([unsent, *batches])
+        return None
+
+
+class TrackingExporter(ExporterWrapper):
+    """Remembers when the backend last accepted an export (for readiness checks)"""
+    
+    def __init__(self, exporter: MetricExporter):
+        """
+        Initializes the tracking exporter
+        
+        Args:
+            exporter: Backend exporter (wrap it below the WAL, whose success
+                only means the data reached the disk)
+        """
+        super().__init__(exporter)
+        self.last_success: Optional[float] = None
+    
+    def export(self, metrics_data: MetricsData, timeout_millis: float = 10_000, **kwargs) -> MetricExportResult:
+        result = self.exporter.export(metrics_data, timeout_millis=timeout_millis, **kwargs)
+        if result is MetricExportResult.SUCCESS:
+            self.last_success = time.time()
+        return result
+    
+    def export_unsent(self, metrics_data: MetricsData, timeout_millis: float = 10_000) -> Optional[MetricsData]:
+        """Same as export, returning the data the backend did not accept"""
+        unsent = export_unsent(self.exporter, metrics_data, timeout_millis)
+        if unsent is None:
+            self.last_success = time.time()
+        return unsent
+
+
+class QueueingExporter(ExporterWrapper):
+    """Hands exports to a bounded queue drained by a dedicated thread"""
+    
+    def __init__(
+        self,
+        exporter: MetricExporter,
+        max_size: int = 8,
+        drop_policy: str = DROP_OLDEST,
+        priorities: Optional[Dict[str, int]] = None,
+        on_export: Optional[Callable[[float, MetricExportResult], None]] = None
+    ):
+        """
+        Initializes the queue and starts the export thread
+        
+        Args:
+            exporter: Exporter receiving the queued data
+            max_size: Maximum queued exports
+            drop_policy: What to drop when full: "oldest", "newest" (the incoming
+                export) or "priority" (the lowest-priority queued export)
+            priorities: Priority per metric name prefix (longest match wins,
+                unmatched metrics have priority 0); with the "priority" policy
+                each collection is queued as one export per priority class
+            on_export: Called with (duration in seconds, result) after each export
+        """
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Invalid drop policy {drop_policy!r}, expected one of {DROP_POLICIES}")
+        super().__init__(exporter)
+        self.max_size = max_size
+        self.drop_policy = drop_policy
+        self.priorities = priorities or {}
+        self.on_export = on_export
+        self.dropped = 0
+        
+        # (priority, data, timeout); _busy is set while an export is in flight
+        self._queue: Deque[Tuple[int, MetricsData, float]] = collections.deque()
+        self._busy = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="metric-export", daemon=True)
+        self._thread.start()
+    
+    def __len__(self) -> int:
+        return len(self._queue)
+    
+    def split_by_priority(self, metrics_data: MetricsData) -> List[Tuple[int, MetricsData]]:
+        """
+        Splits a collection by the priority of its metrics
+        
+        Every collection holds every instrument, so priorities only matter
+        when applied per metric rather than per collection.
+        
+        Args:
+            metrics_data: Data collected by the reader
+        
+        Returns:
+            (priority, data) per priority class, highest priority first
+        """
+        classes: Dict[int, List[ResourceMetrics]] = {}
+        for resource_metrics in metrics_data.resource_metrics:
+            for scope_metrics in resource_metrics.scope_metrics:
+                for metric in scope_metrics.metrics:
+                    batch = classes.setdefault(self._metric_priority(metric.name), [])
+                    append_points(batch, resource_metrics, scope_metrics, metric, list(metric.data.data_points))
+        return [
+            (priority, MetricsData(resource_metrics=batch))
+            for priority, batch in sorted(classes.items(), reverse=True)
+        ]
+    
+    def _metric_priority(self, name: str) -> int:
+        matches = [prefix for prefix in self.priorities if name.startswith(prefix)]
+        return self.priorities[max(matches, key=len)] if matches else 0
+    
+    def export(self, metrics_data: MetricsData, timeout_millis: float = 10_000, **kwargs) -> MetricExportResult:
+        # Never blocks the reader: the queue only holds references
+        if self.drop_policy == DROP_PRIORITY and self.priorities:
+            items = self.split_by_priority(metrics_data)
+        else:
+            items = [(0, metrics_data)]
+        
+        result = MetricExportResult.SUCCESS
+        with self._condition:
+            if self._closed:
+                return MetricExportResult.FAILURE
+            for priority, data in items:
+                if len(self._queue) >= self.max_size and not self._make_room(priority):
+                    self.dropped += 1
+                    logger.warning("Metric export queue full, dropping the incoming export")
+                    result = MetricExportResult.FAILURE
+                    continue
+                self._queue.append((priority, data, timeout_millis))
+            self._condition.notify_all()
+        return result
+    
+    def _make_room(self, priority: int) -> bool:
+        """Drops one queued export per the drop policy; False when the incoming one must go"""
+        if self.drop_policy == DROP_NEWEST:
+            return False
+        if self.drop_policy == DROP_OLDEST:
+            victim = 0
+        else:
+            # Oldest export among the lowest priority, unless the incoming one is lower
+            victim = min(range(len(self._queue)), key=lambda index: self._queue[index][0])
+            if self._queue[victim][0] > priority:
+                return False
+        del self._queue[victim]
+        self.dropped += 1
+        logger.warning(f"Metric export queue full, dropped a queued export ({self.drop_policy} policy)")
+        return True
+    
+    def force_flush(self, timeout_millis: float = 10_000) -> bool:
+        deadline = time.monotonic() + timeout_millis / 1000
+        with self._condition:
+            drained = self._condition.wait_for(
+                lambda: not self._queue and not self._busy, timeout=max(0.0, deadline - time.monotonic())
+            )
+        if not drained:
+            return False
+        return self.exporter.force_flush(timeout_millis=max(0.0, deadline - time.monotonic()) * 1000)
+    
+    def shutdown(self, timeout_millis: float = 30_000, **kwargs) -> None:
+        deadline = time.monotonic() + timeout_millis / 1000
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        # The thread drains what is queued before exiting
+        self._thread.join(timeout=max(0.0, deadline - time.monotonic()))
+        self.exporter.shutdown(timeout_millis=max(0.0, deadline - time.monotonic()) * 1000, **kwargs)
+    
+    def _run(self):
+        """Export thread: exports queued data in order"""
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._queue or self._closed)
+                if not self._queue:
+                    return
+                _, metrics_data, timeout_millis = self._queue.popleft()
+                self._busy = True
+            
+            start = time.perf_counter()
+            try:
+                result = self.exporter.export(metrics_data, timeout_millis=timeout_millis)
+            except Exception as e:
+                logger.error(f"Metric export failed: {e}")
+                result = MetricExportResult.FAILURE
+            if self.on_export is not None:
+                self.on_export(time.perf_counter() - start, result)
+            
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
@@ -4,9 +4,9 @@ Monitora latência (ping) e HTTP de targets específicos
 """
 import asyncio
 import logging
-import threading
 
 from monitoring.monitor import NetworkMonitor
+from monitoring.workers import WorkerPool
 from utils.config import Config
 from utils.health_check import HealthCheckServer
 
@@ -22,15 +22,31 @@ async def main():
     """Main function"""
     config = Config.from_env()
     
-    health_server = HealthCheckServer(config.health_port)
-    health_thread = threading.Thread(
-        target=health_server.start,
-        daemon=True
+    metrics_registry = None
+    if config.prometheus_enabled:
+        if config.workers > 1:
+            logger.warning("PROMETHEUS_ENABLED is ignored with MONITOR_WORKERS > 1")
+        else:
+            from prometheus_client import REGISTRY
+            metrics_registry = REGISTRY
+    
+    agent = WorkerPool(config) if config.workers > 1 else NetworkMonitor(config)
+    
+    # Runs on this event loop, so a wedged monitor also stops answering /livez
+    health_server = HealthCheckServer(
+        config.health_port,
+        metrics_registry=metrics_registry,
+        live_max_lag=config.health_live_max_lag
     )
-    health_thread.start()
+    health_server.add_check("probe_round", lambda: agent.last_round, config.health_ready_max_age)
+    if config.metrics_exporter != "none":
+        health_server.add_check("export", agent.last_export, config.health_export_max_age)
+    await health_server.start()
     
-    monitor = NetworkMonitor(config)
-    await monitor.run()
+    try:
+        await agent.run()
+    finally:
+        await health_server.stop()
 
 
 if __name__ == "__main__":
@@ -1,63 +1,310 @@
 """
 OpenTelemetry metrics module
 """
+import socket
+from typing import Dict, List, Optional, Sequence
+
 from opentelemetry import metrics
-from opentelemetry.sdk.metrics import MeterProvider
-from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
-from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
+from opentelemetry.metrics import Observation
+from opentelemetry.sdk.metrics import Histogram, MeterProvider
+from opentelemetry.sdk.metrics.export import MetricExporter, MetricExportResult, PeriodicExportingMetricReader
+from opentelemetry.sdk.metrics.view import (
+    ExplicitBucketHistogramAggregation,
+    ExponentialBucketHistogramAggregation,
+    View,
+)
 from opentelemetry.sdk.resources import Resource
 
+from src.attributes import AttributeSet
+from src.export import DROP_OLDEST, GRPC, QueueingExporter, TrackingExporter, create_otlp_exporter
+from src.victoriametrics import VictoriaMetricsExporter
+from src.wal import FSYNC_SEGMENT, WALExporter, WriteAheadLog
+
+# Bucket boundaries (ms) for latency instruments, resolving sub-millisecond
+# LAN round trips; other histograms keep the SDK defaults unless configured
+DEFAULT_HISTOGRAM_BUCKETS: Dict[str, List[float]] = {
+    "network.ping.rtt": [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000],
+    "network.tcp.connect.duration": [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000],
+    "http.client.duration": [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000],
+}
+
 
 class MetricsManager:
     """OpenTelemetry metrics manager"""
     
-    def __init__(self, service_name: str, otel_endpoint: str):
+    def __init__(
+        self,
+        service_name: str,
+        otel_endpoint: str,
+        worker_id: Optional[int] = None,
+        histogram_buckets: Optional[Dict[str, Sequence[float]]] = None,
+        exponential_histograms: bool = False,
+        exponential_max_size: int = 160,
+        otel_protocol: str = GRPC,
+        export_interval_ms: int = 10000,
+        export_timeout_ms: int = 10000,
+        temporality: str = "cumulative",
+        compression: str = "none",
+        max_export_batch_size: int = 0,
+        wal_dir: Optional[str] = None,
+        wal_max_bytes: int = 256 * 1024 * 1024,
+        wal_segment_bytes: int = 8 * 1024 * 1024,
+        wal_fsync: str = FSYNC_SEGMENT,
+        wal_replay_rate: float = 10.0,
+        export_queue_size: int = 8,
+        export_drop_policy: str = DROP_OLDEST,
+        export_priorities: Optional[Dict[str, int]] = None,
+        metrics_exporter: str = "otlp",
+        victoriametrics_url: str = "http://victoriametrics:8428",
+        victoriametrics_max_batch_samples: int = 10000,
+        prometheus_enabled: bool = False
+    ):
         """
         Initializes the metrics manager
         
         Args:
             service_name: Service name
             otel_endpoint: OTEL Collector endpoint
+            worker_id: Worker process id (exported as the worker.id resource attribute)
+            histogram_buckets: Bucket boundaries per instrument name, merged
+                over DEFAULT_HISTOGRAM_BUCKETS
+            exponential_histograms: Aggregate every histogram as a base-2
+                exponential histogram instead of explicit buckets
+            exponential_max_size: Maximum buckets per exponential histogram
+            otel_protocol: OTLP transport ("grpc" or "http/protobuf")
+            export_interval_ms: Period between exports
+            export_timeout_ms: Timeout of each export
+            temporality: Aggregation temporality preference
+                ("cumulative", "delta" or "lowmemory")
+            compression: OTLP payload compression ("gzip" or "none")
+            max_export_batch_size: Maximum data points per export request (0 = no limit)
+            wal_dir: Directory of the write-ahead log buffering failed exports
+                (None = disabled)
+            wal_max_bytes: WAL size above which the oldest batches are dropped
+            wal_segment_bytes: WAL segment rotation size
+            wal_fsync: WAL fsync policy ("always", "segment" or "never")
+            wal_replay_rate: Maximum WAL batches replayed per second
+            export_queue_size: Exports queued between the reader and the exporter
+                (0 = export on the reader thread)
+            export_drop_policy: Queue drop policy ("oldest", "newest" or "priority")
+            export_priorities: Priority per metric name prefix for the "priority" policy
+            metrics_exporter: "otlp" (via the collector), "victoriametrics" (direct
+                import) or "none" (no push, e.g. when only scraped)
+            victoriametrics_url: VictoriaMetrics base URL for the direct exporter
+            victoriametrics_max_batch_samples: Maximum samples per import request
+            prometheus_enabled: Also expose the metrics to Prometheus scrapes
+                (served by the health check server from the default registry)
         """
         self.service_name = service_name
         self.otel_endpoint = otel_endpoint
+        self.worker_id = worker_id
+        self.histogram_buckets = {**DEFAULT_HISTOGRAM_BUCKETS, **(histogram_buckets or {})}
+        self.exponential_histograms = exponential_histograms
+        self.exponential_max_size = exponential_max_size
+        self.otel_protocol = otel_protocol
+        self.export_interval_ms = export_interval_ms
+        self.export_timeout_ms = export_timeout_ms
+        self.temporality = temporality
+        self.compression = compression
+        self.max_export_batch_size = max_export_batch_size
+        self.wal_dir = wal_dir
+        self.wal_max_bytes = wal_max_bytes
+        self.wal_segment_bytes = wal_segment_bytes
+        self.wal_fsync = wal_fsync
+        self.wal_replay_rate = wal_replay_rate
+        self.wal_exporter: Optional[WALExporter] = None
+        self.export_queue_size = export_queue_size
+        self.export_drop_policy = export_drop_policy
+        self.export_priorities = export_priorities or {}
+        self.export_queue: Optional[QueueingExporter] = None
+        self.export_tracker: Optional[TrackingExporter] = None
+        self.metrics_exporter = metrics_exporter
+        self.victoriametrics_url = victoriametrics_url
+        self.victoriametrics_max_batch_samples = victoriametrics_max_batch_samples
+        self.prometheus_enabled = prometheus_enabled
+        self._export_attributes = {
+            result: AttributeSet(result=result.name.lower()) for result in MetricExportResult
+        }
         self._setup_provider()
         self.meter = metrics.get_meter(__name__)
         self._create_metrics()
+        if self.wal_exporter is not None:
+            self._create_wal_metrics()
+        if self.export_queue is not None:
+            self._create_queue_metrics()
     
     def _setup_provider(self):
         """Configures the OpenTelemetry provider"""
-        resource = Resource.create({
+        attributes = {
             "service.name": self.service_name,
             "service.namespace": "monitoring",
             "deployment.environment": "production"
-        })
+        }
+        if self.worker_id is not None:
+            attributes["worker.id"] = self.worker_id
+            # Becomes the instance label, so per-worker series (loop lag, export
+            # queue, WAL...) do not collide; worker.id alone is not a label
+            attributes["service.instance.id"] = f"{socket.gethostname()}-worker-{self.worker_id}"
+        resource = Resource.create(attributes)
         
-        exporter = OTLPMetricExporter(
-            endpoint=self.otel_endpoint,
-            insecure=True
-        )
+        readers = []
+        exporter = self._create_exporter()
+        if exporter is not None:
+            readers.append(self._push_reader(exporter))
+        if self.prometheus_enabled:
+            # Optional dependency: opentelemetry-exporter-prometheus
+            from opentelemetry.exporter.prometheus import PrometheusMetricReader
+            readers.append(PrometheusMetricReader())
         
-        reader = PeriodicExportingMetricReader(
-            exporter, 
-            export_interval_millis=10000
+        provider = MeterProvider(resource=resource, metric_readers=readers, views=self._views())
+        metrics.set_meter_provider(provider)
+    
+    def last_export(self) -> Optional[float]:
+        """Epoch of the last export accepted by the backend (None = never, or no push exporter)"""
+        return self.export_tracker.last_success if self.export_tracker is not None else None
+    
+    def _push_reader(self, exporter: MetricExporter) -> PeriodicExportingMetricReader:
+        """Wraps the exporter with the WAL and export queue and creates the periodic reader"""
+        # Below the WAL: readiness needs exports the backend actually accepted
+        self.export_tracker = TrackingExporter(exporter)
+        exporter = self.export_tracker
+        if self.wal_dir:
+            self.wal_exporter = WALExporter(
+                exporter,
+                WriteAheadLog(
+                    self.wal_dir,
+                    max_bytes=self.wal_max_bytes,
+                    segment_bytes=self.wal_segment_bytes,
+                    fsync=self.wal_fsync
+                ),
+                replay_rate=self.wal_replay_rate
+            )
+            exporter = self.wal_exporter
+        if self.export_queue_size:
+            # Slow exports no longer hold up the reader's collection cycle
+            self.export_queue = QueueingExporter(
+                exporter,
+                max_size=self.export_queue_size,
+                drop_policy=self.export_drop_policy,
+                priorities=self.export_priorities,
+                on_export=self._record_export
+            )
+            exporter = self.export_queue
+        
+        return PeriodicExportingMetricReader(
+            exporter,
+            export_interval_millis=self.export_interval_ms,
+            export_timeout_millis=self.export_timeout_ms
         )
+    
+    def _create_exporter(self) -> Optional[MetricExporter]:
+        """Creates the backend exporter (OTLP, direct VictoriaMetrics import or none)"""
+        if self.metrics_exporter == "none":
+            return None
+        if self.metrics_exporter == "victoriametrics":
+            return VictoriaMetricsExporter(
+                self.victoriametrics_url,
+                timeout=self.export_timeout_ms / 1000,
+                compression=self.compression,
+                max_batch_samples=self.victoriametrics_max_batch_samples
+            )
+        if self.metrics_exporter == "otlp":
+            return create_otlp_exporter(
+                self.otel_endpoint,
+                protocol=self.otel_protocol,
+                timeout=self.export_timeout_ms / 1000,
+                compression=self.compression,
+                temporality=self.temporality,
+                max_export_batch_size=self.max_export_batch_size
+            )
+        raise ValueError(f"Invalid metrics exporter {self.metrics_exporter!r}, expected 'otlp', 'victoriametrics' or 'none'")
+    
+    def _views(self) -> List[View]:
+        """Builds the histogram aggregation views"""
+        if self.exponential_histograms:
+            # One view for all histograms: a second matching view would
+            # export a duplicate stream under the same name
+            return [
+                View(
+                    instrument_type=Histogram,
+                    aggregation=ExponentialBucketHistogramAggregation(max_size=self.exponential_max_size)
+                )
+            ]
         
-        provider = MeterProvider(resource=resource, metric_readers=[reader])
-        metrics.set_meter_provider(provider)
+        return [
+            View(
+                instrument_name=name,
+                aggregation=ExplicitBucketHistogramAggregation(boundaries=sorted(boundaries))
+            )
+            for name, boundaries in self.histogram_buckets.items()
+        ]
     
     def _create_metrics(self):
         """Creates metrics following OpenTelemetry conventions"""
         self.ping_rtt = self.meter.create_histogram(
             name="network.ping.rtt",
-            description="Ping round-trip time in milliseconds",
+            description="Ping round mean round-trip time in milliseconds",
+            unit="ms"
+        )
+        
+        self.ping_rtt_min = self.meter.create_gauge(
+            name="network.ping.rtt.min",
+            description="Minimum ping round-trip time of the last round",
+            unit="ms"
+        )
+        
+        self.ping_rtt_max = self.meter.create_gauge(
+            name="network.ping.rtt.max",
+            description="Maximum ping round-trip time of the last round",
+            unit="ms"
+        )
+        
+        self.ping_rtt_stddev = self.meter.create_gauge(
+            name="network.ping.rtt.stddev",
+            description="Ping round-trip time standard deviation of the last round",
             unit="ms"
         )
         
-        self.ping_packet_loss = self.meter.create_histogram(
-            name="network.ping.packet_loss",
-            description="Ping packet loss percentage",
-            unit="%"
+        self.ping_jitter = self.meter.create_gauge(
+            name="network.ping.jitter",
+            description="RFC 3550 interarrival jitter of the last round",
+            unit="ms"
+        )
+        
+        self.ping_loss_run = self.meter.create_gauge(
+            name="network.ping.loss_run",
+            description="Longest run of consecutive lost echoes in the last round",
+            unit="1"
+        )
+        
+        self.ping_reordered = self.meter.create_counter(
+            name="network.ping.reordered",
+            description="Echo replies received out of order",
+            unit="1"
+        )
+        
+        self.ping_duplicates = self.meter.create_counter(
+            name="network.ping.duplicates",
+            description="Duplicate echo replies",
+            unit="1"
+        )
+        
+        self.ping_sent = self.meter.create_counter(
+            name="network.ping.sent",
+            description="Echo requests sent",
+            unit="1"
+        )
+        
+        self.ping_received = self.meter.create_counter(
+            name="network.ping.received",
+            description="Echo requests answered (duplicates excluded)",
+            unit="1"
+        )
+        
+        self.dns_duration = self.meter.create_histogram(
+            name="network.dns.duration",
+            description="DNS resolution duration (cache misses and refreshes only)",
+            unit="ms"
         )
         
         self.http_duration = self.meter.create_histogram(
@@ -66,8 +313,164 @@ class MetricsManager:
             unit="ms"
         )
         
+        self.http_dns_duration = self.meter.create_histogram(
+            name="http.client.dns.duration",
+            description="Time spent resolving the host of an HTTP request hop",
+            unit="ms"
+        )
+        
+        self.http_connect_duration = self.meter.create_histogram(
+            name="http.client.connect.duration",
+            description="TCP connect time of an HTTP request hop (new connections only)",
+            unit="ms"
+        )
+        
+        self.http_tls_duration = self.meter.create_histogram(
+            name="http.client.tls.duration",
+            description="TLS handshake time of an HTTP request hop (new connections only)",
+            unit="ms"
+        )
+        
+        self.http_ttfb = self.meter.create_histogram(
+            name="http.client.ttfb",
+            description="Time from request sent to response headers received",
+            unit="ms"
+        )
+        
+        self.http_transfer_duration = self.meter.create_histogram(
+            name="http.client.transfer.duration",
+            description="Response body transfer time of an HTTP request hop",
+            unit="ms"
+        )
+        
+        self.http_content_changes = self.meter.create_counter(
+            name="http.client.content_changes",
+            description="Checks whose response body digest differed from the previous check",
+            unit="1"
+        )
+        
         self.http_status = self.meter.create_counter(
             name="http.client.status",
             description="HTTP response status code count",
             unit="1"
         )
+        
+        self.tcp_connect_duration = self.meter.create_histogram(
+            name="network.tcp.connect.duration",
+            description="TCP handshake duration in milliseconds",
+            unit="ms"
+        )
+        
+        self.tcp_tls_duration = self.meter.create_histogram(
+            name="network.tcp.tls.duration",
+            description="TLS handshake duration on top of the TCP connection",
+            unit="ms"
+        )
+        
+        self.tcp_checks = self.meter.create_counter(
+            name="network.tcp.checks",
+            description="TCP connect checks by outcome",
+            unit="1"
+        )
+        
+        self.probe_interval = self.meter.create_gauge(
+            name="network.monitor.probe_interval",
+            description="Effective probe interval of a target (adaptive mode)",
+            unit="s"
+        )
+        
+        self.breaker_state = self.meter.create_gauge(
+            name="network.monitor.breaker_state",
+            description="Circuit breaker state of a target (0=closed, 1=open, 2=half-open)",
+            unit="1"
+        )
+        
+        self.queue_delay = self.meter.create_histogram(
+            name="network.monitor.queue_delay",
+            description="Time a due probe waited for the global probe budget",
+            unit="ms"
+        )
+        
+        self.probes_throttled = self.meter.create_counter(
+            name="network.monitor.probes_throttled",
+            description="Probes delayed or shed by the global probe budget",
+            unit="1"
+        )
+        
+        self.loop_lag = self.meter.create_histogram(
+            name="network.monitor.loop_lag",
+            description="Event-loop scheduling lag of the agent",
+            unit="ms"
+        )
+        
+        self.contaminated_samples = self.meter.create_counter(
+            name="network.monitor.contaminated_samples",
+            description="Probe timings whose measurement window overlapped an event-loop stall",
+            unit="1"
+        )
+        
+        self.missed_ticks = self.meter.create_counter(
+            name="network.monitor.missed_ticks",
+            description="Scheduled probe ticks skipped because the previous run overran",
+            unit="1"
+        )
+    
+    def _create_wal_metrics(self):
+        """Creates the write-ahead log backlog instruments"""
+        wal = self.wal_exporter.wal
+        
+        def observe(value):
+            return lambda options: [Observation(value())]
+        
+        self.meter.create_observable_gauge(
+            name="network.monitor.export.wal.backlog",
+            callbacks=[observe(lambda: wal.bytes)],
+            description="Size of the export batches waiting in the write-ahead log",
+            unit="By"
+        )
+        self.meter.create_observable_gauge(
+            name="network.monitor.export.wal.batches",
+            callbacks=[observe(lambda: len(wal))],
+            description="Export batches waiting in the write-ahead log",
+            unit="1"
+        )
+        self.meter.create_observable_gauge(
+            name="network.monitor.export.wal.replay_lag",
+            callbacks=[observe(wal.oldest_age)],
+            description="Age of the oldest export batch waiting in the write-ahead log",
+            unit="s"
+        )
+        self.meter.create_observable_counter(
+            name="network.monitor.export.wal.dropped",
+            callbacks=[observe(lambda: wal.dropped)],
+            description="Export batches dropped from the write-ahead log (size limit or corruption)",
+            unit="1"
+        )
+    
+    def _create_queue_metrics(self):
+        """Creates the export queue instruments"""
+        queue = self.export_queue
+        
+        self.export_duration = self.meter.create_histogram(
+            name="network.monitor.export.duration",
+            description="Duration of metric exports to the backend",
+            unit="ms"
+        )
+        self.meter.create_observable_gauge(
+            name="network.monitor.export.queue.depth",
+            callbacks=[lambda options: [Observation(len(queue))]],
+            description="Exports waiting in the export queue",
+            unit="1"
+        )
+        self.meter.create_observable_counter(
+            name="network.monitor.export.queue.dropped",
+            callbacks=[lambda options: [Observation(queue.dropped)]],
+            description="Exports dropped because the export queue was full",
+            unit="1"
+        )
+    
+    def _record_export(self, duration: float, result: MetricExportResult):
+        """Records one export (called from the export thread)"""
+        export_duration = getattr(self, "export_duration", None)
+        if export_duration is not None:
+            export_duration.record(duration * 1000, self._export_attributes[result])
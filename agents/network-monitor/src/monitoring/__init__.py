@@ -5,9 +5,19 @@ Monitoring package
 __all__ = [
     "NetworkMonitor",
     "PingMonitor",
-    "HTTPMonitor"
+    "HTTPMonitor",
+    "TCPMonitor",
+    "ICMPProber",
+    "DNSCache",
+    "ProbeScheduler",
+    "WorkerPool"
 ]
 
 from .monitor import NetworkMonitor
 from .ping_monitor import PingMonitor
 from .http_monitor import HTTPMonitor
+from .tcp_monitor import TCPMonitor
+from .icmp import ICMPProber
+from .dns_cache import DNSCache
+from .scheduler import ProbeScheduler
+from .workers import WorkerPool
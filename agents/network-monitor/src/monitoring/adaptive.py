@@ -0,0 +1,126 @@
+"""
+Adaptive probe interval module
+"""
+from typing import Any, Dict, Optional, Tuple
+
+
+def health_signal(probe: str, result: Optional[Dict[str, Any]]) -> Tuple[Optional[float], bool]:
+    """
+    Extracts the latency and failure flag from a probe result
+    
+    Args:
+        probe: Probe type ("ping", "http" or "tcp")
+        result: Dict returned by the monitor's check (None if it raised)
+    
+    Returns:
+        (latency in ms or None, whether the probe failed or saw loss/errors)
+    """
+    if not result or "error" in result:
+        return None, True
+    if result.get("loop_stalled"):
+        # Latency inflated by an event-loop stall says nothing about the target
+        value, failed = health_signal(probe, {**result, "loop_stalled": False})
+        return None, failed
+    if probe == "ping":
+        failed = result.get("packet_loss_percent", 0) > 0
+        return (None if result.get("successful_pings") == 0 else result.get("avg_rtt_ms")), failed
+    if probe == "http":
+        return result.get("duration_ms"), result.get("status_code", 0) >= 500
+    if probe == "tcp":
+        return result.get("connect_ms"), not result.get("success", False)
+    return None, False
+
+
+class AdaptiveInterval:
+    """Per-target interval controller driven by an EWMA latency baseline"""
+    
+    def __init__(
+        self,
+        interval: float,
+        floor: float,
+        ceiling: float,
+        alpha: float = 0.2,
+        threshold: float = 3.0,
+        warmup: int = 5,
+        stable_rounds: int = 3,
+        shrink: float = 0.5,
+        grow: float = 1.25
+    ):
+        """
+        Initializes the controller
+        
+        Args:
+            interval: Starting (configured) interval in seconds
+            floor: Shortest interval in seconds
+            ceiling: Longest interval in seconds
+            alpha: EWMA smoothing factor of the baseline
+            threshold: Deviation, in baseline mean absolute deviations, that
+                counts as anomalous
+            warmup: Samples collected before latency deviations are judged
+            stable_rounds: Consecutive healthy samples before the interval grows
+            shrink: Factor applied to the interval on an anomaly
+            grow: Factor applied to the interval after stable_rounds healthy samples
+        """
+        self.interval = interval
+        self.floor = floor
+        self.ceiling = ceiling
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.stable_rounds = stable_rounds
+        self.shrink = shrink
+        self.grow = grow
+        self.mean: Optional[float] = None
+        self.deviation = 0.0
+        self.samples = 0
+        self._stable = 0
+    
+    def is_anomalous(self, value: Optional[float], failed: bool) -> bool:
+        """
+        Whether a sample deviates from the baseline
+        
+        Args:
+            value: Latency of the sample (None if unavailable)
+            failed: Whether the probe failed or saw loss/errors
+        
+        Returns:
+            True for failures and for latencies beyond the threshold
+        """
+        if failed:
+            return True
+        if value is None or self.mean is None or self.samples < self.warmup:
+            return False
+        # Floor on the deviation so a perfectly flat baseline does not flag noise
+        deviation = max(self.deviation, self.mean * 0.05)
+        return abs(value - self.mean) > self.threshold * deviation
+    
+    def observe(self, value: Optional[float], failed: bool) -> float:
+        """
+        Updates the baseline with a probe result and adapts the interval
+        
+        Args:
+            value: Latency of the sample (None if unavailable)
+            failed: Whether the probe failed or saw loss/errors
+        
+        Returns:
+            The new interval in seconds
+        """
+        if self.is_anomalous(value, failed):
+            self._stable = 0
+            self.interval = max(self.floor, self.interval * self.shrink)
+        else:
+            self._stable += 1
+            if self._stable >= self.stable_rounds:
+                self._stable = 0
+                self.interval = min(self.ceiling, self.interval * self.grow)
+        
+        if value is not None and not failed:
+            if self.mean is None:
+                self.mean = value
+            else:
+                error = value - self.mean
+                self.mean += self.alpha * error
+                self.deviation += self.alpha * (abs(error) - self.deviation)
+            self.samples += 1
+        
+        return self.interval
@@ -0,0 +1,154 @@
+"""
+Global probe budget module
+"""
+import asyncio
+import collections
+import logging
+import time
+from typing import Deque, Dict, Optional
+
+from src.metrics import MetricsManager
+
+logger = logging.getLogger(__name__)
+
+
+class ProbeBudget:
+    """Token-bucket rate limit and in-flight cap shared by every probe type"""
+    
+    def __init__(
+        self,
+        max_in_flight: int = 100,
+        rate: float = 0.0,
+        burst: Optional[float] = None,
+        weights: Optional[Dict[str, float]] = None,
+        max_queue_delay: float = 0.0,
+        metrics_manager: Optional[MetricsManager] = None
+    ):
+        """
+        Initializes the budget
+        
+        Args:
+            max_in_flight: Maximum number of probes running at once
+            rate: Probes started per second (0 = no rate limit)
+            burst: Bucket size in probes (defaults to one second of rate)
+            weights: Share of the budget per probe type when several wait
+                (types not listed weigh 1; weights must be positive)
+            max_queue_delay: Seconds a probe may wait before it is shed
+                (0 = never shed)
+            metrics_manager: Metrics manager (queue delay and throttling)
+        """
+        invalid = {probe: weight for probe, weight in (weights or {}).items() if not weight > 0}
+        if invalid:
+            raise ValueError(f"Invalid probe weights {invalid!r}, weights must be positive")
+        self.max_in_flight = max_in_flight
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self.weights = weights or {}
+        self.max_queue_delay = max_queue_delay
+        self.metrics = metrics_manager
+        self.in_flight = 0
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+        self._queues: Dict[str, Deque[asyncio.Future]] = collections.defaultdict(collections.deque)
+        # Start-time fair queueing tags
+        self._finish: Dict[str, float] = collections.defaultdict(float)
+        self._virtual_time = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+    
+    async def acquire(self, probe: str) -> bool:
+        """
+        Waits for a slot and a token
+        
+        Args:
+            probe: Probe type requesting the budget
+        
+        Returns:
+            True when granted (release() must follow), False if shed
+        """
+        enqueued_at = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self._queues[probe].append(future)
+        self._dispatch()
+        delayed = not future.done()
+        
+        try:
+            if self.max_queue_delay > 0:
+                await asyncio.wait_for(future, self.max_queue_delay)
+            else:
+                await future
+        except asyncio.TimeoutError:
+            self._record_throttle(probe, "shed")
+            return False
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(probe)
+            raise
+        
+        delay = time.monotonic() - enqueued_at
+        if self.metrics is not None:
+            self.metrics.queue_delay.record(delay * 1000, {"probe": probe})
+        if delayed:
+            self._record_throttle(probe, "delayed")
+        return True
+    
+    def release(self, probe: str):
+        """
+        Returns the slot of a finished probe
+        
+        Args:
+            probe: Probe type that held the slot
+        """
+        self.in_flight -= 1
+        self._dispatch()
+    
+    def _record_throttle(self, probe: str, outcome: str):
+        """Counts a probe delayed or shed by the budget"""
+        if outcome == "shed":
+            logger.warning(f"{probe} probe shed after waiting {self.max_queue_delay}s for the probe budget")
+        if self.metrics is not None:
+            self.metrics.probes_throttled.add(1, {"probe": probe, "outcome": outcome})
+    
+    def _refill(self, now: float):
+        """Adds the tokens accrued since the last refill"""
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+    
+    def _next_probe(self) -> Optional[str]:
+        """Returns the waiting probe type with the smallest start tag"""
+        best = None
+        best_tag = 0.0
+        for probe, queue in self._queues.items():
+            while queue and queue[0].done():
+                # Shed or cancelled waiters
+                queue.popleft()
+            if not queue:
+                continue
+            tag = max(self._finish[probe], self._virtual_time)
+            if best is None or tag < best_tag:
+                best, best_tag = probe, tag
+        return best
+    
+    def _dispatch(self):
+        """Grants the budget to waiters in weighted fair order"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        while self.in_flight < self.max_in_flight:
+            probe = self._next_probe()
+            if probe is None:
+                return
+            
+            if self.rate > 0:
+                self._refill(time.monotonic())
+                if self._tokens < 1:
+                    wait = (1 - self._tokens) / self.rate
+                    self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                    return
+                self._tokens -= 1
+            
+            tag = max(self._finish[probe], self._virtual_time)
+            self._virtual_time = tag
+            self._finish[probe] = tag + 1 / self.weights.get(probe, 1.0)
+            self.in_flight += 1
+            self._queues[probe].popleft().set_result(None)
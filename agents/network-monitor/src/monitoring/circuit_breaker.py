@@ -0,0 +1,105 @@
+"""
+Per-target circuit breaker module
+"""
+import time
+from typing import Any, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Value exported by the breaker state gauge
+STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+
+def is_unreachable(probe: str, result: Optional[Dict[str, Any]]) -> bool:
+    """
+    Whether a probe result means the target could not be reached at all
+    
+    Partial loss or HTTP error statuses still prove reachability and do not
+    count as breaker failures.
+    
+    Args:
+        probe: Probe type ("ping", "http" or "tcp")
+        result: Dict returned by the monitor's check (None if it raised)
+    
+    Returns:
+        True if the target did not answer
+    """
+    if not result or "error" in result:
+        return True
+    if probe == "ping":
+        return result.get("successful_pings") == 0
+    if probe == "tcp":
+        return not result.get("success", False)
+    return False
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker with exponential back-off for one (probe, target)"""
+    
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        base_backoff: float = 30.0,
+        max_backoff: float = 600.0
+    ):
+        """
+        Initializes the breaker (closed)
+        
+        Args:
+            failure_threshold: Consecutive failures that open the breaker
+            base_backoff: Seconds the breaker stays open the first time
+            max_backoff: Upper bound of the doubling back-off in seconds
+        """
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.retry_at = 0.0
+    
+    def allow(self, now: Optional[float] = None) -> bool:
+        """
+        Whether a probe may run now
+        
+        An open breaker whose back-off elapsed moves to half-open and lets
+        exactly one (recovery) probe through.
+        
+        Args:
+            now: monotonic() timestamp (current time if omitted)
+        
+        Returns:
+            True if the probe should run
+        """
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            now = time.monotonic() if now is None else now
+            if now >= self.retry_at:
+                self.state = HALF_OPEN
+                return True
+        return False
+    
+    def record(self, success: bool, now: Optional[float] = None):
+        """
+        Records the outcome of an allowed probe
+        
+        Args:
+            success: Whether the target answered
+            now: monotonic() timestamp (current time if omitted)
+        """
+        if success:
+            self.state = CLOSED
+            self.failures = 0
+            self.opened = 0
+            return
+        
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            now = time.monotonic() if now is None else now
+            backoff = min(self.base_backoff * 2 ** self.opened, self.max_backoff)
+            self.state = OPEN
+            self.opened += 1
+            self.retry_at = now + backoff
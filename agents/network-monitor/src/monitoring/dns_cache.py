@@ -0,0 +1,176 @@
+"""
+DNS resolution cache module
+"""
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+from typing import Dict, List, Optional, Tuple
+
+import dns.asyncresolver
+import dns.exception
+
+from src.metrics import MetricsManager
+
+logger = logging.getLogger(__name__)
+
+# TTL used when the answer comes from getaddrinfo (no TTL available)
+FALLBACK_TTL = 60.0
+
+
+class _DNSEntry:
+    """Cached positive or negative answer"""
+    
+    __slots__ = ('addresses', 'error', 'expires_at', 'refresh_at')
+    
+    def __init__(self, addresses: List[str], error: Optional[str], expires_at: float, refresh_at: float):
+        self.addresses = addresses
+        self.error = error
+        self.expires_at = expires_at
+        self.refresh_at = refresh_at
+    
+    def result(self, host: str) -> List[str]:
+        """Returns the cached addresses or raises the cached failure"""
+        if self.error is not None:
+            raise OSError(f"DNS resolution failed for {host}: {self.error}")
+        return self.addresses
+
+
+class DNSCache:
+    """Async IPv4 resolver cache honouring record TTLs"""
+    
+    def __init__(
+        self,
+        metrics_manager: Optional[MetricsManager] = None,
+        min_ttl: float = 5.0,
+        max_ttl: float = 3600.0,
+        negative_ttl: float = 30.0,
+        refresh_ratio: float = 0.8
+    ):
+        """
+        Initializes the DNS cache
+        
+        Args:
+            metrics_manager: Metrics manager (records network.dns.duration)
+            min_ttl: Lower bound applied to record TTLs in seconds
+            max_ttl: Upper bound applied to record TTLs in seconds
+            negative_ttl: How long failed lookups are cached in seconds
+            refresh_ratio: Fraction of the TTL after which entries are
+                refreshed in the background while still being served
+        """
+        self.metrics = metrics_manager
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.refresh_ratio = refresh_ratio
+        self._resolver: Optional[dns.asyncresolver.Resolver] = None
+        self._entries: Dict[str, _DNSEntry] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+    
+    async def resolve(self, host: str) -> str:
+        """
+        Resolves a hostname to one IPv4 address
+        
+        Args:
+            host: Hostname or IP literal
+        
+        Returns:
+            IPv4 address
+        """
+        addresses = await self.resolve_all(host)
+        return addresses[0]
+    
+    async def resolve_all(self, host: str) -> List[str]:
+        """
+        Resolves a hostname to all of its IPv4 addresses
+        
+        Args:
+            host: Hostname or IP literal
+        
+        Returns:
+            List of IPv4 addresses
+        """
+        try:
+            ipaddress.ip_address(host)
+            return [host]
+        except ValueError:
+            pass
+        
+        entry = self._entries.get(host)
+        now = time.monotonic()
+        
+        if entry is not None and now < entry.expires_at:
+            if entry.error is None and now >= entry.refresh_at:
+                self._lookup(host)
+            return entry.result(host)
+        
+        entry = await asyncio.shield(self._lookup(host))
+        return entry.result(host)
+    
+    def _lookup(self, host: str) -> asyncio.Task:
+        """Starts (or joins) the lookup for a host so concurrent callers share one query"""
+        task = self._inflight.get(host)
+        if task is None:
+            task = asyncio.create_task(self._refresh(host))
+            self._inflight[host] = task
+            task.add_done_callback(lambda _: self._inflight.pop(host, None))
+        return task
+    
+    async def _refresh(self, host: str) -> _DNSEntry:
+        """
+        Queries the resolver and stores the answer
+        
+        A failed refresh keeps serving a still-valid positive entry.
+        """
+        start = time.perf_counter()
+        try:
+            addresses, ttl = await self._query(host)
+            ttl = min(max(ttl, self.min_ttl), self.max_ttl)
+            now = time.monotonic()
+            entry = _DNSEntry(addresses, None, now + ttl, now + ttl * self.refresh_ratio)
+            status = "success"
+        except Exception as e:
+            logger.warning(f"DNS resolution failed for {host}: {e}")
+            now = time.monotonic()
+            previous = self._entries.get(host)
+            if previous is not None and previous.error is None and now < previous.expires_at:
+                previous.refresh_at = previous.expires_at
+                entry = previous
+            else:
+                entry = _DNSEntry([], str(e), now + self.negative_ttl, now + self.negative_ttl)
+            status = "error"
+        
+        if self.metrics is not None:
+            self.metrics.dns_duration.record(
+                (time.perf_counter() - start) * 1000,
+                {"target": host, "status": status}
+            )
+        
+        self._entries[host] = entry
+        return entry
+    
+    async def _query(self, host: str) -> Tuple[List[str], float]:
+        """
+        Looks up the A records of a host
+        
+        Falls back to getaddrinfo (hosts file, container DNS) when the
+        stub resolver cannot answer.
+        
+        Returns:
+            (addresses, ttl in seconds)
+        """
+        try:
+            if self._resolver is None:
+                self._resolver = dns.asyncresolver.Resolver()
+            answer = await self._resolver.resolve(host, 'A')
+            return [record.address for record in answer], float(answer.rrset.ttl)
+        except dns.exception.DNSException as e:
+            logger.debug(f"Stub resolver failed for {host} ({e}), using getaddrinfo")
+        
+        loop = asyncio.get_running_loop()
+        infos = await loop.getaddrinfo(host, None, family=socket.AF_INET, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        if not addresses:
+            raise OSError(f"No IPv4 address for {host}")
+        return addresses, FALLBACK_TTL
@@ -1,67 +1,308 @@
 """
 HTTP monitoring module
 """
+import hashlib
 import time
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 
+import httpcore
 import httpx
 
+from src.attributes import AttributeCache
 from src.metrics import MetricsManager
+from .dns_cache import DNSCache
+from .http_trace import PhaseTimer, current_timer
+from .loop_lag import LoopLagMonitor
 
 logger = logging.getLogger(__name__)
 
 
+class _ResolvingBackend(httpcore.AsyncNetworkBackend):
+    """httpcore network backend that connects through the shared DNS cache"""
+    
+    def __init__(self, resolver: DNSCache, backend: httpcore.AsyncNetworkBackend):
+        self.resolver = resolver
+        self.backend = backend
+    
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        """Resolves the host through the cache; TLS still uses the hostname for SNI"""
+        start = time.perf_counter()
+        address = await self.resolver.resolve(host)
+        timer = current_timer.get()
+        if timer is not None:
+            timer.add("dns", time.perf_counter() - start)
+        return await self.backend.connect_tcp(
+            address,
+            port,
+            timeout=timeout,
+            local_address=local_address,
+            socket_options=socket_options
+        )
+    
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self.backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+    
+    async def sleep(self, seconds):
+        await self.backend.sleep(seconds)
+
+
+class CachedDNSTransport(httpx.AsyncHTTPTransport):
+    """httpx transport resolving hostnames through a DNSCache"""
+    
+    def __init__(self, resolver: DNSCache, **kwargs):
+        """
+        Initializes the transport
+        
+        Args:
+            resolver: Shared DNS cache
+            **kwargs: httpx.AsyncHTTPTransport arguments
+        """
+        super().__init__(**kwargs)
+        # httpx does not expose the httpcore network backend
+        self._pool._network_backend = _ResolvingBackend(resolver, self._pool._network_backend)
+
+
 class HTTPMonitor:
     """HTTP monitor for page load time and return codes"""
     
-    def __init__(self, metrics_manager: MetricsManager):
+    def __init__(
+        self,
+        metrics_manager: MetricsManager,
+        resolver: Optional[DNSCache] = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 100,
+        keepalive_expiry: float = 120.0,
+        http2: bool = False,
+        fresh_connection_targets: Iterable[str] = (),
+        head_targets: Iterable[str] = (),
+        max_body_bytes: int = 10 * 1024 * 1024,
+        hash_body: bool = False,
+        loop_lag: Optional[LoopLagMonitor] = None
+    ):
         """
         Initializes the HTTP monitor
         
         Args:
             metrics_manager: Metrics manager
+            resolver: DNS cache shared with the other monitors (created if omitted)
+            max_connections: Connection limit of the shared client
+            max_keepalive_connections: Idle connections kept by the shared client
+            keepalive_expiry: Seconds an idle connection is kept (should exceed
+                HTTP_INTERVAL for checks to reuse it)
+            http2: Negotiate HTTP/2 via ALPN
+            fresh_connection_targets: Targets always checked on a new connection
+                (cold latency: TCP + TLS setup included)
+            head_targets: Targets probed with HEAD (status and latency only)
+            max_body_bytes: Stop reading the body after this many bytes (0 = no cap)
+            hash_body: Hash the body incrementally to count content changes
+            loop_lag: Event-loop lag monitor used to tag or discard timings
+                taken during a loop stall
         """
         self.metrics = metrics_manager
+        self.resolver = resolver or DNSCache(metrics_manager)
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.fresh_connection_targets = set(fresh_connection_targets)
+        self.head_targets = set(head_targets)
+        self.max_body_bytes = max_body_bytes
+        self.hash_body = hash_body
+        self._digests: Dict[str, str] = {}
+        # Interned attribute sets for the per-check record calls
+        self._target_attributes = AttributeCache("target")
+        self._response_attributes = AttributeCache("target", "http.method", "http.status_code")
+        self._phase_attributes = AttributeCache("target", "http.method", "http.redirect.hop")
+        self.loop_lag = loop_lag
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Returns the shared keep-alive client, creating it on first use"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                transport=CachedDNSTransport(self.resolver, limits=self.limits, http2=self.http2)
+            )
+        return self._client
+    
+    async def aclose(self):
+        """Closes the shared client and its pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _send(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        url: str,
+        timeout: float
+    ) -> Tuple[List[Any], Dict[str, Any]]:
+        """
+        Sends a request following redirects hop by hop, streaming each body
+        
+        Args:
+            client: Client to send with (must not follow redirects itself)
+            method: HTTP method
+            url: Initial URL
+            timeout: Per-hop timeout in seconds
+        
+        Returns:
+            (list of (response, PhaseTimer) per hop with the final response
+            last, body information of the final response)
+        """
+        hops = []
+        request = client.build_request(method, url, timeout=timeout)
+        while True:
+            timer = PhaseTimer()
+            request.extensions = {**request.extensions, "trace": timer.trace}
+            token = current_timer.set(timer)
+            try:
+                response = await client.send(request, stream=True, follow_redirects=False)
+            finally:
+                current_timer.reset(token)
+            hops.append((response, timer))
+            
+            final = response.next_request is None
+            body = await self._read_body(response, timer, self.hash_body and final)
+            if final:
+                return hops, body
+            if len(hops) > client.max_redirects:
+                raise httpx.TooManyRedirects("Exceeded maximum allowed redirects.", request=request)
+            request = response.next_request
     
-    async def check(self, target: str, timeout: float = 10.0) -> Dict[str, Any]:
+    async def _read_body(
+        self,
+        response: httpx.Response,
+        timer: PhaseTimer,
+        hash_body: bool
+    ) -> Dict[str, Any]:
+        """
+        Consumes a streamed body without buffering it
+        
+        Reading stops at max_body_bytes; the connection is then discarded
+        instead of being returned to the pool.
+        
+        Args:
+            response: Streamed response
+            timer: Timer of the hop (receives the transfer phase)
+            hash_body: Compute the SHA-256 of the bytes read
+        
+        Returns:
+            Dict with bytes read, truncation flag and digest (or None)
+        """
+        digest = hashlib.sha256() if hash_body else None
+        size = 0
+        truncated = False
+        start = time.perf_counter()
+        try:
+            async for chunk in response.aiter_bytes():
+                if self.max_body_bytes and size + len(chunk) > self.max_body_bytes:
+                    chunk = chunk[:self.max_body_bytes - size]
+                    truncated = True
+                size += len(chunk)
+                if digest is not None:
+                    digest.update(chunk)
+                if truncated:
+                    break
+        finally:
+            await response.aclose()
+        timer.add("transfer", time.perf_counter() - start)
+        
+        return {
+            "bytes": size,
+            "truncated": truncated,
+            "sha256": digest.hexdigest() if digest is not None else None
+        }
+    
+    def _track_content(self, target: str, method: str, sha256: Optional[str]):
+        """Counts a content change when the body digest differs from the previous check"""
+        if sha256 is None:
+            return
+        previous = self._digests.get(target)
+        self._digests[target] = sha256
+        if previous is not None and previous != sha256:
+            self.metrics.http_content_changes.add(1, {"target": target, "http.method": method})
+    
+    def _record_phases(self, target: str, method: str, hops: List[Any], tags: Dict[str, Any]):
+        """Records the phase histograms of every hop (tags: extra attributes, usually none)"""
+        histograms = {
+            "dns": self.metrics.http_dns_duration,
+            "connect": self.metrics.http_connect_duration,
+            "tls": self.metrics.http_tls_duration,
+            "ttfb": self.metrics.http_ttfb,
+            "transfer": self.metrics.http_transfer_duration,
+        }
+        for hop, (_, timer) in enumerate(hops):
+            attributes = self._phase_attributes.get(target, method, hop)
+            if tags:
+                attributes = {**attributes, **tags}
+            for phase, duration_ms in timer.phases_ms().items():
+                histograms[phase].record(duration_ms, attributes)
+    
+    async def check(
+        self,
+        target: str,
+        timeout: float = 10.0,
+        fresh_connection: Optional[bool] = None,
+        head_only: Optional[bool] = None
+    ) -> Dict[str, Any]:
         """
         Performs HTTP check on a target
                 
         Args:
             target: Target hostname
             timeout: Request timeout in seconds
+            fresh_connection: Use a new connection instead of the shared pool
+                (defaults to whether the target is in fresh_connection_targets)
+            head_only: Send HEAD instead of GET (defaults to whether the
+                target is in head_targets)
             
         Returns:
             Dict with HTTP request information
         """
         url = f"https://{target}"
+        if fresh_connection is None:
+            fresh_connection = target in self.fresh_connection_targets
+        if head_only is None:
+            head_only = target in self.head_targets
+        method = "HEAD" if head_only else "GET"
         
         try:
-            start_time = time.time()
+            start_time = time.perf_counter()
             
-            async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
-                response = await client.get(url)
+            if fresh_connection:
+                async with httpx.AsyncClient(
+                    transport=CachedDNSTransport(self.resolver, http2=self.http2)
+                ) as client:
+                    hops, body = await self._send(client, method, url, timeout)
+            else:
+                hops, body = await self._send(self._get_client(), method, url, timeout)
             
-            duration_ms = (time.time() - start_time) * 1000
+            end_time = time.perf_counter()
+            duration_ms = (end_time - start_time) * 1000
+            response = hops[-1][0]
+            self._track_content(target, method, body["sha256"])
             
-            self.metrics.http_duration.record(
-                duration_ms,
-                {
-                    "target": target,
-                    "http.method": "GET",
-                    "http.status_code": response.status_code
-                }
-            )
+            attributes = self._target_attributes.get(target)
+            response_attributes = self._response_attributes.get(target, method, response.status_code)
+            timing_attributes: Optional[Dict[str, Any]] = attributes
+            if self.loop_lag is not None:
+                timing_attributes = self.loop_lag.sample_attributes(
+                    "http", attributes, start_time, end_time
+                )
+            if timing_attributes is attributes:
+                self._record_phases(target, method, hops, {})
+                self.metrics.http_duration.record(duration_ms, response_attributes)
+            elif timing_attributes is not None:
+                # Tagged by the loop lag monitor
+                tags = {key: value for key, value in timing_attributes.items() if key not in attributes}
+                self._record_phases(target, method, hops, tags)
+                self.metrics.http_duration.record(duration_ms, {**response_attributes, **tags})
             
-            self.metrics.http_status.add(
-                1,
-                {
-                    "target": target,
-                    "http.method": "GET",
-                    "http.status_code": response.status_code
-                }
-            )
+            self.metrics.http_status.add(1, response_attributes)
             
             logger.info(
                 f"HTTP check - Target: {target}, "
@@ -74,7 +315,15 @@ class HTTPMonitor:
                 "url": url,
                 "status_code": response.status_code,
                 "duration_ms": duration_ms,
-                "content_length": len(response.content)
+                "method": method,
+                "content_length": body["bytes"],
+                "truncated": body["truncated"],
+                "sha256": body["sha256"],
+                "http_version": response.http_version,
+                "fresh_connection": fresh_connection,
+                "redirects": len(hops) - 1,
+                "phases_ms": [timer.phases_ms() for _, timer in hops],
+                "loop_stalled": timing_attributes is not attributes
             }
             
         except httpx.TimeoutException:
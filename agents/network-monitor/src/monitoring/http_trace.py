@@ -0,0 +1,76 @@
+"""
+HTTP request phase timing module
+"""
+import contextvars
+import time
+from typing import Any, Dict, Optional
+
+# httpcore trace step -> exported phase
+TRACE_PHASES = {
+    "connect_tcp": "connect",
+    "start_tls": "tls",
+    "receive_response_headers": "ttfb",
+}
+
+# Timer of the request being sent by the current task, so the network
+# backend can attribute DNS time (spent inside connect_tcp) to its phase
+current_timer: contextvars.ContextVar[Optional['PhaseTimer']] = contextvars.ContextVar(
+    'http_phase_timer', default=None
+)
+
+
+class PhaseTimer:
+    """
+    Collects the phase durations of one HTTP request from httpcore trace events
+    
+    The body transfer phase is added by the caller, which reads the body
+    itself (httpcore reports an early-closed body as failed).
+    """
+    
+    def __init__(self):
+        """Initializes an empty timer"""
+        self.durations: Dict[str, float] = {}
+        self._started: Dict[str, float] = {}
+    
+    async def trace(self, event_name: str, info: Dict[str, Any]):
+        """
+        httpcore trace extension callback
+        
+        Args:
+            event_name: Event such as "http11.receive_response_headers.started"
+            info: Event arguments (unused)
+        """
+        now = time.perf_counter()
+        parts = event_name.split('.')
+        if len(parts) != 3:
+            return
+        
+        _, step, state = parts
+        phase = TRACE_PHASES.get(step)
+        if phase is None:
+            return
+        
+        if state == "started":
+            self._started[phase] = now
+        elif state == "complete" and phase in self._started:
+            self.add(phase, now - self._started.pop(phase))
+    
+    def add(self, phase: str, seconds: float):
+        """Accumulates time spent in a phase"""
+        self.durations[phase] = self.durations.get(phase, 0.0) + seconds
+    
+    def phases_ms(self) -> Dict[str, float]:
+        """
+        Returns the measured phases in milliseconds
+        
+        DNS resolution happens inside the TCP connect step, so it is taken
+        out of the connect phase. Phases that did not happen (e.g. connect
+        and TLS on a reused connection) are omitted.
+        
+        Returns:
+            Dict of phase name to duration in milliseconds
+        """
+        durations = dict(self.durations)
+        if "connect" in durations and "dns" in durations:
+            durations["connect"] = max(durations["connect"] - durations["dns"], 0.0)
+        return {phase: seconds * 1000 for phase, seconds in durations.items()}
@@ -0,0 +1,432 @@
+"""
+Asyncio ICMP echo engine
+"""
+import asyncio
+import logging
+import os
+import socket
+import struct
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+
+_ICMP_HEADER = struct.Struct('!BBHHH')
+
+# Linux socket timestamping (not exposed by the socket module)
+SO_TIMESTAMPNS = 35
+SO_TIMESTAMPING = 37
+IP_RECVERR = 11
+SOF_TIMESTAMPING_TX_SOFTWARE = 1 << 1
+SOF_TIMESTAMPING_SOFTWARE = 1 << 4
+SOF_TIMESTAMPING_OPT_ID = 1 << 7
+SOF_TIMESTAMPING_OPT_TSONLY = 1 << 11
+SO_EE_ORIGIN_TIMESTAMPING = 4
+
+_TIMESPEC = struct.Struct('@ll')
+# struct sock_extended_err: errno, origin, type, code, pad, info, data
+_SOCK_EXTENDED_ERR = struct.Struct('@IBBBBII')
+_ANCILLARY_SIZE = 512
+
+# Called as on_reply(index, rtt, duplicate) for every reply of a burst
+ReplyCallback = Callable[[int, float, bool], None]
+
+
+def icmp_checksum(data: bytes) -> int:
+    """
+    Computes the RFC 1071 internet checksum
+    
+    Args:
+        data: Bytes to checksum
+    
+    Returns:
+        16-bit checksum
+    """
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def build_echo_request(identifier: int, sequence: int, payload: bytes) -> bytes:
+    """
+    Builds an ICMP echo request packet
+    
+    Args:
+        identifier: ICMP identifier
+        sequence: ICMP sequence number
+        payload: Echo payload
+    
+    Returns:
+        Packet bytes with checksum filled in
+    """
+    header = _ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, 0, identifier, sequence)
+    checksum = icmp_checksum(header + payload)
+    return _ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, checksum, identifier, sequence) + payload
+
+
+def parse_echo_reply(packet: bytes, has_ip_header: bool) -> Optional[Tuple[int, int]]:
+    """
+    Extracts identifier and sequence from an ICMP echo reply
+    
+    Args:
+        packet: Received datagram
+        has_ip_header: Whether the datagram starts with the IPv4 header (raw sockets)
+    
+    Returns:
+        (identifier, sequence) or None if the packet is not an echo reply
+    """
+    if has_ip_header:
+        if not packet:
+            return None
+        packet = packet[(packet[0] & 0x0F) * 4:]
+    
+    if len(packet) < _ICMP_HEADER.size:
+        return None
+    
+    icmp_type, _, _, identifier, sequence = _ICMP_HEADER.unpack_from(packet)
+    if icmp_type != ICMP_ECHO_REPLY:
+        return None
+    return identifier, sequence
+
+
+def parse_timespec(data: bytes) -> float:
+    """
+    Converts a struct timespec from a control message to seconds
+    
+    Args:
+        data: Control message data starting with a timespec
+    
+    Returns:
+        CLOCK_REALTIME timestamp in seconds
+    """
+    seconds, nanoseconds = _TIMESPEC.unpack_from(data)
+    return seconds + nanoseconds / 1e9
+
+
+class _PendingEcho:
+    """Echo request waiting for its reply"""
+    
+    __slots__ = ('address', 'sent_at', 'future', 'index', 'on_reply', 'timeout')
+    
+    def __init__(
+        self,
+        address: str,
+        sent_at: float,
+        future: asyncio.Future,
+        index: int = 0,
+        on_reply: Optional[ReplyCallback] = None,
+        timeout: float = float('inf')
+    ):
+        self.address = address
+        self.sent_at = sent_at
+        self.future = future
+        self.index = index
+        self.on_reply = on_reply
+        self.timeout = timeout
+
+
+class ICMPProber:
+    """Non-blocking ICMP echo prober multiplexing many targets on one socket"""
+    
+    def __init__(self, payload_size: int = 56, kernel_timestamps: bool = False):
+        """
+        Initializes the ICMP prober
+        
+        Args:
+            payload_size: Echo payload size in bytes
+            kernel_timestamps: Take send/receive times from the kernel
+                (SO_TIMESTAMPING/SO_TIMESTAMPNS) instead of user space
+        """
+        self.identifier = os.getpid() & 0xFFFF
+        self.payload = bytes(payload_size)
+        self.kernel_timestamps = kernel_timestamps
+        self._tx_timestamps = False
+        self._sock: Optional[socket.socket] = None
+        self._raw = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sequence = 0
+        self._pending: Dict[int, _PendingEcho] = {}
+        # SOF_TIMESTAMPING_OPT_ID key of the next send -> echo sequence
+        self._tx_key = 0
+        self._tx_sequences: Dict[int, int] = {}
+    
+    def _clock(self) -> float:
+        """Send-side clock matching the receive timestamps in use"""
+        # Kernel timestamps are CLOCK_REALTIME
+        return time.time() if self.kernel_timestamps else time.perf_counter()
+    
+    def _open(self):
+        """Opens the ICMP socket and registers it with the running event loop"""
+        try:
+            # Unprivileged ICMP (net.ipv4.ping_group_range)
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+            self._raw = False
+        except PermissionError:
+            # Requires CAP_NET_RAW
+            sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+            self._raw = True
+        
+        sock.setblocking(False)
+        if self.kernel_timestamps:
+            self._enable_timestamps(sock)
+        self._sock = sock
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(sock.fileno(), self._on_readable)
+        
+        logger.info(
+            f"ICMP prober ready ({'raw' if self._raw else 'datagram'} socket, "
+            f"{'kernel' if self.kernel_timestamps else 'user-space'} timestamps)"
+        )
+    
+    def _enable_timestamps(self, sock: socket.socket):
+        """Enables kernel receive (and, where supported, transmit) timestamps"""
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+        except OSError as e:
+            logger.warning(f"Kernel timestamps unavailable, using user-space timing: {e}")
+            self.kernel_timestamps = False
+            return
+        
+        try:
+            sock.setsockopt(
+                socket.SOL_SOCKET,
+                SO_TIMESTAMPING,
+                SOF_TIMESTAMPING_TX_SOFTWARE | SOF_TIMESTAMPING_SOFTWARE
+                | SOF_TIMESTAMPING_OPT_ID | SOF_TIMESTAMPING_OPT_TSONLY
+            )
+            self._tx_timestamps = True
+        except OSError as e:
+            # Receive timestamps alone still remove the reply-side scheduling delay
+            logger.warning(f"Kernel transmit timestamps unavailable: {e}")
+    
+    def _sent(self, sequence: int):
+        """Maps the OPT_ID key of a successful send to its echo sequence"""
+        if not self._tx_timestamps:
+            return
+        self._tx_sequences[self._tx_key] = sequence
+        self._tx_key = (self._tx_key + 1) & 0xFFFFFFFF
+        if len(self._tx_sequences) > 0x10000:
+            # Keys whose timestamp never came back
+            self._tx_sequences.pop(next(iter(self._tx_sequences)))
+    
+    def _next_sequence(self) -> int:
+        """Returns the next free 16-bit sequence number"""
+        for _ in range(0x10000):
+            self._sequence = (self._sequence + 1) & 0xFFFF
+            if self._sequence not in self._pending:
+                return self._sequence
+        raise RuntimeError("No free ICMP sequence numbers")
+    
+    async def ping(self, address: str, timeout: float = 2.0) -> Optional[float]:
+        """
+        Sends one echo request and waits for its reply
+        
+        Args:
+            address: Target IPv4 address
+            timeout: Timeout in seconds
+        
+        Returns:
+            Round-trip time in seconds or None on timeout
+        """
+        if self._sock is None:
+            self._open()
+        
+        sequence = self._next_sequence()
+        future = self._loop.create_future()
+        packet = build_echo_request(self.identifier, sequence, self.payload)
+        
+        self._pending[sequence] = _PendingEcho(address, self._clock(), future)
+        try:
+            self._sock.sendto(packet, (address, 0))
+            self._sent(sequence)
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._pending.pop(sequence, None)
+    
+    async def burst(
+        self,
+        address: str,
+        count: int,
+        interval: float = 0.0,
+        timeout: float = 2.0,
+        on_reply: Optional[ReplyCallback] = None
+    ) -> List[Optional[float]]:
+        """
+        Sends a burst of echo requests without waiting for each reply
+        
+        Echoes leave every `interval` seconds and replies are collected as
+        they arrive, so the round lasts about (count - 1) * interval + timeout
+        regardless of loss.
+        
+        Args:
+            address: Target IPv4 address
+            count: Number of echo requests
+            interval: Gap between consecutive echo requests in seconds
+            timeout: Per-echo timeout in seconds
+        
+        Returns:
+            Round-trip time in seconds (or None if lost) for each echo, in send order
+        """
+        if self._sock is None:
+            self._open()
+        
+        sequences = []
+        futures = []
+        last_sent_at = self._clock()
+        try:
+            for index in range(count):
+                if index and interval > 0:
+                    await asyncio.sleep(interval)
+                
+                sequence = self._next_sequence()
+                future = self._loop.create_future()
+                packet = build_echo_request(self.identifier, sequence, self.payload)
+                
+                last_sent_at = self._clock()
+                self._pending[sequence] = _PendingEcho(
+                    address, last_sent_at, future, index, on_reply, timeout
+                )
+                sequences.append(sequence)
+                futures.append(future)
+                
+                try:
+                    self._sock.sendto(packet, (address, 0))
+                    self._sent(sequence)
+                except OSError as e:
+                    logger.warning(f"ICMP send failed for {address}: {e}")
+                    future.set_result(None)
+            
+            waiting = [future for future in futures if not future.done()]
+            if waiting:
+                remaining = last_sent_at + timeout - self._clock()
+                await asyncio.wait(waiting, timeout=max(remaining, 0))
+            
+            results = []
+            for future in futures:
+                rtt = future.result() if future.done() else None
+                results.append(rtt if rtt is not None and rtt <= timeout else None)
+            return results
+        finally:
+            for sequence in sequences:
+                self._pending.pop(sequence, None)
+    
+    def _on_readable(self):
+        """Drains the socket and resolves the matching pending echoes"""
+        if self.kernel_timestamps:
+            if self._tx_timestamps:
+                # Transmit timestamps first: they precede any reply
+                self._drain_tx_timestamps()
+            self._receive_timestamped()
+            return
+        
+        while True:
+            try:
+                packet, (address, _) = self._sock.recvfrom(65535)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logger.warning(f"ICMP receive error: {e}")
+                return
+            self._handle_packet(packet, address, time.perf_counter())
+    
+    def _receive_timestamped(self):
+        """Drains the socket using the kernel receive timestamp of each datagram"""
+        while True:
+            try:
+                packet, ancillary, _, (address, _) = self._sock.recvmsg(65535, _ANCILLARY_SIZE)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logger.warning(f"ICMP receive error: {e}")
+                return
+            
+            received_at = None
+            for level, kind, data in ancillary:
+                if level == socket.SOL_SOCKET and kind == SO_TIMESTAMPNS:
+                    received_at = parse_timespec(data)
+            self._handle_packet(packet, address, received_at if received_at else time.time())
+    
+    def _drain_tx_timestamps(self):
+        """Reads transmit timestamps from the error queue into the pending echoes"""
+        while True:
+            try:
+                _, ancillary, _, _ = self._sock.recvmsg(
+                    0, _ANCILLARY_SIZE, socket.MSG_ERRQUEUE | socket.MSG_DONTWAIT
+                )
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logger.warning(f"ICMP error queue read failed: {e}")
+                return
+            
+            sent_at = None
+            key = None
+            for level, kind, data in ancillary:
+                if level == socket.SOL_SOCKET and kind == SO_TIMESTAMPING:
+                    # scm_timestamping: software, (deprecated), hardware
+                    sent_at = parse_timespec(data)
+                elif level == socket.IPPROTO_IP and kind == IP_RECVERR:
+                    error = _SOCK_EXTENDED_ERR.unpack_from(data)
+                    if error[1] == SO_EE_ORIGIN_TIMESTAMPING:
+                        key = error[6]
+            
+            if sent_at is None or key is None:
+                continue
+            pending = self._pending.get(self._tx_sequences.pop(key, -1))
+            # Only trust a timestamp taken after the user-space send time
+            # (guards against a key that drifted after a failed send)
+            if pending is not None and not pending.future.done() and sent_at >= pending.sent_at:
+                pending.sent_at = sent_at
+    
+    def _handle_packet(self, packet: bytes, address: str, received_at: float):
+        """
+        Matches a received datagram against the pending echoes
+        
+        Args:
+            packet: Received datagram
+            address: Source address
+            received_at: Reception time on the send-side clock (perf_counter(),
+                or the kernel timestamp in kernel timestamp mode)
+        """
+        reply = parse_echo_reply(packet, has_ip_header=self._raw)
+        if reply is None:
+            return
+        
+        identifier, sequence = reply
+        # Datagram sockets get their identifier rewritten by the kernel
+        # and only ever see their own replies
+        if self._raw and identifier != self.identifier:
+            return
+        
+        pending = self._pending.get(sequence)
+        if pending is None:
+            return
+        
+        if address != pending.address:
+            return
+        
+        rtt = received_at - pending.sent_at
+        duplicate = pending.future.done()
+        if not duplicate:
+            pending.future.set_result(rtt)
+        if pending.on_reply is not None and (duplicate or rtt <= pending.timeout):
+            pending.on_reply(pending.index, rtt, duplicate)
+    
+    def close(self):
+        """Closes the ICMP socket"""
+        if self._sock is None:
+            return
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.remove_reader(self._sock.fileno())
+        self._sock.close()
+        self._sock = None
+        self._tx_sequences.clear()
+        self._tx_key = 0
@@ -0,0 +1,122 @@
+"""
+Event-loop lag monitoring module
+"""
+import asyncio
+import collections
+import logging
+import time
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from src.metrics import MetricsManager
+
+logger = logging.getLogger(__name__)
+
+TAG = "tag"
+DISCARD = "discard"
+
+
+class LoopLagMonitor:
+    """Samples event-loop scheduling lag and remembers recent stalls"""
+    
+    def __init__(
+        self,
+        metrics_manager: Optional[MetricsManager] = None,
+        interval: float = 0.01,
+        stall_threshold: float = 0.05,
+        action: str = TAG,
+        history: int = 1024
+    ):
+        """
+        Initializes the lag monitor
+        
+        Args:
+            metrics_manager: Metrics manager (lag histogram, contaminated samples)
+            interval: Sampling period in seconds
+            stall_threshold: Lag in seconds from which a sample counts as a stall
+            action: What to do with probe samples overlapping a stall:
+                "tag" adds loop.stalled=true, "discard" drops them
+            history: Number of recent stalls kept for overlap checks
+        """
+        if action not in (TAG, DISCARD):
+            raise ValueError(f"Invalid loop stall action {action!r}, expected 'tag' or 'discard'")
+        self.metrics = metrics_manager
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.action = action
+        # (start, end) perf_counter() windows of past stalls, oldest first
+        self.stalls: Deque[Tuple[float, float]] = collections.deque(maxlen=history)
+        self._expected: Optional[float] = None
+    
+    async def run(self, should_run: Callable[[], bool]):
+        """
+        Samples the loop lag until should_run() returns False
+        
+        Args:
+            should_run: Predicate checked between samples
+        """
+        while should_run():
+            self._expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(now - self._expected, 0.0)
+            
+            if self.metrics is not None:
+                self.metrics.loop_lag.record(lag * 1000)
+            if lag >= self.stall_threshold:
+                self.stalls.append((self._expected, now))
+                logger.warning(f"Event loop stalled for {lag * 1000:.1f}ms")
+        self._expected = None
+    
+    def overlaps_stall(self, start: float, end: float) -> bool:
+        """
+        Whether a measurement window overlapped a loop stall
+        
+        A stall still in progress (the sampler is overdue) also counts, since
+        the probe may resume before the sampler does.
+        
+        Args:
+            start: perf_counter() at the start of the measurement
+            end: perf_counter() at the end of the measurement
+        
+        Returns:
+            True if the window intersects a stall
+        """
+        if self._expected is not None and time.perf_counter() - self._expected >= self.stall_threshold:
+            if self._expected <= end:
+                return True
+        
+        for stall_start, stall_end in reversed(self.stalls):
+            if stall_end < start:
+                break
+            if stall_start <= end:
+                return True
+        return False
+    
+    def sample_attributes(
+        self,
+        probe: str,
+        attributes: Dict[str, Any],
+        start: float,
+        end: float
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Applies the stall policy to a latency sample
+        
+        Args:
+            probe: Probe type ("ping", "http" or "tcp")
+            attributes: Attributes the sample would be recorded with
+            start: perf_counter() at the start of the measurement
+            end: perf_counter() at the end of the measurement
+        
+        Returns:
+            Attributes to record with (tagged if contaminated), or None if
+            the sample must be discarded
+        """
+        if not self.overlaps_stall(start, end):
+            return attributes
+        
+        if self.metrics is not None:
+            self.metrics.contaminated_samples.add(1, {"probe": probe, "action": self.action})
+        if self.action == DISCARD:
+            return None
+        return {**attributes, "loop.stalled": True}
@@ -2,12 +2,24 @@
 Network Monitor orchestrator
 """
 import asyncio
+import functools
 import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
 
 from src.utils import Config
 from src.metrics import MetricsManager
+from .adaptive import AdaptiveInterval, health_signal
+from .budget import ProbeBudget
+from .circuit_breaker import HALF_OPEN, STATE_VALUES, CircuitBreaker, is_unreachable
+from .dns_cache import DNSCache
+from .icmp import ICMPProber
+from .loop_lag import LoopLagMonitor
 from .ping_monitor import PingMonitor
 from .http_monitor import HTTPMonitor
+from .tcp_monitor import TCPMonitor
+from .scheduler import ProbeScheduler
 
 logger = logging.getLogger(__name__)
 
@@ -15,23 +27,109 @@ logger = logging.getLogger(__name__)
 class NetworkMonitor:
     """Network monitor with OpenTelemetry"""
     
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, worker_id: Optional[int] = None):
         """
         Initializes the network monitor
         
         Args:
             config: Monitor configuration
+            worker_id: Worker process id when running in a WorkerPool
         """
         self.config = config
         self.running = False
+        # Epoch of the last probe that measured its target (readiness)
+        self.last_round: Optional[float] = None
+        
+        wal_dir = None
+        if config.wal_enabled:
+            # Worker processes must not share a log
+            wal_dir = config.wal_dir if worker_id is None else os.path.join(config.wal_dir, f"worker-{worker_id}")
         
         self.metrics_manager = MetricsManager(
             service_name=config.service_name,
-            otel_endpoint=config.otel_endpoint
+            otel_endpoint=config.otel_endpoint,
+            worker_id=worker_id,
+            histogram_buckets=config.histogram_buckets,
+            exponential_histograms=config.exponential_histograms,
+            exponential_max_size=config.exponential_max_size,
+            otel_protocol=config.otel_protocol,
+            export_interval_ms=config.otel_export_interval_ms,
+            export_timeout_ms=config.otel_export_timeout_ms,
+            temporality=config.otel_temporality,
+            compression=config.otel_compression,
+            max_export_batch_size=config.otel_max_export_batch_size,
+            wal_dir=wal_dir,
+            wal_max_bytes=config.wal_max_bytes,
+            wal_segment_bytes=config.wal_segment_bytes,
+            wal_fsync=config.wal_fsync,
+            wal_replay_rate=config.wal_replay_rate,
+            export_queue_size=config.export_queue_size,
+            export_drop_policy=config.export_drop_policy,
+            export_priorities=config.export_priorities,
+            metrics_exporter=config.metrics_exporter,
+            victoriametrics_url=config.victoriametrics_url,
+            victoriametrics_max_batch_samples=config.victoriametrics_max_batch_samples,
+            # /metrics is served by the parent process, so only a single monitor can expose it
+            prometheus_enabled=config.prometheus_enabled and worker_id is None
+        )
+        
+        self.dns_cache = DNSCache(
+            self.metrics_manager,
+            min_ttl=config.dns_min_ttl,
+            max_ttl=config.dns_max_ttl,
+            negative_ttl=config.dns_negative_ttl
+        )
+        
+        self.loop_lag = None
+        if config.loop_lag_enabled:
+            self.loop_lag = LoopLagMonitor(
+                self.metrics_manager,
+                interval=config.loop_lag_interval,
+                stall_threshold=config.loop_stall_threshold,
+                action=config.loop_stall_action
+            )
+        
+        self.ping_monitor = PingMonitor(
+            self.metrics_manager,
+            prober=ICMPProber(kernel_timestamps=config.kernel_timestamps),
+            resolver=self.dns_cache,
+            loop_lag=self.loop_lag
+        )
+        self.http_monitor = HTTPMonitor(
+            self.metrics_manager,
+            resolver=self.dns_cache,
+            max_connections=config.http_max_connections,
+            max_keepalive_connections=config.http_max_keepalive_connections,
+            keepalive_expiry=config.http_keepalive_expiry,
+            http2=config.http2,
+            fresh_connection_targets=config.http_fresh_connection_targets,
+            head_targets=config.http_head_targets,
+            max_body_bytes=config.http_max_body_bytes,
+            hash_body=config.http_hash_body,
+            loop_lag=self.loop_lag
+        )
+        self.tcp_monitor = TCPMonitor(
+            self.metrics_manager,
+            resolver=self.dns_cache,
+            tls_targets=config.tcp_tls_targets,
+            loop_lag=self.loop_lag,
+            kernel_timestamps=config.kernel_timestamps
+        )
+        
+        # Shared by every probe type so the in-flight count and start rate stay bounded
+        self.budget = ProbeBudget(
+            max_in_flight=config.max_concurrent_probes,
+            rate=config.probe_rate_limit,
+            burst=config.probe_burst or None,
+            weights=config.probe_weights,
+            max_queue_delay=config.probe_max_queue_delay,
+            metrics_manager=self.metrics_manager
         )
         
-        self.ping_monitor = PingMonitor(self.metrics_manager)
-        self.http_monitor = HTTPMonitor(self.metrics_manager)
+        # Adaptive interval controllers keyed by (probe, target)
+        self.intervals: Dict[Tuple[str, str], AdaptiveInterval] = {}
+        # Circuit breakers keyed by (probe, target)
+        self.breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
         
         logger.info(f"Network Monitor initialized with targets: {config.targets}")
 
@@ -43,7 +141,9 @@ class NetworkMonitor:
         try:
             await asyncio.gather(
                 self._ping_loop(),
-                self._http_loop()
+                self._http_loop(),
+                self._tcp_loop(),
+                self._lag_loop()
             )
         except KeyboardInterrupt:
             logger.info("Shutting down gracefully...")
@@ -51,6 +151,13 @@ class NetworkMonitor:
         except Exception as e:
             logger.error(f"Monitor error: {e}")
             self.running = False
+        finally:
+            await self.http_monitor.aclose()
+            self.ping_monitor.prober.close()
+    
+    def last_export(self) -> Optional[float]:
+        """Epoch of the last export accepted by the backend (None = never)"""
+        return self.metrics_manager.last_export()
     
     async def stop(self):
         """Stops the monitor"""
@@ -59,22 +166,155 @@ class NetworkMonitor:
     
     async def _ping_loop(self):
         """Ping checks loop"""
-        while self.running:
-            logger.info("Starting ping checks...")
-            tasks = [
-                self.ping_monitor.check(target) 
-                for target in self.config.targets
-            ]
-            await asyncio.gather(*tasks)
-            await asyncio.sleep(self.config.ping_interval)
+        logger.info("Starting ping checks...")
+        scheduler = self._scheduler()
+        scheduler.add_targets(
+            "ping", self.config.targets, self.config.ping_interval, self._runner("ping", self._ping)
+        )
+        await scheduler.run(lambda: self.running)
     
     async def _http_loop(self):
         """HTTP checks loop"""
-        while self.running:
-            logger.info("Starting HTTP checks...")
-            tasks = [
-                self.http_monitor.check(target) 
-                for target in self.config.targets
-            ]
-            await asyncio.gather(*tasks)
-            await asyncio.sleep(self.config.http_interval)
+        logger.info("Starting HTTP checks...")
+        scheduler = self._scheduler()
+        scheduler.add_targets(
+            "http", self.config.targets, self.config.http_interval, self._runner("http", self._http)
+        )
+        await scheduler.run(lambda: self.running)
+    
+    async def _tcp_loop(self):
+        """TCP connect checks loop (only runs when TCP targets are configured)"""
+        if not self.config.tcp_targets:
+            return
+        logger.info("Starting TCP checks...")
+        scheduler = self._scheduler()
+        scheduler.add_targets(
+            "tcp", self.config.tcp_targets, self.config.tcp_interval, self._runner("tcp", self._tcp)
+        )
+        await scheduler.run(lambda: self.running)
+    
+    async def _lag_loop(self):
+        """Event-loop lag sampling loop (when enabled)"""
+        if self.loop_lag is None:
+            return
+        await self.loop_lag.run(lambda: self.running)
+    
+    def _runner(self, probe: str, run: Callable[..., Awaitable]) -> Callable[[str], Awaitable]:
+        """Wraps a probe runner with its per-target circuit breaker (if enabled)"""
+        if not self.config.breaker_enabled:
+            return run
+        return functools.partial(self._guarded, probe, run)
+    
+    def _breaker(self, probe: str, target: str) -> CircuitBreaker:
+        """Returns the circuit breaker of a (probe, target), creating it closed"""
+        key = (probe, target)
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                failure_threshold=self.config.breaker_failure_threshold,
+                base_backoff=self.config.breaker_base_backoff,
+                max_backoff=self.config.breaker_max_backoff
+            )
+            self.breakers[key] = breaker
+            self._export_breaker(probe, target, breaker)
+        return breaker
+    
+    def _export_breaker(self, probe: str, target: str, breaker: CircuitBreaker):
+        """Exports the breaker state gauge"""
+        self.metrics_manager.breaker_state.set(
+            STATE_VALUES[breaker.state], {"target": target, "probe": probe}
+        )
+    
+    async def _guarded(self, probe: str, run: Callable[..., Awaitable], target: str) -> Dict[str, Any]:
+        """
+        Runs a probe through its circuit breaker
+        
+        While open, ticks are skipped without any network I/O; once the
+        back-off elapses a lightweight recovery probe decides whether the
+        breaker closes again.
+        
+        Args:
+            probe: Probe type
+            run: Probe runner accepting (target, recovery=bool)
+            target: Target of the probe
+        
+        Returns:
+            The probe result, or a skipped marker while the breaker is open
+        """
+        breaker = self._breaker(probe, target)
+        previous = breaker.state
+        if not breaker.allow():
+            return {"target": target, "skipped": True, "breaker": breaker.state}
+        
+        result = None
+        try:
+            result = await run(target, recovery=breaker.state == HALF_OPEN)
+            return result
+        finally:
+            breaker.record(not is_unreachable(probe, result))
+            if breaker.state != previous:
+                logger.warning(f"{probe} circuit breaker for {target}: {previous} -> {breaker.state}")
+                self._export_breaker(probe, target, breaker)
+    
+    def _scheduler(self) -> ProbeScheduler:
+        """Creates a probe scheduler sharing the global probe budget"""
+        return ProbeScheduler(
+            budget=self.budget,
+            seed=self.config.schedule_seed,
+            on_missed=self._record_missed,
+            on_complete=self._on_complete
+        )
+    
+    def _on_complete(self, job, result):
+        """Marks progress for readiness and adapts the job's interval (if enabled)"""
+        # Only rounds that produced a measurement count: error results
+        # (timeouts, refusals, socket failures) and breaker skips do not
+        if result is not None and "error" not in result and not result.get("skipped"):
+            self.last_round = time.time()
+        if self.config.adaptive_intervals:
+            self._adapt_interval(job, result)
+    
+    def _record_missed(self, job, ticks: int):
+        """Records ticks skipped because a probe overran its interval"""
+        logger.warning(f"{job.name} check for {job.target} overran its interval, skipped {ticks} tick(s)")
+        self.metrics_manager.missed_ticks.add(ticks, {"target": job.target, "probe": job.name})
+    
+    def _adapt_interval(self, job, result):
+        """Adapts a job's interval to its target's health and exports it"""
+        if result and result.get("skipped"):
+            return
+        
+        key = (job.name, job.target)
+        controller = self.intervals.get(key)
+        if controller is None:
+            controller = AdaptiveInterval(
+                job.interval,
+                floor=job.interval * self.config.adaptive_floor_ratio,
+                ceiling=job.interval * self.config.adaptive_ceiling_ratio
+            )
+            self.intervals[key] = controller
+        
+        value, failed = health_signal(job.name, result)
+        interval = controller.observe(value, failed)
+        if interval != job.interval:
+            logger.info(f"{job.name} interval for {job.target}: {job.interval:.1f}s -> {interval:.1f}s")
+            job.interval = interval
+        self.metrics_manager.probe_interval.set(interval, {"target": job.target, "probe": job.name})
+    
+    async def _ping(self, target: str, recovery: bool = False):
+        """Runs one ping check (a single echo as a breaker recovery probe)"""
+        return await self.ping_monitor.check(
+            target,
+            ping_count=1 if recovery else self.config.ping_count,
+            timeout=self.config.ping_timeout,
+            interval=self.config.ping_packet_interval,
+            burst=self.config.ping_burst
+        )
+    
+    async def _http(self, target: str, recovery: bool = False):
+        """Runs one HTTP check (HEAD as a breaker recovery probe)"""
+        return await self.http_monitor.check(target, head_only=True if recovery else None)
+    
+    async def _tcp(self, target: str, recovery: bool = False):
+        """Runs one TCP connect check (already lightweight, also used for recovery)"""
+        return await self.tcp_monitor.check(target, timeout=self.config.tcp_timeout)
@@ -3,11 +3,15 @@ Ping monitoring module
 """
 import asyncio
 import logging
-from typing import Dict, Any
-
-import ping3
+import time
+from typing import Dict, Any, List, Optional, Tuple
 
+from src.attributes import AttributeCache
 from src.metrics import MetricsManager
+from .dns_cache import DNSCache
+from .icmp import ICMPProber
+from .loop_lag import LoopLagMonitor
+from .rtt_stats import RTTStats
 
 logger = logging.getLogger(__name__)
 
@@ -15,16 +19,49 @@ logger = logging.getLogger(__name__)
 class PingMonitor:
     """Ping monitor for latency and packet loss"""
     
-    def __init__(self, metrics_manager: MetricsManager):
+    def __init__(
+        self,
+        metrics_manager: MetricsManager,
+        prober: Optional[ICMPProber] = None,
+        resolver: Optional[DNSCache] = None,
+        loop_lag: Optional[LoopLagMonitor] = None
+    ):
         """
         Initializes the ping monitor
         
         Args:
             metrics_manager: Metrics manager
+            prober: ICMP prober shared by all targets (created if omitted)
+            resolver: DNS cache shared with the other monitors (created if omitted)
+            loop_lag: Event-loop lag monitor used to tag or discard RTT
+                samples taken during a loop stall
         """
         self.metrics = metrics_manager
+        self.prober = prober or ICMPProber()
+        self.resolver = resolver or DNSCache(metrics_manager)
+        self.loop_lag = loop_lag
+        self._attributes = AttributeCache("target")
+    
+    async def _resolve(self, target: str) -> str:
+        """
+        Resolves a target to an IPv4 address through the DNS cache
+        
+        Args:
+            target: Target hostname or IP
+            
+        Returns:
+            IPv4 address
+        """
+        return await self.resolver.resolve(target)
     
-    async def check(self, target: str, ping_count: int = 10, timeout: float = 2.0) -> Dict[str, Any]:
+    async def check(
+        self,
+        target: str,
+        ping_count: int = 10,
+        timeout: float = 2.0,
+        interval: float = 0.1,
+        burst: bool = True
+    ) -> Dict[str, Any]:
         """
         Performs ping check on a target
                 
@@ -32,55 +69,138 @@ class PingMonitor:
             target: Target hostname or IP
             ping_count: Number of pings to execute
             timeout: Timeout in seconds for each ping
+            interval: Gap in seconds between consecutive pings
+            burst: Send all pings without waiting for each reply
             
         Returns:
             Dict with ping statistics
         """
         try:
-            successful_pings = 0
-            total_rtt = 0
+            stats = RTTStats()
+            address = await self._resolve(target)
             
-            for _ in range(ping_count):
-                try:
-                    ping_in_secs = ping3.ping(target, timeout=timeout)
-                    
-                    if ping_in_secs is not None:
-                        successful_pings += 1
-                        rtt_ms = ping_in_secs * 1000
-                        total_rtt += rtt_ms
-                        
-                        self.metrics.ping_rtt.record(
-                            rtt_ms,
-                            {"target": target}
-                        )
-                    
-                    await asyncio.sleep(0.1)  # 100ms
-                    
-                except Exception as e:
-                    logger.warning(f"Ping failed for {target}: {e}")
+            round_start = time.perf_counter()
+            if burst:
+                rtts = await self.prober.burst(
+                    address,
+                    ping_count,
+                    interval=interval,
+                    timeout=timeout,
+                    on_reply=stats.add_reply
+                )
+            else:
+                rtts = await self._sequential(target, address, ping_count, timeout, interval)
+                for index, rtt in enumerate(rtts):
+                    if rtt is not None:
+                        stats.add_reply(index, rtt)
             
-            packet_loss = ((ping_count - successful_pings) / ping_count) * 100
-            avg_rtt = total_rtt / successful_pings if successful_pings > 0 else 0
+            for rtt in rtts:
+                stats.add_outcome(lost=rtt is None)
             
-            self.metrics.ping_packet_loss.record(
-                packet_loss,
-                {"target": target}
-            )
+            summary = stats.summary(scale=1000)
+            packet_loss = stats.packet_loss
+            window = (round_start, time.perf_counter())
+            stalled = self._record_round(target, stats.sent, stats.received, summary, window)
             
             logger.info(
                 f"Ping check - Target: {target}, "
-                f"RTT: {avg_rtt:.2f}ms, "
+                f"RTT: {summary['mean_rtt']:.2f}ms, "
+                f"Jitter: {summary['jitter']:.2f}ms, "
                 f"Packet Loss: {packet_loss:.1f}%"
             )
             
             return {
                 "target": target,
-                "avg_rtt_ms": avg_rtt,
+                "avg_rtt_ms": summary['mean_rtt'],
+                "min_rtt_ms": summary['min_rtt'],
+                "max_rtt_ms": summary['max_rtt'],
+                "stddev_rtt_ms": summary['stddev_rtt'],
+                "jitter_ms": summary['jitter'],
                 "packet_loss_percent": packet_loss,
-                "successful_pings": successful_pings,
-                "total_pings": ping_count
+                "max_loss_run": summary['max_loss_run'],
+                "reordered": summary['reordered'],
+                "duplicates": summary['duplicates'],
+                "successful_pings": stats.received,
+                "total_pings": ping_count,
+                "loop_stalled": stalled
             }
             
         except Exception as e:
             logger.error(f"Ping check error for {target}: {e}")
             return {"target": target, "error": str(e)}
+    
+    def _record_round(
+        self,
+        target: str,
+        sent: int,
+        received: int,
+        summary: Dict[str, Any],
+        window: Optional[Tuple[float, float]] = None
+    ) -> bool:
+        """
+        Records one round of ping statistics (a fixed set of points per round)
+        
+        Args:
+            target: Target hostname or IP
+            sent: Number of echo requests sent
+            received: Number of replies received
+            summary: RTTStats summary in milliseconds
+            window: perf_counter() start and end of the round (for loop stall checks)
+        
+        Returns:
+            True if the round overlapped an event-loop stall
+        """
+        attributes = self._attributes.get(target)
+        rtt_attributes: Optional[Dict[str, Any]] = attributes
+        # Kernel timestamps are taken outside the event loop and need no check
+        if (
+            received > 0
+            and self.loop_lag is not None
+            and window is not None
+            and not self.prober.kernel_timestamps
+        ):
+            rtt_attributes = self.loop_lag.sample_attributes("ping", attributes, *window)
+        
+        if received > 0 and rtt_attributes is not None:
+            self.metrics.ping_rtt.record(summary['mean_rtt'], rtt_attributes)
+        # Gauges keep exporting the last value of every attribute set, so a
+        # tagged set would linger forever: stalled rounds leave them untouched
+        if received > 0 and rtt_attributes is attributes:
+            self.metrics.ping_rtt_min.set(summary['min_rtt'], attributes)
+            self.metrics.ping_rtt_max.set(summary['max_rtt'], attributes)
+            self.metrics.ping_rtt_stddev.set(summary['stddev_rtt'], attributes)
+            self.metrics.ping_jitter.set(summary['jitter'], attributes)
+        
+        # Loss over any window is 1 - increase(received) / increase(sent)
+        self.metrics.ping_sent.add(sent, attributes)
+        self.metrics.ping_received.add(min(received, sent), attributes)
+        self.metrics.ping_loss_run.set(summary['max_loss_run'], attributes)
+        self.metrics.ping_reordered.add(summary['reordered'], attributes)
+        self.metrics.ping_duplicates.add(summary['duplicates'], attributes)
+        return rtt_attributes is not attributes
+    
+    async def _sequential(
+        self,
+        target: str,
+        address: str,
+        ping_count: int,
+        timeout: float,
+        interval: float
+    ) -> List[Optional[float]]:
+        """
+        Sends pings one at a time, waiting for each reply
+        
+        Returns:
+            Round-trip time in seconds (or None if lost) for each ping
+        """
+        rtts = []
+        for _ in range(ping_count):
+            try:
+                rtts.append(await self.prober.ping(address, timeout=timeout))
+            except Exception as e:
+                logger.warning(f"Ping failed for {target}: {e}")
+                rtts.append(None)
+            
+            await asyncio.sleep(interval)
+        
+        return rtts
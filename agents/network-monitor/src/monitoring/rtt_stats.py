@@ -0,0 +1,105 @@
+"""
+Streaming RTT statistics module
+"""
+import math
+from typing import Dict, Any
+
+
+class RTTStats:
+    """Constant-memory RTT accumulator for one ping round"""
+    
+    def __init__(self):
+        """Initializes an empty round"""
+        self.sent = 0
+        self.received = 0
+        self.min_rtt = math.inf
+        self.max_rtt = 0.0
+        self.mean_rtt = 0.0
+        self._m2 = 0.0
+        self.jitter = 0.0
+        self._last_rtt = None
+        self._highest_index = -1
+        self.reordered = 0
+        self.duplicates = 0
+        self.max_loss_run = 0
+        self._loss_run = 0
+    
+    def add_reply(self, index: int, rtt: float, duplicate: bool = False):
+        """
+        Adds a reply in arrival order (Welford mean/variance, jitter, reordering)
+        
+        Args:
+            index: Position of the echo in the round (send order)
+            rtt: Round-trip time
+            duplicate: Whether this echo was already answered
+        """
+        if duplicate:
+            self.duplicates += 1
+            return
+        
+        if index < self._highest_index:
+            self.reordered += 1
+        else:
+            self._highest_index = index
+        
+        self.received += 1
+        delta = rtt - self.mean_rtt
+        self.mean_rtt += delta / self.received
+        self._m2 += delta * (rtt - self.mean_rtt)
+        self.min_rtt = min(self.min_rtt, rtt)
+        self.max_rtt = max(self.max_rtt, rtt)
+        
+        # RFC 3550 section 6.4.1: J += (|D| - J) / 16
+        if self._last_rtt is not None:
+            self.jitter += (abs(rtt - self._last_rtt) - self.jitter) / 16
+        self._last_rtt = rtt
+    
+    def add_outcome(self, lost: bool):
+        """
+        Adds an echo outcome in send order (longest consecutive loss run)
+        
+        Args:
+            lost: Whether the echo went unanswered
+        """
+        self.sent += 1
+        if lost:
+            self._loss_run += 1
+            self.max_loss_run = max(self.max_loss_run, self._loss_run)
+        else:
+            self._loss_run = 0
+    
+    @property
+    def stddev(self) -> float:
+        """Sample standard deviation of the RTT"""
+        if self.received < 2:
+            return 0.0
+        return math.sqrt(self._m2 / (self.received - 1))
+    
+    @property
+    def packet_loss(self) -> float:
+        """Packet loss percentage"""
+        if self.sent == 0:
+            return 0.0
+        return (self.sent - min(self.received, self.sent)) / self.sent * 100
+    
+    def summary(self, scale: float = 1.0) -> Dict[str, Any]:
+        """
+        Returns the round statistics
+        
+        Args:
+            scale: Factor applied to time values (e.g. 1000 for seconds to ms)
+        
+        Returns:
+            Dict with RTT, jitter, loss and ordering statistics
+        """
+        received = self.received > 0
+        return {
+            "min_rtt": self.min_rtt * scale if received else 0,
+            "max_rtt": self.max_rtt * scale,
+            "mean_rtt": self.mean_rtt * scale,
+            "stddev_rtt": self.stddev * scale,
+            "jitter": self.jitter * scale,
+            "max_loss_run": self.max_loss_run,
+            "reordered": self.reordered,
+            "duplicates": self.duplicates
+        }
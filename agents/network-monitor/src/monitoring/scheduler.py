@@ -0,0 +1,225 @@
+"""
+Probe scheduler module
+"""
+import asyncio
+import hashlib
+import heapq
+import itertools
+import logging
+import math
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+from .budget import ProbeBudget
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on how long the scheduler sleeps before re-checking should_run
+MAX_IDLE_WAIT = 1.0
+
+
+def phase_offset(key: str, interval: float, seed: str = "") -> float:
+    """
+    Deterministic phase for a job, stable across restarts
+    
+    Args:
+        key: Job key (probe type and target)
+        interval: Job interval in seconds
+        seed: Per-agent seed so different agents do not fire in lockstep
+    
+    Returns:
+        Offset in [0, interval)
+    """
+    digest = hashlib.sha1(f"{seed}:{key}".encode()).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64 * interval
+
+
+class ProbeJob:
+    """Recurring probe of one target"""
+    
+    __slots__ = ('name', 'target', 'interval', 'run', 'next_due', 'missed')
+    
+    def __init__(
+        self,
+        name: str,
+        target: str,
+        interval: float,
+        run: Callable[[], Awaitable],
+        next_due: float
+    ):
+        self.name = name
+        self.target = target
+        self.interval = interval
+        self.run = run
+        self.next_due = next_due
+        self.missed = 0
+
+
+class ProbeScheduler:
+    """Heap-based fixed-rate scheduler running each probe job on its own cadence"""
+    
+    def __init__(
+        self,
+        max_concurrency: int = 100,
+        budget: Optional[ProbeBudget] = None,
+        seed: str = "",
+        on_missed: Optional[Callable[[ProbeJob, int], None]] = None,
+        on_complete: Optional[Callable[[ProbeJob, Any], None]] = None
+    ):
+        """
+        Initializes the scheduler
+        
+        Args:
+            max_concurrency: Maximum number of probes in flight
+            budget: Probe budget shared with other schedulers (overrides max_concurrency)
+            seed: Phase seed (see phase_offset)
+            on_missed: Called with (job, ticks) when a run overran its period
+            on_complete: Called with (job, result) after every run, before the
+                job is rescheduled (result is None if the run raised); it may
+                change job.interval, re-anchoring the grid on the current tick
+        """
+        self.budget = budget or ProbeBudget(max_in_flight=max_concurrency)
+        self.seed = seed
+        self.on_missed = on_missed
+        self.on_complete = on_complete
+        self._heap: List[Tuple[float, int, ProbeJob]] = []
+        self._counter = itertools.count()
+        self._tasks: Set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+    
+    def add(
+        self,
+        name: str,
+        target: str,
+        interval: float,
+        run: Callable[[], Awaitable],
+        phase: Optional[float] = None
+    ) -> ProbeJob:
+        """
+        Adds a recurring job
+        
+        Runs are due at wall-clock multiples of the interval plus the phase,
+        so samples line up with the configured interval across restarts.
+        
+        Args:
+            name: Probe type (e.g. "ping", "http")
+            target: Target hostname
+            interval: Seconds between consecutive runs (start to start, positive)
+            run: Coroutine function executing one probe
+            phase: Offset within the interval (hash of name/target if omitted)
+        
+        Returns:
+            The scheduled job
+        """
+        if not interval > 0:
+            raise ValueError(f"Invalid interval {interval!r} for {name} {target}, expected a positive number of seconds")
+        if phase is None:
+            phase = phase_offset(f"{name}:{target}", interval, self.seed)
+        
+        now_wall = time.time()
+        next_wall = (math.floor((now_wall - phase) / interval) + 1) * interval + phase
+        job = ProbeJob(name, target, interval, run, time.monotonic() + (next_wall - now_wall))
+        self._push(job)
+        return job
+    
+    def add_targets(
+        self,
+        name: str,
+        targets: List[str],
+        interval: float,
+        run: Callable[[str], Awaitable]
+    ) -> List[ProbeJob]:
+        """
+        Adds one job per target, each with its own hash-based phase
+        
+        Args:
+            name: Probe type
+            targets: Target hostnames
+            interval: Seconds between runs of each target
+            run: Coroutine function receiving the target
+        
+        Returns:
+            The scheduled jobs
+        """
+        return [
+            self.add(name, target, interval, lambda target=target: run(target))
+            for target in targets
+        ]
+    
+    def _push(self, job: ProbeJob):
+        """Pushes a job onto the heap and wakes the dispatcher"""
+        heapq.heappush(self._heap, (job.next_due, next(self._counter), job))
+        self._wakeup.set()
+    
+    @property
+    def in_flight(self) -> int:
+        """Number of probes currently running"""
+        return len(self._tasks)
+    
+    async def run(self, should_run: Callable[[], bool]):
+        """
+        Dispatches due jobs until should_run() returns False
+        
+        Args:
+            should_run: Predicate checked between dispatches
+        """
+        try:
+            while should_run():
+                self._wakeup.clear()
+                if not self._heap:
+                    await self._wait(MAX_IDLE_WAIT)
+                    continue
+                
+                due = self._heap[0][0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    await self._wait(min(delay, MAX_IDLE_WAIT))
+                    continue
+                
+                _, _, job = heapq.heappop(self._heap)
+                if not await self.budget.acquire(job.name):
+                    # Shed by the budget: this tick is dropped
+                    self._reschedule(job)
+                    continue
+                task = asyncio.create_task(self._execute(job))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        finally:
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+    
+    async def _wait(self, timeout: float):
+        """Sleeps until timeout or until a job is (re)scheduled"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    
+    async def _execute(self, job: ProbeJob):
+        """Runs one probe and reschedules its job"""
+        result = None
+        try:
+            result = await job.run()
+        except Exception as e:
+            logger.error(f"{job.name} probe error for {job.target}: {e}")
+        finally:
+            self.budget.release(job.name)
+            if self.on_complete is not None:
+                try:
+                    self.on_complete(job, result)
+                except Exception as e:
+                    logger.error(f"Completion hook error for {job.name} {job.target}: {e}")
+            self._reschedule(job)
+    
+    def _reschedule(self, job: ProbeJob):
+        """Advances a job to its next tick, skipping (and counting) ticks it overran"""
+        next_due = job.next_due + job.interval
+        now = time.monotonic()
+        if next_due <= now:
+            missed = math.floor((now - next_due) / job.interval) + 1
+            next_due += missed * job.interval
+            job.missed += missed
+            if self.on_missed is not None:
+                self.on_missed(job, missed)
+        job.next_due = next_due
+        self._push(job)
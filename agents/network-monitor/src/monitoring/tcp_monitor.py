@@ -0,0 +1,209 @@
+"""
+TCP connect monitoring module
+"""
+import asyncio
+import logging
+import socket
+import ssl
+import struct
+import time
+from typing import Dict, Any, Iterable, Optional, Tuple
+
+from src.attributes import AttributeCache
+from src.metrics import MetricsManager
+from .dns_cache import DNSCache
+from .loop_lag import LoopLagMonitor
+
+logger = logging.getLogger(__name__)
+
+# struct tcp_info up to tcpi_rttvar; tcpi_rtt (microseconds) sits at offset 68
+_TCP_INFO_SIZE = 76
+_TCPI_RTT_OFFSET = 68
+_TCPI_RTT = struct.Struct('@I')
+
+
+def parse_tcp_target(target: str) -> Tuple[str, int]:
+    """
+    Splits a host:port target
+    
+    Args:
+        target: Target such as "example.com:443"
+    
+    Returns:
+        (host, port)
+    """
+    host, separator, port = target.rpartition(':')
+    if not separator or not host or not port.isdigit():
+        raise ValueError(f"Invalid TCP target {target!r}, expected host:port")
+    return host, int(port)
+
+
+def kernel_rtt(sock: Optional[socket.socket]) -> Optional[float]:
+    """
+    Reads the kernel's RTT estimate of a freshly connected TCP socket
+    
+    Right after the handshake tcpi_rtt is the SYN/SYN-ACK round trip,
+    timed by the kernel and unaffected by event-loop delays.
+    
+    Args:
+        sock: Connected TCP socket
+    
+    Returns:
+        RTT in seconds, or None where TCP_INFO is unavailable
+    """
+    tcp_info = getattr(socket, 'TCP_INFO', None)
+    if sock is None or tcp_info is None:
+        return None
+    try:
+        info = sock.getsockopt(socket.IPPROTO_TCP, tcp_info, _TCP_INFO_SIZE)
+    except OSError:
+        return None
+    if len(info) < _TCPI_RTT_OFFSET + _TCPI_RTT.size:
+        return None
+    rtt = _TCPI_RTT.unpack_from(info, _TCPI_RTT_OFFSET)[0]
+    return rtt / 1e6 if rtt else None
+
+
+class TCPMonitor:
+    """TCP monitor for handshake latency without sending any request"""
+    
+    def __init__(
+        self,
+        metrics_manager: MetricsManager,
+        resolver: Optional[DNSCache] = None,
+        tls_targets: Iterable[str] = (),
+        loop_lag: Optional[LoopLagMonitor] = None,
+        kernel_timestamps: bool = False
+    ):
+        """
+        Initializes the TCP monitor
+        
+        Args:
+            metrics_manager: Metrics manager
+            resolver: DNS cache shared with the other monitors (created if omitted)
+            tls_targets: host:port targets that also get a TLS handshake
+            loop_lag: Event-loop lag monitor used to tag or discard handshake
+                timings taken during a loop stall
+            kernel_timestamps: Report the kernel's handshake RTT (TCP_INFO)
+                as connect time instead of user-space timing
+        """
+        self.metrics = metrics_manager
+        self.resolver = resolver or DNSCache(metrics_manager)
+        self.tls_targets = set(tls_targets)
+        self._ssl_context: Optional[ssl.SSLContext] = None
+        self.loop_lag = loop_lag
+        self.kernel_timestamps = kernel_timestamps
+        self._attributes = AttributeCache("target")
+        self._check_attributes = AttributeCache("target", "status")
+    
+    def _tls_context(self) -> ssl.SSLContext:
+        """Returns the shared client TLS context, creating it on first use"""
+        if self._ssl_context is None:
+            self._ssl_context = ssl.create_default_context()
+        return self._ssl_context
+    
+    async def check(
+        self,
+        target: str,
+        timeout: float = 5.0,
+        tls: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """
+        Performs TCP (and optionally TLS) handshake check on a target
+        
+        Args:
+            target: Target as host:port
+            timeout: Timeout in seconds for each handshake
+            tls: Also perform a TLS handshake (defaults to whether the
+                target is in tls_targets)
+        
+        Returns:
+            Dict with handshake timings
+        """
+        if tls is None:
+            tls = target in self.tls_targets
+        attributes = self._attributes.get(target)
+        writer = None
+        
+        try:
+            host, port = parse_tcp_target(target)
+            address = await self.resolver.resolve(host)
+            
+            start = time.perf_counter()
+            _, writer = await asyncio.wait_for(asyncio.open_connection(address, port), timeout)
+            connected = time.perf_counter()
+            connect_ms = (connected - start) * 1000
+            timestamp_source = "user"
+            if self.kernel_timestamps:
+                rtt = kernel_rtt(writer.get_extra_info('socket'))
+                if rtt is not None:
+                    connect_ms = rtt * 1000
+                    timestamp_source = "kernel"
+            
+            tls_ms = None
+            if tls:
+                await asyncio.wait_for(
+                    writer.start_tls(self._tls_context(), server_hostname=host),
+                    timeout
+                )
+                tls_ms = (time.perf_counter() - connected) * 1000
+            
+            timing_attributes: Optional[Dict[str, Any]] = attributes
+            if self.loop_lag is not None and (timestamp_source == "user" or tls_ms is not None):
+                timing_attributes = self.loop_lag.sample_attributes(
+                    "tcp", attributes, start, time.perf_counter()
+                )
+            if timestamp_source == "kernel":
+                # Kernel RTT is immune to loop stalls
+                self.metrics.tcp_connect_duration.record(connect_ms, attributes)
+            elif timing_attributes is not None:
+                self.metrics.tcp_connect_duration.record(connect_ms, timing_attributes)
+            if tls_ms is not None and timing_attributes is not None:
+                self.metrics.tcp_tls_duration.record(tls_ms, timing_attributes)
+            
+            self.metrics.tcp_checks.add(1, self._check_attributes.get(target, "success"))
+            
+            logger.info(
+                f"TCP check - Target: {target}, "
+                f"Connect: {connect_ms:.2f}ms"
+                + (f", TLS: {tls_ms:.2f}ms" if tls_ms is not None else "")
+            )
+            
+            return {
+                "target": target,
+                "address": address,
+                "connect_ms": connect_ms,
+                "tls_ms": tls_ms,
+                "timestamp_source": timestamp_source,
+                "loop_stalled": timing_attributes is not attributes,
+                "success": True
+            }
+        
+        except asyncio.TimeoutError:
+            logger.error(f"TCP timeout for {target}")
+            self.metrics.tcp_checks.add(1, self._check_attributes.get(target, "timeout"))
+            return {"target": target, "error": "timeout", "success": False}
+        
+        except ConnectionRefusedError:
+            logger.error(f"TCP connection refused for {target}")
+            self.metrics.tcp_checks.add(1, self._check_attributes.get(target, "refused"))
+            return {"target": target, "error": "refused", "success": False}
+        
+        except ssl.SSLError as e:
+            logger.error(f"TLS handshake error for {target}: {e}")
+            self.metrics.tcp_checks.add(1, self._check_attributes.get(target, "tls_error"))
+            return {"target": target, "error": str(e), "success": False}
+        
+        except Exception as e:
+            logger.error(f"TCP check error for {target}: {e}")
+            self.metrics.tcp_checks.add(1, self._check_attributes.get(target, "error"))
+            return {"target": target, "error": str(e), "success": False}
+        
+        finally:
+            if writer is not None:
+                writer.close()
+                try:
+                    # Bounded: a TLS peer may never answer close_notify
+                    await asyncio.wait_for(writer.wait_closed(), timeout)
+                except (asyncio.TimeoutError, OSError, ssl.SSLError):
+                    pass
@@ -0,0 +1,211 @@
+"""
+Multi-process worker pool module
+"""
+import asyncio
+import bisect
+import dataclasses
+import hashlib
+import logging
+import multiprocessing
+from typing import Dict, List, Optional
+
+from src.utils import Config
+from .monitor import NetworkMonitor
+
+logger = logging.getLogger(__name__)
+
+# Seconds between worker liveness checks
+SUPERVISE_INTERVAL = 1.0
+
+
+def _hash(key: str) -> int:
+    """Stable 64-bit hash (Python's hash() is salted per process)"""
+    return int.from_bytes(hashlib.sha1(key.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """Consistent hash ring mapping targets to workers"""
+    
+    def __init__(self, nodes: List[str], replicas: int = 128):
+        """
+        Initializes the ring
+        
+        Args:
+            nodes: Node names
+            replicas: Virtual nodes per node (smooths the distribution)
+        """
+        points = sorted(
+            (_hash(f"{node}#{replica}"), node)
+            for node in nodes
+            for replica in range(replicas)
+        )
+        self._keys = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+    
+    def node_for(self, key: str) -> str:
+        """
+        Returns the node owning a key
+        
+        Args:
+            key: Key to place (target hostname)
+        
+        Returns:
+            Node name
+        """
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._nodes[index]
+
+
+def partition_targets(targets: List[str], workers: int) -> Dict[int, List[str]]:
+    """
+    Splits targets across workers with consistent hashing
+    
+    A target stays on the same worker when other targets are added or
+    removed, and only ~1/N of the targets move when a worker is added.
+    
+    Args:
+        targets: Target hostnames
+        workers: Number of workers
+    
+    Returns:
+        Dict of worker id to its targets (every worker id is present)
+    """
+    ring = HashRing([f"worker-{worker_id}" for worker_id in range(workers)])
+    partitions: Dict[int, List[str]] = {worker_id: [] for worker_id in range(workers)}
+    for target in targets:
+        node = ring.node_for(target)
+        partitions[int(node.rsplit('-', 1)[1])].append(target)
+    return partitions
+
+
+# Slots of the per-worker shared health array (epoch seconds, 0 = never)
+LAST_ROUND = 0
+LAST_EXPORT = 1
+
+
+async def _publish_health(monitor: NetworkMonitor, health):
+    """Copies the monitor's readiness timestamps to the shared array until it stops"""
+    while True:
+        health[LAST_ROUND] = monitor.last_round or 0.0
+        health[LAST_EXPORT] = monitor.last_export() or 0.0
+        await asyncio.sleep(SUPERVISE_INTERVAL)
+
+
+async def _run_worker(monitor: NetworkMonitor, health):
+    """Runs the monitor alongside the health publisher"""
+    publisher = asyncio.create_task(_publish_health(monitor, health))
+    try:
+        await monitor.run()
+    finally:
+        publisher.cancel()
+
+
+def _worker_main(config: Config, worker_id: int, health):
+    """Entry point of a worker process: runs a NetworkMonitor over its partition"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'{{"timestamp": "%(asctime)s", "level": "%(levelname)s", "worker": {worker_id}, "message": "%(message)s"}}',
+        force=True
+    )
+    monitor = NetworkMonitor(config, worker_id=worker_id)
+    asyncio.run(_run_worker(monitor, health))
+
+
+class WorkerPool:
+    """Runs one NetworkMonitor per worker process over a partition of the targets"""
+    
+    def __init__(self, config: Config, start_method: str = "spawn"):
+        """
+        Initializes the worker pool
+        
+        Args:
+            config: Monitor configuration (config.workers processes)
+            start_method: multiprocessing start method (spawn avoids
+                inheriting gRPC/asyncio state from the parent)
+        """
+        self.config = config
+        self.running = False
+        self._context = multiprocessing.get_context(start_method)
+        self._processes: Dict[int, multiprocessing.process.BaseProcess] = {}
+        # Readiness timestamps published by each worker (see LAST_ROUND/LAST_EXPORT)
+        self._health: Dict[int, multiprocessing.Array] = {}
+        self.partitions = partition_targets(config.targets, config.workers)
+        self.tcp_partitions = partition_targets(config.tcp_targets, config.workers)
+        
+        for worker_id, targets in self.partitions.items():
+            logger.info(
+                f"Worker {worker_id} assigned targets: {targets}, "
+                f"TCP targets: {self.tcp_partitions[worker_id]}"
+            )
+    
+    def _spawn(self, worker_id: int):
+        """Starts the process of one worker"""
+        worker_config = dataclasses.replace(
+            self.config,
+            targets=self.partitions[worker_id],
+            tcp_targets=self.tcp_partitions[worker_id]
+        )
+        self._health[worker_id] = self._context.Array('d', 2, lock=False)
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_config, worker_id, self._health[worker_id]),
+            name=f"network-monitor-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self._processes[worker_id] = process
+    
+    def start(self):
+        """Starts every worker that has at least one target (ping/HTTP or TCP)"""
+        for worker_id, targets in self.partitions.items():
+            if targets or self.tcp_partitions[worker_id]:
+                self._spawn(worker_id)
+    
+    def _oldest(self, slot: int) -> Optional[float]:
+        """Oldest timestamp of a slot across workers (None if any worker has none yet)"""
+        timestamps = [health[slot] for health in self._health.values()]
+        if not timestamps or not all(timestamps):
+            return None
+        return min(timestamps)
+    
+    @property
+    def last_round(self) -> Optional[float]:
+        """Epoch of the last completed probe of the most lagging worker"""
+        return self._oldest(LAST_ROUND)
+    
+    def last_export(self) -> Optional[float]:
+        """Epoch of the last accepted export of the most lagging worker"""
+        return self._oldest(LAST_EXPORT)
+    
+    def supervise(self):
+        """Restarts workers whose process exited"""
+        for worker_id, process in self._processes.items():
+            if not process.is_alive():
+                logger.error(f"Worker {worker_id} exited with code {process.exitcode}, restarting")
+                self._spawn(worker_id)
+    
+    async def run(self):
+        """Starts the workers and supervises them until stopped"""
+        self.running = True
+        self.start()
+        logger.info(f"Worker pool started with {len(self._processes)} workers")
+        
+        try:
+            while self.running:
+                await asyncio.sleep(SUPERVISE_INTERVAL)
+                if self.running:
+                    self.supervise()
+        finally:
+            await self.stop()
+    
+    async def stop(self):
+        """Terminates the workers"""
+        self.running = False
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+        
+        loop = asyncio.get_running_loop()
+        for process in self._processes.values():
+            await loop.run_in_executor(None, process.join, 5)
+        logger.info("Worker pool stopped")
@@ -4,9 +4,8 @@ Utils package for network monitoring
 
 __all__ = [
     "Config",
-    "HealthCheckHandler",
     "HealthCheckServer"
 ]
 
 from .config import Config
-from .health_check import HealthCheckHandler, HealthCheckServer
\ No newline at end of file
+from .health_check import HealthCheckServer
\ No newline at end of file
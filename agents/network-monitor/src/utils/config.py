@@ -2,8 +2,9 @@
 Configuration module for Network Monitor
 """
 import os
-from typing import List
-from dataclasses import dataclass
+import socket
+from typing import Dict, List
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -15,15 +16,168 @@ class Config:
     otel_endpoint: str
     service_name: str
     health_port: int
+    ping_count: int = 10
+    ping_timeout: float = 2.0
+    ping_packet_interval: float = 0.1
+    ping_burst: bool = True
+    kernel_timestamps: bool = False
+    dns_min_ttl: float = 5.0
+    dns_max_ttl: float = 3600.0
+    dns_negative_ttl: float = 30.0
+    max_concurrent_probes: int = 100
+    schedule_seed: str = ""
+    workers: int = 1
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 100
+    http_keepalive_expiry: float = 120.0
+    http2: bool = False
+    http_fresh_connection_targets: List[str] = field(default_factory=list)
+    http_head_targets: List[str] = field(default_factory=list)
+    http_max_body_bytes: int = 10 * 1024 * 1024
+    http_hash_body: bool = False
+    tcp_targets: List[str] = field(default_factory=list)
+    tcp_tls_targets: List[str] = field(default_factory=list)
+    tcp_interval: float = 5.0
+    tcp_timeout: float = 5.0
+    adaptive_intervals: bool = False
+    adaptive_floor_ratio: float = 0.25
+    adaptive_ceiling_ratio: float = 4.0
+    breaker_enabled: bool = True
+    breaker_failure_threshold: int = 3
+    breaker_base_backoff: float = 30.0
+    breaker_max_backoff: float = 600.0
+    probe_rate_limit: float = 0.0
+    probe_burst: float = 0.0
+    probe_weights: Dict[str, float] = field(default_factory=dict)
+    probe_max_queue_delay: float = 0.0
+    loop_lag_enabled: bool = True
+    loop_lag_interval: float = 0.01
+    loop_stall_threshold: float = 0.05
+    loop_stall_action: str = "tag"
+    histogram_buckets: Dict[str, List[float]] = field(default_factory=dict)
+    exponential_histograms: bool = False
+    exponential_max_size: int = 160
+    otel_protocol: str = "grpc"
+    otel_export_interval_ms: int = 10000
+    otel_export_timeout_ms: int = 10000
+    otel_temporality: str = "cumulative"
+    otel_compression: str = "none"
+    otel_max_export_batch_size: int = 0
+    wal_enabled: bool = False
+    wal_dir: str = "/app/wal"
+    wal_max_bytes: int = 256 * 1024 * 1024
+    wal_segment_bytes: int = 8 * 1024 * 1024
+    wal_fsync: str = "segment"
+    wal_replay_rate: float = 10.0
+    export_queue_size: int = 8
+    export_drop_policy: str = "oldest"
+    export_priorities: Dict[str, int] = field(default_factory=dict)
+    metrics_exporter: str = "otlp"
+    victoriametrics_url: str = "http://victoriametrics:8428"
+    victoriametrics_max_batch_samples: int = 10000
+    prometheus_enabled: bool = False
+    health_live_max_lag: float = 5.0
+    health_ready_max_age: float = 180.0
+    health_export_max_age: float = 30.0
 
     @classmethod
     def from_env(cls) -> 'Config':
         """Loads configuration from environment variables"""
+        ping_interval = int(os.getenv('PING_INTERVAL', '30'))
+        http_interval = int(os.getenv('HTTP_INTERVAL', '60'))
+        export_interval_ms = int(os.getenv('OTEL_METRIC_EXPORT_INTERVAL', '10000'))
         return cls(
             targets=os.getenv('MONITOR_TARGETS', 'google.com,youtube.com,rnp.br').split(','),
-            ping_interval=int(os.getenv('PING_INTERVAL', '30')),
-            http_interval=int(os.getenv('HTTP_INTERVAL', '60')),
+            ping_interval=ping_interval,
+            http_interval=http_interval,
             otel_endpoint=os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT', 'http://otel-collector:4317'),
             service_name=os.getenv('OTEL_SERVICE_NAME', 'network-monitor'),
-            health_port=int(os.getenv('HEALTH_PORT', '8080'))
+            health_port=int(os.getenv('HEALTH_PORT', '8080')),
+            ping_count=int(os.getenv('PING_COUNT', '10')),
+            ping_timeout=float(os.getenv('PING_TIMEOUT', '2.0')),
+            ping_packet_interval=float(os.getenv('PING_PACKET_INTERVAL', '0.1')),
+            ping_burst=os.getenv('PING_BURST', 'true').lower() == 'true',
+            kernel_timestamps=os.getenv('KERNEL_TIMESTAMPS', 'false').lower() == 'true',
+            dns_min_ttl=float(os.getenv('DNS_MIN_TTL', '5')),
+            dns_max_ttl=float(os.getenv('DNS_MAX_TTL', '3600')),
+            dns_negative_ttl=float(os.getenv('DNS_NEGATIVE_TTL', '30')),
+            max_concurrent_probes=int(os.getenv('MAX_CONCURRENT_PROBES', '100')),
+            schedule_seed=os.getenv('SCHEDULE_PHASE_SEED', socket.gethostname()),
+            workers=int(os.getenv('MONITOR_WORKERS', '1')),
+            http_max_connections=int(os.getenv('HTTP_MAX_CONNECTIONS', '100')),
+            http_max_keepalive_connections=int(os.getenv('HTTP_MAX_KEEPALIVE_CONNECTIONS', '100')),
+            http_keepalive_expiry=float(os.getenv('HTTP_KEEPALIVE_EXPIRY', '120')),
+            http2=os.getenv('HTTP2_ENABLED', 'false').lower() == 'true',
+            http_fresh_connection_targets=[
+                target for target in os.getenv('HTTP_FRESH_CONNECTION_TARGETS', '').split(',') if target
+            ],
+            http_head_targets=[
+                target for target in os.getenv('HTTP_HEAD_TARGETS', '').split(',') if target
+            ],
+            http_max_body_bytes=int(os.getenv('HTTP_MAX_BODY_BYTES', str(10 * 1024 * 1024))),
+            http_hash_body=os.getenv('HTTP_HASH_BODY', 'false').lower() == 'true',
+            tcp_targets=[
+                target for target in os.getenv('TCP_TARGETS', '').split(',') if target
+            ],
+            tcp_tls_targets=[
+                target for target in os.getenv('TCP_TLS_TARGETS', '').split(',') if target
+            ],
+            tcp_interval=float(os.getenv('TCP_INTERVAL', '5')),
+            tcp_timeout=float(os.getenv('TCP_TIMEOUT', '5')),
+            adaptive_intervals=os.getenv('ADAPTIVE_INTERVALS', 'false').lower() == 'true',
+            adaptive_floor_ratio=float(os.getenv('ADAPTIVE_FLOOR_RATIO', '0.25')),
+            adaptive_ceiling_ratio=float(os.getenv('ADAPTIVE_CEILING_RATIO', '4')),
+            breaker_enabled=os.getenv('BREAKER_ENABLED', 'true').lower() == 'true',
+            breaker_failure_threshold=int(os.getenv('BREAKER_FAILURE_THRESHOLD', '3')),
+            breaker_base_backoff=float(os.getenv('BREAKER_BASE_BACKOFF', '30')),
+            breaker_max_backoff=float(os.getenv('BREAKER_MAX_BACKOFF', '600')),
+            probe_rate_limit=float(os.getenv('PROBE_RATE_LIMIT', '0')),
+            probe_burst=float(os.getenv('PROBE_BURST', '0')),
+            probe_weights={
+                probe: float(weight)
+                for probe, _, weight in (
+                    item.partition('=') for item in os.getenv('PROBE_WEIGHTS', '').split(',') if item
+                )
+            },
+            probe_max_queue_delay=float(os.getenv('PROBE_MAX_QUEUE_DELAY', '0')),
+            loop_lag_enabled=os.getenv('LOOP_LAG_ENABLED', 'true').lower() == 'true',
+            loop_lag_interval=float(os.getenv('LOOP_LAG_INTERVAL', '0.01')),
+            loop_stall_threshold=float(os.getenv('LOOP_STALL_THRESHOLD', '0.05')),
+            loop_stall_action=os.getenv('LOOP_STALL_ACTION', 'tag').lower(),
+            histogram_buckets={
+                name.strip(): [float(bound) for bound in boundaries.split(',') if bound]
+                for name, _, boundaries in (
+                    item.partition('=') for item in os.getenv('HISTOGRAM_BUCKETS', '').split(';') if item
+                )
+            },
+            exponential_histograms=os.getenv('EXPONENTIAL_HISTOGRAMS', 'false').lower() == 'true',
+            exponential_max_size=int(os.getenv('EXPONENTIAL_MAX_SIZE', '160')),
+            otel_protocol=os.getenv('OTEL_EXPORTER_OTLP_PROTOCOL', 'grpc').lower(),
+            otel_export_interval_ms=export_interval_ms,
+            otel_export_timeout_ms=int(os.getenv('OTEL_METRIC_EXPORT_TIMEOUT', '10000')),
+            otel_temporality=os.getenv('OTEL_EXPORTER_OTLP_METRICS_TEMPORALITY_PREFERENCE', 'cumulative').lower(),
+            otel_compression=os.getenv('OTEL_EXPORTER_OTLP_COMPRESSION', 'none').lower(),
+            otel_max_export_batch_size=int(os.getenv('OTEL_METRIC_EXPORT_MAX_BATCH_SIZE', '0')),
+            wal_enabled=os.getenv('WAL_ENABLED', 'false').lower() == 'true',
+            wal_dir=os.getenv('WAL_DIR', '/app/wal'),
+            wal_max_bytes=int(os.getenv('WAL_MAX_BYTES', str(256 * 1024 * 1024))),
+            wal_segment_bytes=int(os.getenv('WAL_SEGMENT_BYTES', str(8 * 1024 * 1024))),
+            wal_fsync=os.getenv('WAL_FSYNC', 'segment').lower(),
+            wal_replay_rate=float(os.getenv('WAL_REPLAY_RATE', '10')),
+            export_queue_size=int(os.getenv('EXPORT_QUEUE_SIZE', '8')),
+            export_drop_policy=os.getenv('EXPORT_DROP_POLICY', 'oldest').lower(),
+            export_priorities={
+                prefix.strip(): int(priority)
+                for prefix, _, priority in (
+                    item.partition('=') for item in os.getenv('EXPORT_PRIORITIES', '').split(',') if item
+                )
+            },
+            metrics_exporter=os.getenv('OTEL_METRICS_EXPORTER', 'otlp').lower(),
+            victoriametrics_url=os.getenv('VICTORIAMETRICS_URL', 'http://victoriametrics:8428'),
+            victoriametrics_max_batch_samples=int(os.getenv('VICTORIAMETRICS_MAX_BATCH_SAMPLES', '10000')),
+            prometheus_enabled=os.getenv('PROMETHEUS_ENABLED', 'false').lower() == 'true',
+            health_live_max_lag=float(os.getenv('HEALTH_LIVE_MAX_LAG', '5')),
+            # Not ready after missing three rounds of the slowest probe, or three exports
+            health_ready_max_age=float(os.getenv('HEALTH_READY_MAX_AGE', str(3 * max(ping_interval, http_interval)))),
+            health_export_max_age=float(os.getenv('HEALTH_EXPORT_MAX_AGE', str(3 * export_interval_ms / 1000)))
         )
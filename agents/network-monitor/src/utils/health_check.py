@@ -1,52 +1,182 @@
 """
 Health check HTTP server module
 """
+import asyncio
+import gzip
+import json
 import logging
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import time
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
-
-class HealthCheckHandler(BaseHTTPRequestHandler):
-    """HTTP handler for health check"""
-    
-    def do_GET(self):
-        """Handler for GET requests"""
-        if self.path == '/health':
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(b'{"status": "healthy"}')
-        else:
-            self.send_response(404)
-            self.end_headers()
-    
-    def log_message(self, format, *args):
-        """Silence HTTP server logs"""
-        pass
+# Seconds allowed to receive the request line and headers
+REQUEST_TIMEOUT = 5.0
 
 
 class HealthCheckServer:
-    """Health check server"""
+    """Liveness/readiness server running on the agent's own event loop"""
     
-    def __init__(self, port: int):
+    def __init__(
+        self,
+        port: int,
+        metrics_registry=None,
+        live_max_lag: float = 5.0,
+        heartbeat_interval: float = 1.0
+    ):
         """
         Initializes the health check server
         
+        Since the server shares the event loop with the probes, a loop wedged
+        by a blocking call stops answering /livez altogether, and one that is
+        merely starved reports the heartbeat lag and fails it.
+        
         Args:
             port: Server port
+            metrics_registry: prometheus_client registry to serve on /metrics
+            live_max_lag: Heartbeat lag in seconds above which /livez fails
+            heartbeat_interval: Seconds between event-loop heartbeats
         """
         self.port = port
-        self.server = None
+        self.metrics_registry = metrics_registry
+        self.live_max_lag = live_max_lag
+        self.heartbeat_interval = heartbeat_interval
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.started = time.time()
+        # name -> (epoch of the last success or None, max age in seconds)
+        self.checks: Dict[str, Tuple[Callable[[], Optional[float]], float]] = {}
+        self._last_beat = time.monotonic()
+        self._heartbeat: Optional[asyncio.Task] = None
+    
+    def add_check(self, name: str, last_success: Callable[[], Optional[float]], max_age: float):
+        """
+        Adds a readiness check
+        
+        Before the first success the age counts from the server start, which
+        gives the agent max_age seconds to get going.
+        
+        Args:
+            name: Check name in the JSON body
+            last_success: Returns the epoch of the last success (None = never)
+            max_age: Age in seconds above which /readyz fails
+        """
+        self.checks[name] = (last_success, max_age)
     
-    def start(self):
-        """Starts the health check server"""
-        self.server = HTTPServer(('0.0.0.0', self.port), HealthCheckHandler)
+    async def start(self):
+        """Starts listening and the heartbeat task (returns immediately)"""
+        self.started = time.time()
+        self._last_beat = time.monotonic()
+        self._heartbeat = asyncio.create_task(self._beat())
+        self.server = await asyncio.start_server(self._handle, '0.0.0.0', self.port)
         logger.info(f"Health check server listening on port {self.port}")
-        self.server.serve_forever()
     
-    def stop(self):
+    async def stop(self):
         """Stops the health check server"""
+        if self._heartbeat:
+            self._heartbeat.cancel()
+            self._heartbeat = None
         if self.server:
-            self.server.shutdown()
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
             logger.info("Health check server stopped")
+    
+    def status(self) -> Dict[str, Any]:
+        """
+        Evaluates liveness and readiness
+        
+        Returns:
+            Dict with live, ready and the timings of every check
+        """
+        now = time.time()
+        lag = max(time.monotonic() - self._last_beat - self.heartbeat_interval, 0.0)
+        checks = {
+            "event_loop": {
+                "ok": lag <= self.live_max_lag,
+                "lag_seconds": round(lag, 3),
+                "max_lag_seconds": self.live_max_lag
+            }
+        }
+        for name, (last_success, max_age) in self.checks.items():
+            timestamp = last_success()
+            age = now - (timestamp or self.started)
+            checks[name] = {
+                "ok": age <= max_age,
+                "age_seconds": round(age, 3),
+                "max_age_seconds": max_age,
+                "last_success": timestamp
+            }
+        
+        return {
+            "live": checks["event_loop"]["ok"],
+            "ready": all(check["ok"] for check in checks.values()),
+            "uptime_seconds": round(now - self.started, 3),
+            "checks": checks
+        }
+    
+    async def _beat(self):
+        """Heartbeat task: its lag is the event loop's responsiveness"""
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.heartbeat_interval)
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serves one request and closes the connection"""
+        try:
+            path, headers = await asyncio.wait_for(self._read_request(reader), REQUEST_TIMEOUT)
+            status, content_type, body, extra_headers = self._route(path, headers)
+            
+            head = [f"HTTP/1.1 {status.value} {status.phrase}"]
+            head += [f"{key}: {value}" for key, value in {
+                'Content-Type': content_type,
+                'Content-Length': str(len(body)),
+                'Connection': 'close',
+                **extra_headers
+            }.items()]
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+    
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> Tuple[str, Dict[str, str]]:
+        """Reads the request line and headers, returning (path, lowercase headers)"""
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) < 2:
+            raise ValueError("malformed request line")
+        
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip()
+        return request_line[1].split('?')[0], headers
+    
+    def _route(self, path: str, headers: Dict[str, str]) -> Tuple[HTTPStatus, str, bytes, Dict[str, str]]:
+        """Returns (status, content type, body, extra headers) for a path"""
+        # /health is kept as an alias of /livez for existing healthchecks
+        if path in ('/livez', '/health', '/readyz'):
+            status = self.status()
+            ok = status["ready"] if path == '/readyz' else status["live"]
+            status["status"] = "ok" if ok else "unavailable"
+            body = json.dumps(status).encode()
+            code = HTTPStatus.OK if ok else HTTPStatus.SERVICE_UNAVAILABLE
+            return code, 'application/json', body, {}
+        if path == '/metrics' and self.metrics_registry is not None:
+            return self._metrics(headers)
+        return HTTPStatus.NOT_FOUND, 'text/plain', b'', {}
+    
+    def _metrics(self, headers: Dict[str, str]) -> Tuple[HTTPStatus, str, bytes, Dict[str, str]]:
+        """Serves the registry in the format negotiated by Accept (text or OpenMetrics)"""
+        from prometheus_client.exposition import choose_encoder
+        
+        encoder, content_type = choose_encoder(headers.get('accept', ''))
+        body = encoder(self.metrics_registry)
+        if 'gzip' in headers.get('accept-encoding', ''):
+            return HTTPStatus.OK, content_type, gzip.compress(body), {'Content-Encoding': 'gzip'}
+        return HTTPStatus.OK, content_type, body, {}
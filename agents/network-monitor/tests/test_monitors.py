@@ -3,12 +3,41 @@ Unit tests for Network Monitor - Refactored Version
 Removed redundancies and improved organization
 """
 import asyncio
+import gzip
+import struct
+import threading
+import time
 import pytest
-from unittest.mock import Mock, patch, AsyncMock
+from unittest.mock import ANY, Mock, patch, AsyncMock
 
+from opentelemetry.sdk.metrics import Counter, Histogram, MeterProvider, UpDownCounter
+from opentelemetry.sdk.metrics.export import (
+    AggregationTemporality, ExponentialHistogramDataPoint, InMemoryMetricReader, MetricExporter,
+    MetricExportResult
+)
+from opentelemetry.sdk.metrics.view import ExplicitBucketHistogramAggregation, View
+from opentelemetry.sdk.resources import Resource
+
+from src.attributes import AttributeCache, AttributeSet
+from src.export import BatchingExporter, QueueingExporter, TrackingExporter, create_otlp_exporter, split_metrics_data
+from src.victoriametrics import VictoriaMetricsExporter, metric_name
+from src.wal import WALExporter, WriteAheadLog, dump_metrics_data
 from src.utils import Config
-from src.monitoring import PingMonitor, HTTPMonitor, NetworkMonitor
-from src.metrics import MetricsManager
+from src.monitoring import PingMonitor, HTTPMonitor, NetworkMonitor, ICMPProber, DNSCache, ProbeScheduler
+from src.monitoring.http_monitor import _ResolvingBackend
+from src.monitoring.adaptive import AdaptiveInterval, health_signal
+from src.monitoring.budget import ProbeBudget
+from src.monitoring.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, is_unreachable
+from src.monitoring.http_trace import PhaseTimer
+from src.monitoring.loop_lag import LoopLagMonitor
+from src.monitoring.tcp_monitor import TCPMonitor, kernel_rtt, parse_tcp_target
+from src.monitoring.icmp import (
+    _PendingEcho, build_echo_request, icmp_checksum, parse_echo_reply, parse_timespec
+)
+from src.monitoring.rtt_stats import RTTStats
+from src.monitoring.scheduler import phase_offset
+from src.monitoring.workers import WorkerPool, partition_targets
+from src.metrics import DEFAULT_HISTOGRAM_BUCKETS, MetricsManager
 
 
 # ============================================================================
@@ -20,9 +49,33 @@ def metrics_manager():
     """Mock do MetricsManager reutilizável"""
     mock = Mock(spec=MetricsManager)
     mock.ping_rtt = Mock()
-    mock.ping_packet_loss = Mock()
+    mock.ping_rtt_min = Mock()
+    mock.ping_rtt_max = Mock()
+    mock.ping_rtt_stddev = Mock()
+    mock.ping_jitter = Mock()
+    mock.ping_loss_run = Mock()
+    mock.ping_reordered = Mock()
+    mock.ping_duplicates = Mock()
+    mock.ping_sent = Mock()
+    mock.ping_received = Mock()
+    mock.dns_duration = Mock()
     mock.http_duration = Mock()
     mock.http_status = Mock()
+    mock.http_dns_duration = Mock()
+    mock.http_connect_duration = Mock()
+    mock.http_tls_duration = Mock()
+    mock.http_ttfb = Mock()
+    mock.http_transfer_duration = Mock()
+    mock.http_content_changes = Mock()
+    mock.tcp_connect_duration = Mock()
+    mock.tcp_tls_duration = Mock()
+    mock.tcp_checks = Mock()
+    mock.probe_interval = Mock()
+    mock.breaker_state = Mock()
+    mock.queue_delay = Mock()
+    mock.probes_throttled = Mock()
+    mock.loop_lag = Mock()
+    mock.contaminated_samples = Mock()
     return mock
 
 
@@ -35,7 +88,9 @@ def test_config():
         http_interval=0.1,
         otel_endpoint='http://localhost:4317',
         service_name='test-monitor',
-        health_port=8080
+        health_port=8080,
+        tcp_targets=['example.com:443', 'test.com:443'],
+        tcp_interval=0.1
     )
 
 
@@ -55,11 +110,38 @@ class TestConfig:
         assert config.http_interval == 60
         assert config.service_name == 'network-monitor'
         assert config.health_port == 8080
+        assert config.ping_count == 10
+        assert config.ping_timeout == 2.0
+        assert config.ping_packet_interval == 0.1
+        assert config.ping_burst is True
+        assert config.schedule_seed
+        assert config.workers == 1
+        assert config.http2 is False
+        assert config.http_keepalive_expiry == 120.0
+        assert config.http_fresh_connection_targets == []
+        assert config.tcp_targets == []
+        assert config.otel_protocol == 'grpc'
+        assert config.otel_export_interval_ms == 10000
+        assert config.otel_temporality == 'cumulative'
+        assert config.otel_compression == 'none'
+        assert config.health_ready_max_age == 180.0
     
     @patch.dict('os.environ', {
         'MONITOR_TARGETS': 'example.com,test.com',
         'PING_INTERVAL': '60',
-        'HTTP_INTERVAL': '120'
+        'HTTP_INTERVAL': '120',
+        'PING_COUNT': '5',
+        'PING_PACKET_INTERVAL': '0.02',
+        'PING_BURST': 'false',
+        'HTTP2_ENABLED': 'true',
+        'HTTP_FRESH_CONNECTION_TARGETS': 'test.com',
+        'PROBE_WEIGHTS': 'ping=3,http=1',
+        'HISTOGRAM_BUCKETS': 'network.ping.rtt=0.5,1,2;http.client.ttfb=50,100',
+        'OTEL_EXPORTER_OTLP_PROTOCOL': 'http/protobuf',
+        'OTEL_METRIC_EXPORT_INTERVAL': '60000',
+        'OTEL_EXPORTER_OTLP_METRICS_TEMPORALITY_PREFERENCE': 'DELTA',
+        'OTEL_EXPORTER_OTLP_COMPRESSION': 'gzip',
+        'OTEL_METRIC_EXPORT_MAX_BATCH_SIZE': '500'
     })
     def test_config_custom_env_vars(self):
         """Testa configuração customizada via env vars"""
@@ -68,6 +150,23 @@ class TestConfig:
         assert config.targets == ['example.com', 'test.com']
         assert config.ping_interval == 60
         assert config.http_interval == 120
+        assert config.health_ready_max_age == 360.0
+        assert config.health_export_max_age == 180.0
+        assert config.ping_count == 5
+        assert config.ping_packet_interval == 0.02
+        assert config.ping_burst is False
+        assert config.http2 is True
+        assert config.http_fresh_connection_targets == ['test.com']
+        assert config.probe_weights == {'ping': 3.0, 'http': 1.0}
+        assert config.histogram_buckets == {
+            'network.ping.rtt': [0.5, 1.0, 2.0],
+            'http.client.ttfb': [50.0, 100.0]
+        }
+        assert config.otel_protocol == 'http/protobuf'
+        assert config.otel_export_interval_ms == 60000
+        assert config.otel_temporality == 'delta'
+        assert config.otel_compression == 'gzip'
+        assert config.otel_max_export_batch_size == 500
 
 
 # ============================================================================
@@ -78,56 +177,378 @@ class TestPingMonitor:
     """Testes para PingMonitor"""
     
     @pytest.fixture
-    def ping_monitor(self, metrics_manager):
+    def prober(self):
+        """Mock do ICMPProber"""
+        mock = Mock(spec=ICMPProber)
+        mock.ping = AsyncMock(return_value=0.05)
+        
+        async def burst(address, count, interval=0.0, timeout=2.0, on_reply=None):
+            rtts = [await mock.ping(address, timeout=timeout) for _ in range(count)]
+            for index, rtt in enumerate(rtts):
+                if rtt is not None and on_reply:
+                    on_reply(index, rtt, False)
+            return rtts
+        
+        mock.burst = AsyncMock(side_effect=burst)
+        return mock
+    
+    @pytest.fixture
+    def ping_monitor(self, metrics_manager, prober):
         """Fixture do PingMonitor"""
-        return PingMonitor(metrics_manager)
+        monitor = PingMonitor(metrics_manager, prober=prober)
+        monitor._resolve = AsyncMock(return_value='93.184.216.34')
+        return monitor
     
     @pytest.mark.asyncio
-    async def test_successful_ping(self, ping_monitor):
+    async def test_successful_ping(self, ping_monitor, prober):
         """Testa ping bem-sucedido"""
-        with patch('ping3.ping', return_value=0.05):
-            result = await ping_monitor.check('example.com', ping_count=3)
-            
-            assert result['target'] == 'example.com'
-            assert result['successful_pings'] == 3
-            assert result['total_pings'] == 3
-            assert result['packet_loss_percent'] == 0.0
-            assert result['avg_rtt_ms'] > 0
+        result = await ping_monitor.check('example.com', ping_count=3)
+        
+        assert result['target'] == 'example.com'
+        assert result['successful_pings'] == 3
+        assert result['total_pings'] == 3
+        assert result['packet_loss_percent'] == 0.0
+        assert result['avg_rtt_ms'] > 0
+        prober.ping.assert_awaited_with('93.184.216.34', timeout=2.0)
     
     @pytest.mark.asyncio
     @pytest.mark.parametrize("side_effects,expected_success,expected_loss", [
         ([0.05, None, 0.06, None], 2, 50.0),  # 50% perda
         ([None, None, None], 0, 100.0),        # 100% perda
     ])
-    async def test_ping_with_packet_loss(self, ping_monitor, side_effects, expected_success, expected_loss):
+    async def test_ping_with_packet_loss(self, ping_monitor, prober, side_effects, expected_success, expected_loss):
         """Testa ping com diferentes percentuais de perda de pacotes"""
-        with patch('ping3.ping', side_effect=side_effects):
-            result = await ping_monitor.check('example.com', ping_count=len(side_effects))
-            
-            assert result['successful_pings'] == expected_success
-            assert result['packet_loss_percent'] == expected_loss
-            if expected_loss == 100.0:
-                assert result['avg_rtt_ms'] == 0
+        prober.ping.side_effect = side_effects
+        result = await ping_monitor.check('example.com', ping_count=len(side_effects))
+        
+        assert result['successful_pings'] == expected_success
+        assert result['packet_loss_percent'] == expected_loss
+        if expected_loss == 100.0:
+            assert result['avg_rtt_ms'] == 0
     
     @pytest.mark.asyncio
-    async def test_ping_with_individual_exceptions(self, ping_monitor):
+    async def test_ping_with_individual_exceptions(self, ping_monitor, prober):
         """Testa que exceções individuais não quebram o processo"""
-        with patch('ping3.ping', side_effect=[0.05, Exception("Network error"), 0.06]):
-            result = await ping_monitor.check('example.com', ping_count=3)
-            
-            assert result['successful_pings'] == 2
-            assert result['total_pings'] == 3
+        prober.ping.side_effect = [0.05, OSError("Network error"), 0.06]
+        result = await ping_monitor.check('example.com', ping_count=3, interval=0, burst=False)
+        
+        assert result['successful_pings'] == 2
+        assert result['total_pings'] == 3
+        prober.burst.assert_not_awaited()
+    
+    @pytest.mark.asyncio
+    async def test_burst_mode_forwards_settings(self, ping_monitor, prober):
+        """Testa que o modo burst repassa contagem, intervalo e timeout ao prober"""
+        result = await ping_monitor.check('example.com', ping_count=5, timeout=1.0, interval=0.02)
+        
+        prober.burst.assert_awaited_once_with(
+            '93.184.216.34', 5, interval=0.02, timeout=1.0, on_reply=ANY
+        )
+        assert result['successful_pings'] == 5
     
     @pytest.mark.asyncio
     async def test_ping_fatal_exception(self, ping_monitor, metrics_manager):
         """Testa exceção fatal durante gravação de métricas"""
-        metrics_manager.ping_packet_loss.record.side_effect = Exception("Metrics error")
+        metrics_manager.ping_sent.add.side_effect = Exception("Metrics error")
         
-        with patch('ping3.ping', return_value=0.05):
-            result = await ping_monitor.check('example.com', ping_count=1)
-            
-            assert 'error' in result
-            assert 'Metrics error' in result['error']
+        result = await ping_monitor.check('example.com', ping_count=1)
+        
+        assert 'error' in result
+        assert 'Metrics error' in result['error']
+    
+    @pytest.mark.asyncio
+    async def test_round_statistics_recorded_once(self, ping_monitor, prober, metrics_manager):
+        """Testa que cada rodada grava um conjunto fixo de pontos (não um por echo)"""
+        prober.ping.side_effect = [0.010, 0.020, None, None, 0.030]
+        
+        result = await ping_monitor.check('example.com', ping_count=5)
+        
+        assert result['min_rtt_ms'] == pytest.approx(10.0)
+        assert result['max_rtt_ms'] == pytest.approx(30.0)
+        assert result['avg_rtt_ms'] == pytest.approx(20.0)
+        assert result['stddev_rtt_ms'] == pytest.approx(10.0)
+        assert result['max_loss_run'] == 2
+        assert result['packet_loss_percent'] == 40.0
+        metrics_manager.ping_rtt.record.assert_called_once_with(pytest.approx(20.0), {"target": "example.com"})
+        metrics_manager.ping_jitter.set.assert_called_once()
+        metrics_manager.ping_loss_run.set.assert_called_once_with(2, {"target": "example.com"})
+        metrics_manager.ping_sent.add.assert_called_once_with(5, {"target": "example.com"})
+        metrics_manager.ping_received.add.assert_called_once_with(3, {"target": "example.com"})
+    
+    @pytest.mark.asyncio
+    async def test_stalled_round_keeps_gauges_untagged(self, ping_monitor, prober, metrics_manager):
+        """Testa que uma rodada durante travamento não cria um segundo ponto nos gauges"""
+        reader = InMemoryMetricReader()
+        provider = MeterProvider(metric_readers=[reader])
+        metrics_manager.ping_rtt_max = provider.get_meter('test').create_gauge('network.ping.rtt.max')
+        ping_monitor.loop_lag = LoopLagMonitor(metrics_manager)
+        prober.kernel_timestamps = False
+        
+        await ping_monitor.check('example.com', ping_count=3)
+        ping_monitor.loop_lag.stalls.append((0.0, float('inf')))
+        result = await ping_monitor.check('example.com', ping_count=3)
+        
+        data = reader.get_metrics_data()
+        provider.shutdown()
+        points = data.resource_metrics[0].scope_metrics[0].metrics[0].data.data_points
+        assert result['loop_stalled'] is True
+        assert [dict(point.attributes) for point in points] == [{"target": "example.com"}]
+        metrics_manager.ping_rtt.record.assert_called_with(
+            pytest.approx(50.0), {"target": "example.com", "loop.stalled": True}
+        )
+    
+    @pytest.mark.asyncio
+    async def test_ping_resolution_error(self, ping_monitor, prober):
+        """Testa falha de resolução DNS"""
+        ping_monitor._resolve.side_effect = OSError("Name or service not known")
+        
+        result = await ping_monitor.check('invalid.example', ping_count=3)
+        
+        assert 'error' in result
+        prober.ping.assert_not_awaited()
+
+
+# ============================================================================
+# RTT STATISTICS TESTS
+# ============================================================================
+
+class TestRTTStats:
+    """Testes para o acumulador de estatísticas de RTT"""
+    
+    def test_streaming_moments(self):
+        """Testa min/max/média/desvio padrão calculados em streaming"""
+        stats = RTTStats()
+        for index, rtt in enumerate([10.0, 12.0, 14.0, 16.0]):
+            stats.add_reply(index, rtt)
+        
+        assert stats.min_rtt == 10.0
+        assert stats.max_rtt == 16.0
+        assert stats.mean_rtt == pytest.approx(13.0)
+        assert stats.stddev == pytest.approx(2.5819889)
+    
+    def test_rfc3550_jitter(self):
+        """Testa jitter RFC 3550 (J += (|D| - J) / 16)"""
+        stats = RTTStats()
+        stats.add_reply(0, 10.0)
+        stats.add_reply(1, 26.0)
+        stats.add_reply(2, 10.0)
+        
+        # 0 -> 1.0 -> 1.0 + (16 - 1.0) / 16
+        assert stats.jitter == pytest.approx(1.9375)
+    
+    def test_reordered_and_duplicate_replies(self):
+        """Testa detecção de respostas fora de ordem e duplicadas"""
+        stats = RTTStats()
+        stats.add_reply(0, 1.0)
+        stats.add_reply(2, 1.0)
+        stats.add_reply(1, 1.0)
+        stats.add_reply(2, 1.0, duplicate=True)
+        
+        assert stats.reordered == 1
+        assert stats.duplicates == 1
+        assert stats.received == 3
+    
+    def test_longest_loss_run(self):
+        """Testa a maior sequência de perdas consecutivas"""
+        stats = RTTStats()
+        for lost in [False, True, True, False, True, True, True, False]:
+            stats.add_outcome(lost)
+        
+        assert stats.max_loss_run == 3
+        assert stats.sent == 8
+    
+    def test_empty_round(self):
+        """Testa rodada sem respostas"""
+        stats = RTTStats()
+        for _ in range(3):
+            stats.add_outcome(lost=True)
+        
+        summary = stats.summary(scale=1000)
+        assert summary['min_rtt'] == 0
+        assert summary['stddev_rtt'] == 0.0
+        assert stats.packet_loss == 100.0
+
+
+# ============================================================================
+# ICMP ENGINE TESTS
+# ============================================================================
+
+class TestICMPProber:
+    """Testes para o motor ICMP assíncrono"""
+    
+    def test_checksum(self):
+        """Testa checksum RFC 1071 (pacote com checksum válido soma zero)"""
+        packet = build_echo_request(0x1234, 1, b'abcdefgh')
+        
+        assert icmp_checksum(packet) == 0
+    
+    @pytest.mark.parametrize("has_ip_header", [False, True])
+    def test_parse_echo_reply(self, has_ip_header):
+        """Testa extração de identifier/sequence de echo replies"""
+        request = build_echo_request(0x1234, 7, b'payload!')
+        reply = bytes([0]) + request[1:]
+        if has_ip_header:
+            reply = bytes([0x45]) + bytes(19) + reply
+        
+        assert parse_echo_reply(reply, has_ip_header) == (0x1234, 7)
+    
+    def test_parse_ignores_echo_requests(self):
+        """Testa que echo requests (loopback em raw sockets) são ignorados"""
+        request = build_echo_request(0x1234, 7, b'payload!')
+        
+        assert parse_echo_reply(request, has_ip_header=False) is None
+        assert parse_echo_reply(b'\x00\x00', has_ip_header=False) is None
+    
+    @pytest.mark.asyncio
+    async def test_replies_multiplexed_by_sequence(self):
+        """Testa que replies de vários targets são casadas por sequence e endereço"""
+        prober = ICMPProber()
+        loop = asyncio.get_running_loop()
+        first, second = loop.create_future(), loop.create_future()
+        prober._pending[1] = _PendingEcho('10.0.0.1', 100.0, first)
+        prober._pending[2] = _PendingEcho('10.0.0.2', 100.0, second)
+        
+        def reply(sequence):
+            return bytes([0]) + build_echo_request(prober.identifier, sequence, b'')[1:]
+        
+        prober._handle_packet(reply(2), '10.0.0.2', 100.25)
+        prober._handle_packet(reply(1), '10.0.0.9', 100.5)  # endereço errado
+        
+        assert second.result() == pytest.approx(0.25)
+        assert not first.done()
+    
+    @pytest.mark.asyncio
+    async def test_raw_socket_filters_foreign_identifier(self):
+        """Testa que raw sockets ignoram replies de outros processos"""
+        prober = ICMPProber()
+        prober._raw = True
+        future = asyncio.get_running_loop().create_future()
+        prober._pending[1] = _PendingEcho('10.0.0.1', 0.0, future)
+        foreign = bytes([0x45]) + bytes(19) + bytes([0]) + build_echo_request(prober.identifier ^ 1, 1, b'')[1:]
+        
+        prober._handle_packet(foreign, '10.0.0.1', 1.0)
+        
+        assert not future.done()
+    
+    @pytest.mark.asyncio
+    async def test_burst_finishes_within_one_timeout_window(self):
+        """Testa que um burst sem respostas termina em ~(count - 1) * interval + timeout"""
+        prober = ICMPProber()
+        prober._sock = Mock()
+        prober._loop = asyncio.get_running_loop()
+        
+        start = time.perf_counter()
+        rtts = await prober.burst('10.0.0.1', 10, interval=0.01, timeout=0.2)
+        elapsed = time.perf_counter() - start
+        
+        assert rtts == [None] * 10
+        assert prober._sock.sendto.call_count == 10
+        assert elapsed < 0.2 + 9 * 0.01 + 0.2
+        assert not prober._pending
+    
+    @pytest.mark.asyncio
+    async def test_burst_collects_out_of_band_replies(self):
+        """Testa que respostas chegam de forma assíncrona durante o burst"""
+        prober = ICMPProber()
+        prober._sock = Mock()
+        prober._loop = asyncio.get_running_loop()
+        
+        def reply(packet, destination):
+            sequence = parse_echo_reply(bytes([0]) + packet[1:], has_ip_header=False)[1]
+            if sequence % 2:
+                echo = bytes([0]) + packet[1:]
+                prober._loop.call_soon(prober._handle_packet, echo, destination[0], time.perf_counter())
+        
+        prober._sock.sendto.side_effect = reply
+        
+        replies = []
+        rtts = await prober.burst(
+            '10.0.0.1', 4, timeout=0.1,
+            on_reply=lambda index, rtt, duplicate: replies.append((index, duplicate))
+        )
+        
+        assert [rtt is not None for rtt in rtts] == [True, False, True, False]
+        assert replies == [(0, False), (2, False)]
+    
+    @pytest.mark.asyncio
+    async def test_duplicate_reply_reported(self):
+        """Testa que respostas duplicadas são reportadas ao callback"""
+        prober = ICMPProber()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        replies = []
+        prober._pending[5] = _PendingEcho(
+            '10.0.0.1', 0.0, future, 3, lambda *args: replies.append(args), timeout=1.0
+        )
+        reply = bytes([0]) + build_echo_request(prober.identifier, 5, b'')[1:]
+        
+        prober._handle_packet(reply, '10.0.0.1', 0.01)
+        prober._handle_packet(reply, '10.0.0.1', 0.02)
+        
+        assert future.result() == pytest.approx(0.01)
+        assert replies == [(3, pytest.approx(0.01), False), (3, pytest.approx(0.02), True)]
+    
+    @pytest.mark.asyncio
+    async def test_burst_send_error_counts_as_loss(self):
+        """Testa que erro de envio conta como perda sem abortar o burst"""
+        prober = ICMPProber()
+        prober._sock = Mock()
+        prober._sock.sendto.side_effect = OSError("Network is unreachable")
+        prober._loop = asyncio.get_running_loop()
+        
+        rtts = await prober.burst('10.0.0.1', 3, timeout=1.0)
+        
+        assert rtts == [None, None, None]
+    
+    @pytest.mark.asyncio
+    async def test_loopback_ping(self):
+        """Testa ping real em loopback (requer ICMP sem privilégio ou CAP_NET_RAW)"""
+        prober = ICMPProber()
+        try:
+            prober._open()
+        except OSError as e:
+            pytest.skip(f"ICMP socket unavailable: {e}")
+        
+        try:
+            rtts = await asyncio.gather(*[prober.ping('127.0.0.1', timeout=1.0) for _ in range(5)])
+            rtts += await prober.burst('127.0.0.1', 5, interval=0.01, timeout=1.0)
+        finally:
+            prober.close()
+        
+        assert all(rtt is not None and rtt >= 0 for rtt in rtts)
+        assert not prober._pending
+    
+    def test_parse_timespec(self):
+        """Testa conversão de struct timespec dos control messages"""
+        data = struct.pack('@ll', 1700000000, 250000000)
+        
+        assert parse_timespec(data) == pytest.approx(1700000000.25)
+    
+    @pytest.mark.asyncio
+    async def test_kernel_timestamps_ignore_loop_stall(self):
+        """Testa que timestamps do kernel não incluem o tempo de loop bloqueado"""
+        prober = ICMPProber(kernel_timestamps=True)
+        try:
+            prober._open()
+        except OSError as e:
+            pytest.skip(f"ICMP socket unavailable: {e}")
+        if not prober.kernel_timestamps:
+            prober.close()
+            pytest.skip("Kernel timestamps unavailable")
+        
+        try:
+            # O kernel habilita o timestamping de recepção de forma diferida
+            await prober.ping('127.0.0.1', timeout=1.0)
+            await asyncio.sleep(0.05)
+            task = asyncio.create_task(prober.ping('127.0.0.1', timeout=1.0))
+            await asyncio.sleep(0)
+            time.sleep(0.05)  # bloqueia o loop com a resposta já na fila
+            rtt = await task
+        finally:
+            prober.close()
+        
+        assert rtt is not None
+        assert rtt < 0.04
 
 
 # ============================================================================
@@ -142,46 +563,432 @@ class TestHTTPMonitor:
         """Fixture do HTTPMonitor"""
         return HTTPMonitor(metrics_manager)
     
+    @pytest.fixture
+    def mock_client(self):
+        """Mock da classe httpx.AsyncClient (requisições montadas via build_request/send)"""
+        with patch('httpx.AsyncClient') as mock_client:
+            client = mock_client.return_value
+            client.build_request = Mock(side_effect=lambda *args, **kwargs: Mock(extensions={}))
+            client.max_redirects = 20
+            client.aclose = AsyncMock()
+            client.__aenter__.return_value = client
+            yield mock_client
+    
+    @staticmethod
+    def _response(status_code=200, next_request=None, chunks=(b'test content',)):
+        """Resposta HTTP simulada com body em streaming"""
+        async def aiter_bytes():
+            for chunk in chunks:
+                yield chunk
+        
+        return Mock(
+            status_code=status_code,
+            http_version='HTTP/1.1',
+            next_request=next_request,
+            aiter_bytes=aiter_bytes,
+            aclose=AsyncMock()
+        )
+    
     @pytest.mark.asyncio
     @pytest.mark.parametrize("status_code", [200, 301, 404, 500])
-    async def test_http_status_codes(self, http_monitor, status_code):
+    async def test_http_status_codes(self, http_monitor, mock_client, status_code):
         """Testa diferentes códigos de status HTTP"""
-        mock_response = AsyncMock()
-        mock_response.status_code = status_code
-        mock_response.content = b'test content'
+        mock_client.return_value.send = AsyncMock(return_value=self._response(status_code))
         
-        with patch('httpx.AsyncClient') as mock_client:
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(
-                return_value=mock_response
-            )
-            
-            result = await http_monitor.check('example.com')
-            
-            assert result['status_code'] == status_code
-            assert result['target'] == 'example.com'
-            assert result['url'] == 'https://example.com'
-            assert 'duration_ms' in result
+        result = await http_monitor.check('example.com')
+        
+        assert result['status_code'] == status_code
+        assert result['target'] == 'example.com'
+        assert result['url'] == 'https://example.com'
+        assert 'duration_ms' in result
     
     @pytest.mark.asyncio
     @pytest.mark.parametrize("exception_class,expected_error", [
         ('TimeoutException', 'timeout'),
         ('RequestError', 'error'),
     ])
-    async def test_http_exceptions(self, http_monitor, exception_class, expected_error):
+    async def test_http_exceptions(self, http_monitor, mock_client, exception_class, expected_error):
         """Testa diferentes exceções HTTP"""
         import httpx
         
         exception = getattr(httpx, exception_class)('Test error')
+        mock_client.return_value.send = AsyncMock(side_effect=exception)
         
-        with patch('httpx.AsyncClient') as mock_client:
-            mock_client.return_value.__aenter__.return_value.get = AsyncMock(
-                side_effect=exception
-            )
-            
-            result = await http_monitor.check('example.com')
-            
-            assert expected_error in result.get('error', result)
-            assert result['target'] == 'example.com'
+        result = await http_monitor.check('example.com')
+        
+        assert expected_error in result.get('error', result)
+        assert result['target'] == 'example.com'
+    
+    @pytest.mark.asyncio
+    async def test_client_reused_across_checks(self, http_monitor, mock_client):
+        """Testa que o cliente keep-alive é criado uma vez e reutilizado"""
+        mock_client.return_value.send = AsyncMock(return_value=self._response())
+        
+        await http_monitor.check('example.com')
+        await http_monitor.check('test.com')
+        
+        assert mock_client.call_count == 1
+        assert mock_client.return_value.send.await_count == 2
+        
+        await http_monitor.aclose()
+        mock_client.return_value.aclose.assert_awaited_once()
+        assert http_monitor._client is None
+    
+    @pytest.mark.asyncio
+    async def test_fresh_connection_targets(self, metrics_manager, mock_client):
+        """Testa que alvos configurados usam conexão nova a cada check"""
+        http_monitor = HTTPMonitor(metrics_manager, fresh_connection_targets=['cold.com'])
+        mock_client.return_value.send = AsyncMock(return_value=self._response())
+        
+        result = await http_monitor.check('cold.com')
+        
+        assert result['fresh_connection'] is True
+        mock_client.return_value.__aexit__.assert_awaited_once()
+        assert http_monitor._client is None
+    
+    def test_pool_limits(self, metrics_manager):
+        """Testa limites do pool de conexões"""
+        http_monitor = HTTPMonitor(
+            metrics_manager, max_connections=10, max_keepalive_connections=5, keepalive_expiry=90
+        )
+        
+        assert http_monitor.limits.max_connections == 10
+        assert http_monitor.limits.max_keepalive_connections == 5
+        assert http_monitor.limits.keepalive_expiry == 90
+    
+    @pytest.mark.asyncio
+    async def test_phase_timer_from_trace_events(self):
+        """Testa durações de fase a partir dos eventos de trace do httpcore"""
+        timer = PhaseTimer()
+        
+        with patch('src.monitoring.http_trace.time.perf_counter', side_effect=[0.0, 0.03, 0.04, 0.09, 0.1, 0.2]):
+            await timer.trace('connection.connect_tcp.started', {})
+            await timer.trace('connection.connect_tcp.complete', {})
+            await timer.trace('connection.start_tls.started', {})
+            await timer.trace('connection.start_tls.complete', {})
+            await timer.trace('http11.receive_response_headers.started', {})
+            await timer.trace('http11.receive_response_headers.complete', {})
+        timer.add('dns', 0.01)
+        
+        phases = timer.phases_ms()
+        
+        assert phases['dns'] == pytest.approx(10)
+        assert phases['connect'] == pytest.approx(20)
+        assert phases['tls'] == pytest.approx(50)
+        assert phases['ttfb'] == pytest.approx(100)
+        assert 'transfer' not in phases
+    
+    @pytest.mark.asyncio
+    async def test_redirect_hops_recorded(self, http_monitor, mock_client, metrics_manager):
+        """Testa que cada hop de redirect registra suas fases com o índice do hop"""
+        async def send(request, **kwargs):
+            await request.extensions['trace']('http11.receive_response_headers.started', {})
+            await request.extensions['trace']('http11.receive_response_headers.complete', {})
+            return responses.pop(0)
+        
+        responses = [self._response(301, next_request=Mock(extensions={})), self._response(200)]
+        mock_client.return_value.send = send
+        
+        result = await http_monitor.check('example.com')
+        
+        assert result['status_code'] == 200
+        assert result['redirects'] == 1
+        hops = [call.args[1]['http.redirect.hop'] for call in metrics_manager.http_ttfb.record.call_args_list]
+        assert hops == [0, 1]
+        metrics_manager.http_duration.record.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_too_many_redirects(self, http_monitor, mock_client):
+        """Testa limite de redirects"""
+        mock_client.return_value.max_redirects = 2
+        mock_client.return_value.send = AsyncMock(
+            return_value=self._response(301, next_request=Mock(extensions={}))
+        )
+        
+        result = await http_monitor.check('example.com')
+        
+        assert 'redirects' in result['error']
+        assert mock_client.return_value.send.await_count == 3
+    
+    @pytest.mark.asyncio
+    async def test_body_streamed_and_capped(self, metrics_manager, mock_client):
+        """Testa leitura em streaming limitada por max_body_bytes"""
+        http_monitor = HTTPMonitor(metrics_manager, max_body_bytes=10)
+        response = self._response(chunks=[b'a' * 6, b'b' * 6, b'c' * 6])
+        mock_client.return_value.send = AsyncMock(return_value=response)
+        
+        result = await http_monitor.check('example.com')
+        
+        assert result['content_length'] == 10
+        assert result['truncated'] is True
+        assert result['sha256'] is None
+        response.aclose.assert_awaited_once()
+        assert mock_client.return_value.send.call_args.kwargs['stream'] is True
+    
+    @pytest.mark.asyncio
+    async def test_content_change_counted(self, metrics_manager, mock_client):
+        """Testa detecção de mudança de conteúdo via hash incremental"""
+        http_monitor = HTTPMonitor(metrics_manager, hash_body=True)
+        mock_client.return_value.send = AsyncMock(side_effect=[
+            self._response(chunks=[b'v1']),
+            self._response(chunks=[b'v', b'1']),
+            self._response(chunks=[b'v2']),
+        ])
+        
+        results = [await http_monitor.check('example.com') for _ in range(3)]
+        
+        assert results[0]['sha256'] == results[1]['sha256'] != results[2]['sha256']
+        metrics_manager.http_content_changes.add.assert_called_once_with(
+            1, {"target": "example.com", "http.method": "GET"}
+        )
+    
+    @pytest.mark.asyncio
+    async def test_head_targets(self, metrics_manager, mock_client):
+        """Testa modo HEAD por target"""
+        http_monitor = HTTPMonitor(metrics_manager, head_targets=['example.com'])
+        mock_client.return_value.send = AsyncMock(return_value=self._response(chunks=[]))
+        
+        result = await http_monitor.check('example.com')
+        
+        assert result['method'] == 'HEAD'
+        assert mock_client.return_value.build_request.call_args.args[0] == 'HEAD'
+        assert metrics_manager.http_duration.record.call_args.args[1]['http.method'] == 'HEAD'
+
+
+# ============================================================================
+# TCP MONITOR TESTS
+# ============================================================================
+
+class TestTCPMonitor:
+    """Testes para TCPMonitor"""
+    
+    @pytest.fixture
+    def tcp_monitor(self, metrics_manager):
+        """Fixture do TCPMonitor"""
+        return TCPMonitor(metrics_manager)
+    
+    @pytest.mark.parametrize("target,expected", [
+        ('example.com:443', ('example.com', 443)),
+        ('10.0.0.1:5432', ('10.0.0.1', 5432)),
+    ])
+    def test_parse_tcp_target(self, target, expected):
+        """Testa parsing de host:port"""
+        assert parse_tcp_target(target) == expected
+    
+    @pytest.mark.parametrize("target", ['example.com', ':443', 'example.com:https'])
+    def test_parse_invalid_tcp_target(self, target):
+        """Testa targets TCP inválidos"""
+        with pytest.raises(ValueError):
+            parse_tcp_target(target)
+    
+    @pytest.mark.asyncio
+    async def test_loopback_connect(self, tcp_monitor, metrics_manager):
+        """Testa handshake TCP real contra servidor local"""
+        server = await asyncio.start_server(lambda reader, writer: writer.close(), '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        
+        async with server:
+            result = await tcp_monitor.check(f'127.0.0.1:{port}')
+        
+        assert result['success'] is True
+        assert result['connect_ms'] >= 0
+        assert result['tls_ms'] is None
+        metrics_manager.tcp_connect_duration.record.assert_called_once()
+        metrics_manager.tcp_tls_duration.record.assert_not_called()
+        metrics_manager.tcp_checks.add.assert_called_once_with(
+            1, {"target": f"127.0.0.1:{port}", "status": "success"}
+        )
+    
+    @pytest.mark.asyncio
+    async def test_kernel_handshake_rtt(self, metrics_manager):
+        """Testa RTT do handshake lido do kernel (TCP_INFO)"""
+        tcp_monitor = TCPMonitor(metrics_manager, kernel_timestamps=True)
+        server = await asyncio.start_server(lambda reader, writer: writer.close(), '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        
+        async with server:
+            result = await tcp_monitor.check(f'127.0.0.1:{port}')
+        
+        if result['timestamp_source'] != 'kernel':
+            pytest.skip("TCP_INFO unavailable")
+        assert 0 < result['connect_ms'] < 100
+        metrics_manager.tcp_connect_duration.record.assert_called_once_with(
+            result['connect_ms'], {"target": f"127.0.0.1:{port}"}
+        )
+    
+    def test_kernel_rtt_without_socket(self):
+        """Testa fallback quando não há socket"""
+        assert kernel_rtt(None) is None
+    
+    @pytest.mark.asyncio
+    async def test_stalled_timing_discarded(self, metrics_manager):
+        """Testa que timings sobrepostos a um travamento do loop são descartados"""
+        loop_lag = LoopLagMonitor(metrics_manager, action="discard")
+        loop_lag.stalls.append((0.0, float('inf')))
+        tcp_monitor = TCPMonitor(metrics_manager, loop_lag=loop_lag)
+        server = await asyncio.start_server(lambda reader, writer: writer.close(), '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        
+        async with server:
+            result = await tcp_monitor.check(f'127.0.0.1:{port}')
+        
+        assert result['success'] is True
+        assert result['loop_stalled'] is True
+        metrics_manager.tcp_connect_duration.record.assert_not_called()
+        metrics_manager.tcp_checks.add.assert_called_once()
+        metrics_manager.contaminated_samples.add.assert_called_once_with(
+            1, {"probe": "tcp", "action": "discard"}
+        )
+    
+    @pytest.mark.asyncio
+    async def test_connection_refused(self, tcp_monitor, metrics_manager):
+        """Testa porta fechada"""
+        server = await asyncio.start_server(lambda reader, writer: None, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        server.close()
+        await server.wait_closed()
+        
+        result = await tcp_monitor.check(f'127.0.0.1:{port}')
+        
+        assert result == {"target": f"127.0.0.1:{port}", "error": "refused", "success": False}
+        metrics_manager.tcp_connect_duration.record.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_connect_timeout(self, tcp_monitor, metrics_manager):
+        """Testa timeout do handshake"""
+        async def never_connects(*args, **kwargs):
+            await asyncio.sleep(10)
+        
+        with patch('asyncio.open_connection', never_connects):
+            result = await tcp_monitor.check('127.0.0.1:443', timeout=0.05)
+        
+        assert result['error'] == 'timeout'
+        metrics_manager.tcp_checks.add.assert_called_once_with(
+            1, {"target": "127.0.0.1:443", "status": "timeout"}
+        )
+    
+    @pytest.mark.asyncio
+    async def test_tls_targets(self, metrics_manager):
+        """Testa handshake TLS para targets configurados"""
+        tcp_monitor = TCPMonitor(metrics_manager, tls_targets=['127.0.0.1:443'])
+        writer = Mock(start_tls=AsyncMock(), wait_closed=AsyncMock())
+        
+        with patch('asyncio.open_connection', AsyncMock(return_value=(Mock(), writer))):
+            result = await tcp_monitor.check('127.0.0.1:443')
+        
+        assert result['tls_ms'] is not None
+        assert writer.start_tls.call_args.kwargs['server_hostname'] == '127.0.0.1'
+        metrics_manager.tcp_tls_duration.record.assert_called_once()
+        writer.close.assert_called_once()
+
+
+# ============================================================================
+# DNS CACHE TESTS
+# ============================================================================
+
+class TestDNSCache:
+    """Testes para o cache de resolução DNS"""
+    
+    @pytest.fixture
+    def dns_cache(self, metrics_manager):
+        """Fixture do DNSCache com consulta mockada"""
+        cache = DNSCache(metrics_manager, min_ttl=1, max_ttl=300, negative_ttl=30)
+        cache._query = AsyncMock(return_value=(['93.184.216.34', '93.184.216.35'], 120))
+        return cache
+    
+    @pytest.mark.asyncio
+    async def test_cached_within_ttl(self, dns_cache, metrics_manager):
+        """Testa que a resolução é feita uma vez e reaproveitada dentro do TTL"""
+        first = await dns_cache.resolve('example.com')
+        second = await dns_cache.resolve('example.com')
+        
+        assert first == second == '93.184.216.34'
+        dns_cache._query.assert_awaited_once_with('example.com')
+        metrics_manager.dns_duration.record.assert_called_once_with(
+            ANY, {"target": "example.com", "status": "success"}
+        )
+    
+    @pytest.mark.asyncio
+    async def test_ttl_clamped_and_expired(self, dns_cache):
+        """Testa que o TTL é limitado por max_ttl e que entradas expiradas são renovadas"""
+        dns_cache._query.return_value = (['10.0.0.1'], 86400)
+        await dns_cache.resolve('example.com')
+        entry = dns_cache._entries['example.com']
+        
+        assert entry.expires_at - time.monotonic() <= 300
+        
+        entry.expires_at = time.monotonic() - 1
+        await dns_cache.resolve('example.com')
+        
+        assert dns_cache._query.await_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_background_refresh_serves_cached_value(self, dns_cache):
+        """Testa que entradas perto de expirar são servidas enquanto renovam em background"""
+        await dns_cache.resolve('example.com')
+        dns_cache._entries['example.com'].refresh_at = time.monotonic() - 1
+        dns_cache._query.return_value = (['10.0.0.2'], 120)
+        
+        assert await dns_cache.resolve('example.com') == '93.184.216.34'
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        
+        assert await dns_cache.resolve('example.com') == '10.0.0.2'
+        assert dns_cache._query.await_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_negative_caching(self, dns_cache, metrics_manager):
+        """Testa que falhas de resolução são cacheadas pelo negative TTL"""
+        dns_cache._query.side_effect = OSError("Name or service not known")
+        
+        for _ in range(3):
+            with pytest.raises(OSError):
+                await dns_cache.resolve('invalid.example')
+        
+        dns_cache._query.assert_awaited_once()
+        metrics_manager.dns_duration.record.assert_called_once_with(
+            ANY, {"target": "invalid.example", "status": "error"}
+        )
+    
+    @pytest.mark.asyncio
+    async def test_failed_refresh_keeps_positive_entry(self, dns_cache):
+        """Testa que falha na renovação mantém a entrada positiva até expirar"""
+        await dns_cache.resolve('example.com')
+        dns_cache._entries['example.com'].refresh_at = time.monotonic() - 1
+        dns_cache._query.side_effect = OSError("SERVFAIL")
+        
+        await dns_cache.resolve('example.com')
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        
+        assert await dns_cache.resolve('example.com') == '93.184.216.34'
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_lookups_share_query(self, dns_cache):
+        """Testa que consultas concorrentes para o mesmo host compartilham uma resolução"""
+        results = await asyncio.gather(*[dns_cache.resolve('example.com') for _ in range(10)])
+        
+        assert set(results) == {'93.184.216.34'}
+        dns_cache._query.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_ip_literal_bypasses_cache(self, dns_cache):
+        """Testa que IPs literais não são resolvidos"""
+        assert await dns_cache.resolve('10.1.2.3') == '10.1.2.3'
+        dns_cache._query.assert_not_awaited()
+    
+    @pytest.mark.asyncio
+    async def test_http_backend_connects_to_cached_address(self, dns_cache):
+        """Testa que o backend HTTP conecta no endereço cacheado"""
+        backend = Mock()
+        backend.connect_tcp = AsyncMock()
+        resolving = _ResolvingBackend(dns_cache, backend)
+        
+        await resolving.connect_tcp('example.com', 443, timeout=5.0)
+        
+        backend.connect_tcp.assert_awaited_once_with(
+            '93.184.216.34', 443, timeout=5.0, local_address=None, socket_options=None
+        )
 
 
 # ============================================================================
@@ -191,9 +998,45 @@ class TestHTTPMonitor:
 class TestMetricsManager:
     """Testes para MetricsManager"""
     
+    def test_prometheus_only_pipeline(self):
+        """Testa OTEL_METRICS_EXPORTER=none com Prometheus: apenas o reader de scrape"""
+        with patch('src.metrics.MeterProvider') as mock_provider, \
+             patch('opentelemetry.exporter.prometheus.PrometheusMetricReader') as mock_reader:
+            manager = MetricsManager(
+                service_name='test-service',
+                otel_endpoint='http://localhost:4317',
+                metrics_exporter='none',
+                prometheus_enabled=True
+            )
+        
+        assert mock_provider.call_args.kwargs['metric_readers'] == [mock_reader.return_value]
+        assert manager.export_queue is None
+        assert manager.wal_exporter is None
+    
+    def test_worker_instance_label(self):
+        """Testa que cada worker exporta com seu próprio label instance"""
+        from src.victoriametrics import resource_labels
+        
+        labels = []
+        for worker_id in (0, 1):
+            with patch('src.metrics.create_otlp_exporter'), \
+                 patch('src.metrics.PeriodicExportingMetricReader'), \
+                 patch('src.metrics.MeterProvider') as mock_provider:
+                MetricsManager(
+                    service_name='network-monitor',
+                    otel_endpoint='http://localhost:4317',
+                    worker_id=worker_id,
+                    export_queue_size=0
+                )
+            labels.append(resource_labels(mock_provider.call_args.kwargs['resource'].attributes))
+        
+        assert labels[0]['job'] == labels[1]['job'] == 'monitoring/network-monitor'
+        assert labels[0]['instance'].endswith('-worker-0')
+        assert labels[1]['instance'].endswith('-worker-1')
+    
     def test_metrics_manager_initialization(self):
         """Testa inicialização e disponibilidade de métricas"""
-        with patch('src.metrics.OTLPMetricExporter'), \
+        with patch('src.metrics.create_otlp_exporter'), \
              patch('src.metrics.PeriodicExportingMetricReader'), \
              patch('src.metrics.MeterProvider'):
             
@@ -206,12 +1049,21 @@ class TestMetricsManager:
             assert manager.otel_endpoint == 'http://localhost:4317'
             
             # Verifica que todas as métricas necessárias existem
-            for metric in ['ping_rtt', 'ping_packet_loss', 'http_duration', 'http_status']:
+            for metric in [
+                'ping_rtt', 'ping_rtt_min', 'ping_rtt_max', 'ping_rtt_stddev', 'ping_jitter',
+                'ping_loss_run', 'ping_reordered', 'ping_duplicates', 'ping_sent',
+                'ping_received', 'dns_duration', 'http_duration', 'http_status', 'http_dns_duration',
+                'http_connect_duration', 'http_tls_duration', 'http_ttfb',
+                'http_transfer_duration', 'http_content_changes', 'tcp_connect_duration',
+                'tcp_tls_duration', 'tcp_checks', 'probe_interval', 'breaker_state',
+                'queue_delay', 'probes_throttled', 'missed_ticks', 'loop_lag',
+                'contaminated_samples'
+            ]:
                 assert hasattr(manager, metric)
     
     def test_metrics_recording(self):
         """Testa que métricas podem ser gravadas sem erros"""
-        with patch('src.metrics.OTLPMetricExporter'), \
+        with patch('src.metrics.create_otlp_exporter'), \
              patch('src.metrics.PeriodicExportingMetricReader'), \
              patch('src.metrics.MeterProvider'):
             
@@ -222,7 +1074,7 @@ class TestMetricsManager:
             
             # Testa gravação de cada tipo de métrica
             manager.ping_rtt.record(50.5, {"target": "example.com"})
-            manager.ping_packet_loss.record(0.0, {"target": "example.com"})
+            manager.ping_sent.add(10, {"target": "example.com"})
             manager.http_duration.record(150.0, {
                 "target": "example.com",
                 "http.method": "GET",
@@ -233,84 +1085,751 @@ class TestMetricsManager:
                 "http.method": "GET",
                 "http.status_code": 200
             })
-
-
-# ============================================================================
-# HEALTH CHECK SERVER TESTS
-# ============================================================================
-
-class TestHealthCheckServer:
-    """Testes para HealthCheckServer"""
     
-    def test_health_check_handler_success(self):
-        """Testa resposta de sucesso do health check"""
-        from src.utils.health_check import HealthCheckHandler
-        from io import BytesIO
+    @staticmethod
+    def _export(views, name):
+        """Grava em um MeterProvider isolado com as views e retorna o ponto exportado"""
+        reader = InMemoryMetricReader()
+        provider = MeterProvider(metric_readers=[reader], views=views)
+        histogram = provider.get_meter('test').create_histogram(name, unit='ms')
+        for value in (0.3, 0.8, 4.0):
+            histogram.record(value, {"target": "example.com"})
         
-        mock_wfile = BytesIO()
-        handler = HealthCheckHandler.__new__(HealthCheckHandler)
-        handler.wfile = mock_wfile
-        handler.path = '/health'
-        handler.send_response = Mock()
-        handler.send_header = Mock()
-        handler.end_headers = Mock()
+        data = reader.get_metrics_data()
+        provider.shutdown()
+        metric = data.resource_metrics[0].scope_metrics[0].metrics[0]
+        return metric.data.data_points[0]
+    
+    def test_histogram_bucket_views(self):
+        """Testa buckets por instrumento (padrão sobrescrito via config)"""
+        with patch('src.metrics.create_otlp_exporter'), \
+             patch('src.metrics.PeriodicExportingMetricReader'), \
+             patch('src.metrics.MeterProvider'):
+            manager = MetricsManager(
+                service_name='test-service',
+                otel_endpoint='http://localhost:4317',
+                histogram_buckets={'network.ping.rtt': [2, 0.5, 1]}
+            )
         
-        handler.do_GET()
+        point = self._export(manager._views(), 'network.ping.rtt')
         
-        handler.send_response.assert_called_with(200)
-        handler.send_header.assert_called_with('Content-Type', 'application/json')
-        assert mock_wfile.getvalue() == b'{"status": "healthy"}'
+        assert tuple(point.explicit_bounds) == (0.5, 1, 2)
+        assert list(point.bucket_counts) == [1, 1, 0, 1]
+        assert manager.histogram_buckets['http.client.duration'] == DEFAULT_HISTOGRAM_BUCKETS['http.client.duration']
     
-    def test_health_check_handler_not_found(self):
-        """Testa resposta 404 para rota desconhecida"""
-        from src.utils.health_check import HealthCheckHandler
-        from io import BytesIO
+    def test_exponential_histogram_views(self):
+        """Testa agregação em histograma exponencial base 2"""
+        with patch('src.metrics.create_otlp_exporter'), \
+             patch('src.metrics.PeriodicExportingMetricReader'), \
+             patch('src.metrics.MeterProvider'):
+            manager = MetricsManager(
+                service_name='test-service',
+                otel_endpoint='http://localhost:4317',
+                exponential_histograms=True,
+                exponential_max_size=40
+            )
         
-        handler = HealthCheckHandler.__new__(HealthCheckHandler)
-        handler.wfile = BytesIO()
-        handler.path = '/unknown'
-        handler.send_response = Mock()
-        handler.end_headers = Mock()
+        point = self._export(manager._views(), 'http.client.ttfb')
         
-        handler.do_GET()
+        assert isinstance(point, ExponentialHistogramDataPoint)
+        assert point.count == 3
+        assert len(point.positive.bucket_counts) <= 40
+
+
+# ============================================================================
+# ATTRIBUTE CACHE TESTS
+# ============================================================================
+
+class TestAttributeCache:
+    """Testes para os conjuntos de atributos internados"""
+    
+    def test_interned_per_values(self):
+        """Testa que os mesmos valores retornam o mesmo objeto imutável"""
+        cache = AttributeCache("target", "status")
+        attributes = cache.get("example.com", "success")
         
-        handler.send_response.assert_called_with(404)
+        assert cache.get("example.com", "success") is attributes
+        assert attributes == {"target": "example.com", "status": "success"}
+        assert frozenset(attributes.items()) is attributes.items()
+        with pytest.raises(TypeError):
+            attributes["status"] = "error"
     
-    def test_health_check_handler_silent_logging(self):
-        """Testa que log_message é silencioso"""
-        from src.utils.health_check import HealthCheckHandler
+    @pytest.mark.asyncio
+    async def test_monitor_reuses_attribute_sets(self, metrics_manager):
+        """Testa que checks consecutivos reutilizam o mesmo conjunto de atributos"""
+        tcp_monitor = TCPMonitor(metrics_manager)
+        server = await asyncio.start_server(lambda reader, writer: writer.close(), '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
         
-        handler = HealthCheckHandler.__new__(HealthCheckHandler)
-        result = handler.log_message("test %s", "message")
+        async with server:
+            await tcp_monitor.check(f'127.0.0.1:{port}')
+            await tcp_monitor.check(f'127.0.0.1:{port}')
         
-        assert result is None
-    
-    def test_health_check_server_lifecycle(self):
-        """Testa ciclo de vida do servidor (start/stop)"""
-        from src.utils.health_check import HealthCheckServer
-
-        with patch('src.utils.health_check.HTTPServer') as mock_http_server:
-            mock_server_instance = Mock()
-            mock_http_server.return_value = mock_server_instance
-            
-            server = HealthCheckServer(8080)
-            server.server = mock_server_instance
-            
-            # Testa stop com servidor ativo
-            server.stop()
-            mock_server_instance.shutdown.assert_called_once()
-            
-            # Testa stop sem servidor (não deve lançar exceção)
-            server.server = None
-            server.stop()  # Não deve falhar
+        first, second = metrics_manager.tcp_connect_duration.record.call_args_list
+        assert isinstance(first.args[1], AttributeSet)
+        assert first.args[1] is second.args[1]
 
 
 # ============================================================================
-# NETWORK MONITOR TESTS
+# EXPORT PIPELINE TESTS
 # ============================================================================
 
-class TestNetworkMonitor:
-    """Testes para NetworkMonitor"""
+class TestExportPipeline:
+    """Testes para o pipeline de exportação OTLP"""
+    
+    @staticmethod
+    def _metrics_data():
+        """Coleta 5 pontos de um counter e 2 de um histograma"""
+        reader = InMemoryMetricReader()
+        provider = MeterProvider(metric_readers=[reader])
+        meter = provider.get_meter('test')
+        counter = meter.create_counter('test.counter')
+        histogram = meter.create_histogram('test.histogram')
+        for i in range(5):
+            counter.add(1, {"target": f"host{i}"})
+        for i in range(2):
+            histogram.record(1.0, {"target": f"host{i}"})
+        
+        data = reader.get_metrics_data()
+        provider.shutdown()
+        return data
+    
+    @staticmethod
+    def _points(metrics_data):
+        """Retorna (nome da métrica, quantidade de pontos) de cada métrica"""
+        return [
+            (metric.name, len(metric.data.data_points))
+            for resource_metrics in metrics_data.resource_metrics
+            for scope_metrics in resource_metrics.scope_metrics
+            for metric in scope_metrics.metrics
+        ]
+    
+    def test_grpc_exporter_temporality(self):
+        """Testa preferência de temporalidade delta (UpDownCounter permanece cumulativo)"""
+        exporter = create_otlp_exporter('localhost:4317', temporality='delta', compression='gzip')
+        
+        assert exporter._preferred_temporality[Counter] == AggregationTemporality.DELTA
+        assert exporter._preferred_temporality[Histogram] == AggregationTemporality.DELTA
+        assert exporter._preferred_temporality[UpDownCounter] == AggregationTemporality.CUMULATIVE
+        exporter.shutdown()
+    
+    def test_http_exporter_endpoint_and_batching(self):
+        """Testa caminho /v1/metrics e divisão em lotes no exportador HTTP"""
+        exporter = create_otlp_exporter(
+            'http://otel-collector:4318', protocol='http/protobuf', max_export_batch_size=100
+        )
+        
+        assert isinstance(exporter, BatchingExporter)
+        assert exporter.exporter._endpoint == 'http://otel-collector:4318/v1/metrics'
+        assert exporter._preferred_temporality[Counter] == AggregationTemporality.CUMULATIVE
+    
+    @pytest.mark.parametrize('kwargs', [
+        {'protocol': 'thrift'},
+        {'compression': 'zstd'},
+        {'temporality': 'sometimes'},
+    ])
+    def test_invalid_settings(self, kwargs):
+        """Testa rejeição de valores inválidos"""
+        with pytest.raises(ValueError):
+            create_otlp_exporter('localhost:4317', **kwargs)
+    
+    def test_split_metrics_data(self):
+        """Testa divisão em lotes preservando metadados das métricas"""
+        data = self._metrics_data()
+        
+        batches = list(split_metrics_data(data, 3))
+        
+        assert [self._points(batch) for batch in batches] == [
+            [('test.counter', 3)],
+            [('test.counter', 2), ('test.histogram', 1)],
+            [('test.histogram', 1)],
+        ]
+        resource = data.resource_metrics[0].resource
+        assert all(batch.resource_metrics[0].resource is resource for batch in batches)
+    
+    def test_batching_exporter_stops_on_failure(self):
+        """Testa que um lote com falha interrompe a exportação"""
+        inner = Mock()
+        inner._preferred_temporality = {}
+        inner._preferred_aggregation = {}
+        inner.export.side_effect = [MetricExportResult.SUCCESS, MetricExportResult.FAILURE]
+        exporter = BatchingExporter(inner, 2)
+        
+        assert exporter.export(self._metrics_data()) is MetricExportResult.FAILURE
+        assert inner.export.call_count == 2
+    
+    def test_batching_exporter_returns_unsent(self):
+        """Testa que só o lote com falha e os seguintes voltam como não enviados"""
+        inner = Mock()
+        inner._preferred_temporality = {}
+        inner._preferred_aggregation = {}
+        inner.export.side_effect = [MetricExportResult.SUCCESS, MetricExportResult.FAILURE]
+        exporter = BatchingExporter(inner, 2)
+        
+        unsent = exporter.export_unsent(self._metrics_data())
+        
+        points = [
+            len(metric.data.data_points)
+            for resource_metrics in unsent.resource_metrics
+            for scope_metrics in resource_metrics.scope_metrics
+            for metric in scope_metrics.metrics
+        ]
+        assert sum(points) == 5
+        assert inner.export.call_count == 2
+    
+    def test_tracking_exporter(self):
+        """Testa que last_success só avança com exports aceitos pelo backend"""
+        inner = Mock()
+        inner._preferred_temporality = {}
+        inner._preferred_aggregation = {}
+        inner.export.side_effect = [MetricExportResult.FAILURE, MetricExportResult.SUCCESS]
+        exporter = TrackingExporter(inner)
+        
+        exporter.export(self._metrics_data())
+        assert exporter.last_success is None
+        exporter.export(self._metrics_data())
+        assert time.time() - exporter.last_success < 1
+
+
+# ============================================================================
+# EXPORT QUEUE TESTS
+# ============================================================================
+
+class _BlockingExporter(MetricExporter):
+    """Exportador que segura cada export até `release` ser sinalizado"""
+    
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.exported = []
+    
+    def export(self, metrics_data, timeout_millis=10_000, **kwargs):
+        self.started.set()
+        self.release.wait(5)
+        self.exported.append(metrics_data)
+        return MetricExportResult.SUCCESS
+    
+    def force_flush(self, timeout_millis=10_000):
+        return True
+    
+    def shutdown(self, timeout_millis=30_000, **kwargs):
+        pass
+
+
+class TestExportQueue:
+    """Testes para a fila de exportação"""
+    
+    @staticmethod
+    def _metrics_data(*names):
+        """Coleta um counter para cada nome informado"""
+        reader = InMemoryMetricReader()
+        provider = MeterProvider(metric_readers=[reader])
+        meter = provider.get_meter('test')
+        for name in names:
+            meter.create_counter(name).add(1)
+        data = reader.get_metrics_data()
+        provider.shutdown()
+        return data
+    
+    @staticmethod
+    def _names(exported):
+        """Retorna o nome da métrica de cada export"""
+        return [data.resource_metrics[0].scope_metrics[0].metrics[0].name for data in exported]
+    
+    def _fill(self, queue, inner, names):
+        """Ocupa o thread de export e enfileira os exports informados"""
+        queue.export(self._metrics_data('in.flight'))
+        assert inner.started.wait(5)
+        return [queue.export(self._metrics_data(name)) for name in names]
+    
+    def test_drop_oldest(self):
+        """Testa descarte do export mais antigo com a fila cheia"""
+        inner = _BlockingExporter()
+        durations = []
+        queue = QueueingExporter(inner, max_size=2, on_export=lambda duration, result: durations.append(result))
+        
+        results = self._fill(queue, inner, ['a', 'b', 'c'])
+        assert len(queue) == 2
+        inner.release.set()
+        assert queue.force_flush() is True
+        queue.shutdown()
+        
+        assert results == [MetricExportResult.SUCCESS] * 3
+        assert self._names(inner.exported) == ['in.flight', 'b', 'c']
+        assert queue.dropped == 1
+        assert durations == [MetricExportResult.SUCCESS] * 3
+    
+    def test_drop_newest(self):
+        """Testa rejeição do export novo com a fila cheia"""
+        inner = _BlockingExporter()
+        queue = QueueingExporter(inner, max_size=2, drop_policy='newest')
+        
+        results = self._fill(queue, inner, ['a', 'b', 'c'])
+        inner.release.set()
+        queue.shutdown()
+        
+        assert results[-1] is MetricExportResult.FAILURE
+        assert self._names(inner.exported) == ['in.flight', 'a', 'b']
+    
+    def test_drop_by_priority(self):
+        """Testa descarte do export de menor prioridade"""
+        inner = _BlockingExporter()
+        queue = QueueingExporter(
+            inner, max_size=2, drop_policy='priority',
+            priorities={'network.ping': 2, 'network.ping.rtt.min': 0, 'http': 1}
+        )
+        
+        assert [priority for priority, _ in queue.split_by_priority(self._metrics_data('network.ping.rtt.min'))] == [0]
+        results = self._fill(queue, inner, ['network.ping.rtt', 'other', 'http.client.duration', 'misc'])
+        inner.release.set()
+        queue.shutdown()
+        
+        assert results == [MetricExportResult.SUCCESS] * 3 + [MetricExportResult.FAILURE]
+        assert self._names(inner.exported) == ['in.flight', 'network.ping.rtt', 'http.client.duration']
+        assert queue.dropped == 2
+    
+    def test_drop_by_priority_per_metric(self):
+        """Testa que a prioridade vale por métrica em coletas com todos os instrumentos"""
+        inner = _BlockingExporter()
+        queue = QueueingExporter(inner, max_size=3, drop_policy='priority', priorities={'network.ping': 2, 'http': 1})
+        names = ('network.ping.rtt', 'http.client.duration', 'other')
+        
+        split = queue.split_by_priority(self._metrics_data(*names))
+        assert [(priority, self._names([data])) for priority, data in split] == [
+            (2, ['network.ping.rtt']), (1, ['http.client.duration']), (0, ['other'])
+        ]
+        
+        self._fill(queue, inner, [])
+        results = [queue.export(self._metrics_data(*names)) for _ in range(2)]
+        inner.release.set()
+        queue.shutdown()
+        
+        # A segunda coleta descarta 'other' e 'http' da primeira e o próprio 'other'
+        assert results == [MetricExportResult.SUCCESS, MetricExportResult.FAILURE]
+        assert self._names(inner.exported) == [
+            'in.flight', 'network.ping.rtt', 'network.ping.rtt', 'http.client.duration'
+        ]
+        assert queue.dropped == 3
+    
+    def test_export_does_not_block(self):
+        """Testa que export retorna imediatamente mesmo com o backend travado"""
+        inner = _BlockingExporter()
+        queue = QueueingExporter(inner, max_size=4)
+        queue.export(self._metrics_data('in.flight'))
+        assert inner.started.wait(5)
+        
+        start = time.perf_counter()
+        queue.export(self._metrics_data('next'))
+        elapsed = time.perf_counter() - start
+        
+        assert elapsed < 0.05
+        assert queue.force_flush(timeout_millis=10) is False
+        inner.release.set()
+        queue.shutdown()
+
+
+# ============================================================================
+# VICTORIAMETRICS EXPORTER TESTS
+# ============================================================================
+
+@pytest.fixture
+def import_server():
+    """Servidor HTTP local no lugar do VictoriaMetrics; guarda as requisições recebidas"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    requests = []
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            if self.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            requests.append((self.path, self.client_address[1], body.decode()))
+            self.send_response(server.statuses.pop(0) if server.statuses else server.status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.status = 204
+    server.statuses = []
+    server.requests = requests
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestVictoriaMetricsExporter:
+    """Testes para o exportador direto ao VictoriaMetrics"""
+    
+    @staticmethod
+    def _metrics_data():
+        """Coleta counter, histograma e gauge como o agente exporta"""
+        reader = InMemoryMetricReader()
+        provider = MeterProvider(
+            resource=Resource.create({"service.name": "network-monitor", "service.namespace": "monitoring"}),
+            metric_readers=[reader],
+            views=[View(instrument_name='network.ping.rtt', aggregation=ExplicitBucketHistogramAggregation([1, 10]))]
+        )
+        meter = provider.get_meter('test')
+        meter.create_counter('network.ping.sent', unit='1').add(10, {"target": "example.com"})
+        rtt = meter.create_histogram('network.ping.rtt', unit='ms')
+        for value in (0.5, 5.0, 50.0):
+            rtt.record(value, {"target": "example.com"})
+        meter.create_gauge('network.monitor.breaker_state', unit='1').set(0, {"target": "a\"b"})
+        data = reader.get_metrics_data()
+        provider.shutdown()
+        return data
+    
+    def test_metric_names_match_collector(self):
+        """Testa nomes iguais aos gerados pelo prometheusremotewrite (dashboards)"""
+        assert metric_name('network.ping.rtt', 'ms') == 'network_ping_rtt_milliseconds'
+        assert metric_name('network.ping.received', '1', monotonic_sum=True) == 'network_ping_received_total'
+        assert metric_name('viaipe.client.availability', '%', gauge=True) == 'viaipe_client_availability_percent'
+        assert metric_name('viaipe.bandwidth.usage.in', 'bps', gauge=True) == 'viaipe_bandwidth_usage_in_bps'
+        assert metric_name('network.monitor.breaker_state', '1', gauge=True) == 'network_monitor_breaker_state_ratio'
+    
+    def test_export_to_import_api(self, import_server):
+        """Testa linhas no formato de importação, gzip e labels de resource"""
+        url = f'http://127.0.0.1:{import_server.server_port}'
+        exporter = VictoriaMetricsExporter(url, compression='gzip')
+        
+        assert exporter.export(self._metrics_data()) is MetricExportResult.SUCCESS
+        exporter.shutdown()
+        
+        (path, _, body), = import_server.requests
+        lines = [line.rsplit(' ', 1)[0] for line in body.splitlines()]
+        labels = 'job="monitoring/network-monitor",target="example.com"'
+        assert path == '/api/v1/import/prometheus'
+        assert f'network_ping_sent_total{{{labels}}} 10' in lines
+        assert f'network_ping_rtt_milliseconds_bucket{{{labels},le="1"}} 1' in lines
+        assert f'network_ping_rtt_milliseconds_bucket{{{labels},le="10"}} 2' in lines
+        assert f'network_ping_rtt_milliseconds_bucket{{{labels},le="+Inf"}} 3' in lines
+        assert f'network_ping_rtt_milliseconds_count{{{labels}}} 3' in lines
+        assert f'network_ping_rtt_milliseconds_sum{{{labels}}} 55.5' in lines
+        assert 'network_monitor_breaker_state_ratio{job="monitoring/network-monitor",target="a\\"b"} 0' in lines
+    
+    def test_batches_reuse_connection(self, import_server):
+        """Testa divisão em lotes sobre a mesma conexão keep-alive"""
+        url = f'http://127.0.0.1:{import_server.server_port}'
+        exporter = VictoriaMetricsExporter(url, compression='none', max_batch_samples=3)
+        
+        exporter.export(self._metrics_data())
+        exporter.export(self._metrics_data())
+        exporter.shutdown()
+        
+        # Um ponto de histograma nunca é dividido entre requisições
+        assert [len(body.splitlines()) for _, _, body in import_server.requests] == [6, 1, 6, 1]
+        assert len({port for _, port, _ in import_server.requests}) == 1
+    
+    def test_export_shares_one_deadline(self):
+        """Testa que as requisições de um export dividem um único timeout"""
+        timeouts = []
+        
+        def post(url, content, headers, timeout):
+            timeouts.append(timeout)
+            time.sleep(0.06)
+            return Mock(status_code=204)
+        
+        client = Mock(post=Mock(side_effect=post))
+        exporter = VictoriaMetricsExporter('http://vm:8428', max_batch_samples=1, client=client)
+        
+        # 3 lotes (counter, histograma, gauge): o terceiro já passou do prazo
+        unsent = exporter.export_unsent(self._metrics_data(), timeout_millis=100)
+        
+        assert [metric.name for metric in unsent.resource_metrics[0].scope_metrics[0].metrics] == [
+            'network.monitor.breaker_state'
+        ]
+        assert len(timeouts) == 2
+        assert timeouts[0] <= 0.1
+        assert 0 < timeouts[1] < 0.05
+    
+    def test_wal_keeps_only_unsent_batches(self, import_server, tmp_path):
+        """Testa que uma falha no segundo lote só grava no WAL os lotes não importados"""
+        url = f'http://127.0.0.1:{import_server.server_port}'
+        exporter = WALExporter(
+            VictoriaMetricsExporter(url, compression='none', max_batch_samples=3),
+            WriteAheadLog(str(tmp_path)), replay_rate=0, retry_interval=3600
+        )
+        import_server.statuses = [204, 500]
+        
+        assert exporter.export(self._metrics_data()) is MetricExportResult.SUCCESS
+        assert len(exporter.wal) == 1
+        assert exporter.replay() is True
+        exporter.shutdown()
+        
+        bodies = [body for _, _, body in import_server.requests]
+        assert len(bodies) == 3
+        assert 'network_ping_sent_total' in bodies[0]
+        # O lote reenviado é só o que falhou, sem reimportar o primeiro
+        assert bodies[1] == bodies[2]
+        assert bodies[2].startswith('network_monitor_breaker_state_ratio')
+    
+    def test_export_failures(self, import_server):
+        """Testa falha em respostas de erro e com o servidor fora do ar"""
+        url = f'http://127.0.0.1:{import_server.server_port}'
+        import_server.status = 400
+        exporter = VictoriaMetricsExporter(url)
+        
+        assert exporter.export(self._metrics_data()) is MetricExportResult.FAILURE
+        exporter.shutdown()
+        
+        unreachable = VictoriaMetricsExporter('http://127.0.0.1:1', timeout=1)
+        assert unreachable.export(self._metrics_data()) is MetricExportResult.FAILURE
+        unreachable.shutdown()
+
+
+# ============================================================================
+# WRITE-AHEAD LOG TESTS
+# ============================================================================
+
+class _FlakyExporter(MetricExporter):
+    """Exportador que falha enquanto `down` for verdadeiro"""
+    
+    def __init__(self):
+        super().__init__()
+        self.down = False
+        self.exported = []
+    
+    def export(self, metrics_data, timeout_millis=10_000, **kwargs):
+        if self.down:
+            return MetricExportResult.FAILURE
+        self.exported.append(metrics_data)
+        return MetricExportResult.SUCCESS
+    
+    def force_flush(self, timeout_millis=10_000):
+        return True
+    
+    def shutdown(self, timeout_millis=30_000, **kwargs):
+        pass
+
+
+class TestWriteAheadLog:
+    """Testes para o WAL de exportação"""
+    
+    @staticmethod
+    def _metrics_data(value):
+        """Coleta um counter com o valor informado (resource com BoundedAttributes)"""
+        reader = InMemoryMetricReader()
+        provider = MeterProvider(resource=Resource.create({"service.name": "test"}), metric_readers=[reader])
+        provider.get_meter('test').create_counter('test.counter').add(value, AttributeSet(target="example.com"))
+        data = reader.get_metrics_data()
+        provider.shutdown()
+        return data
+    
+    @staticmethod
+    def _value(metrics_data):
+        """Retorna o valor do primeiro ponto"""
+        return metrics_data.resource_metrics[0].scope_metrics[0].metrics[0].data.data_points[0].value
+    
+    def test_append_replay_in_order_with_rotation(self, tmp_path):
+        """Testa leitura em ordem entre segmentos e remoção dos já consumidos"""
+        wal = WriteAheadLog(str(tmp_path), segment_bytes=1)
+        for value in (1, 2, 3):
+            wal.append(dump_metrics_data(self._metrics_data(value)))
+        
+        assert len(list(tmp_path.glob('*.wal'))) == 3
+        values = []
+        while (data := wal.peek()) is not None:
+            values.append(self._value(data))
+            wal.commit()
+        
+        assert values == [1, 2, 3]
+        assert wal.bytes == 0
+        assert len(list(tmp_path.glob('*.wal'))) == 1
+    
+    def test_recovery_after_restart(self, tmp_path):
+        """Testa que cursor persistido e cauda truncada são respeitados ao reabrir"""
+        wal = WriteAheadLog(str(tmp_path))
+        for value in (1, 2, 3):
+            wal.append(dump_metrics_data(self._metrics_data(value)))
+        wal.peek()
+        wal.commit()
+        wal.close()
+        segment = next(tmp_path.glob('*.wal'))
+        with open(segment, 'ab') as file:
+            file.write(b'\x00\x00\x10')
+        
+        reopened = WriteAheadLog(str(tmp_path))
+        
+        assert len(reopened) == 2
+        assert self._value(reopened.peek()) == 2
+        reopened.append(dump_metrics_data(self._metrics_data(4)))
+        assert reopened._write_segment > int(segment.stem)
+    
+    def test_max_bytes_drops_oldest(self, tmp_path):
+        """Testa descarte dos lotes mais antigos acima do limite"""
+        payload = dump_metrics_data(self._metrics_data(1))
+        wal = WriteAheadLog(str(tmp_path), max_bytes=int(len(payload) * 2.5))
+        for _ in range(4):
+            wal.append(payload)
+        
+        assert len(wal) == 2
+        assert wal.dropped == 2
+        assert wal.bytes <= wal.max_bytes
+    
+    def test_exporter_buffers_and_replays(self, tmp_path):
+        """Testa que exports com falha vão para o WAL e são reenviados em ordem"""
+        inner = _FlakyExporter()
+        exporter = WALExporter(inner, WriteAheadLog(str(tmp_path)), replay_rate=0, retry_interval=3600)
+        inner.down = True
+        
+        assert exporter.export(self._metrics_data(1)) is MetricExportResult.SUCCESS
+        inner.down = False
+        # Com backlog pendente o novo lote entra na fila para manter a ordem
+        exporter.export(self._metrics_data(2))
+        assert inner.exported == []
+        assert exporter.wal.oldest_age() >= 0
+        
+        assert exporter.replay() is True
+        exporter.export(self._metrics_data(3))
+        exporter.shutdown()
+        
+        assert [self._value(data) for data in inner.exported] == [1, 2, 3]
+        assert exporter.replayed == 2
+        assert len(exporter.wal) == 0
+    
+    @patch.dict('os.environ', {'WAL_ENABLED': 'true', 'WAL_DIR': '/var/lib/wal', 'WAL_FSYNC': 'ALWAYS',
+                               'EXPORT_DROP_POLICY': 'Priority', 'EXPORT_PRIORITIES': 'network.ping=2,http=1'})
+    def test_config(self):
+        """Testa configuração do WAL e da fila de exportação via env vars"""
+        config = Config.from_env()
+        
+        assert config.wal_enabled is True
+        assert config.wal_dir == '/var/lib/wal'
+        assert config.wal_fsync == 'always'
+        assert config.wal_replay_rate == 10.0
+        assert config.export_queue_size == 8
+        assert config.export_drop_policy == 'priority'
+        assert config.export_priorities == {'network.ping': 2, 'http': 1}
+        assert config.metrics_exporter == 'otlp'
+        assert config.prometheus_enabled is False
+        assert config.health_live_max_lag == 5.0
+        assert config.health_export_max_age == 30.0
+
+
+# ============================================================================
+# HEALTH CHECK SERVER TESTS
+# ============================================================================
+
+class TestHealthCheckServer:
+    """Testes para o HealthCheckServer (asyncio, no event loop do agente)"""
+    
+    @staticmethod
+    async def _start(**kwargs):
+        """Inicia um servidor em porta efêmera e retorna (servidor, URL base)"""
+        from src.utils.health_check import HealthCheckServer
+        
+        server = HealthCheckServer(0, **kwargs)
+        await server.start()
+        return server, f"http://127.0.0.1:{server.server.sockets[0].getsockname()[1]}"
+    
+    @pytest.mark.asyncio
+    async def test_livez_and_readyz(self):
+        """Testa /livez, /health (alias) e /readyz com rodada recente e export antigo"""
+        import httpx
+        
+        server, url = await self._start(heartbeat_interval=0.05)
+        server.add_check("probe_round", time.time, 60)
+        server.add_check("export", lambda: time.time() - 120, 30)
+        try:
+            async with httpx.AsyncClient() as client:
+                live = await client.get(f"{url}/livez")
+                health = await client.get(f"{url}/health")
+                ready = await client.get(f"{url}/readyz")
+                unknown = await client.get(f"{url}/unknown")
+        finally:
+            await server.stop()
+        
+        assert live.status_code == 200
+        assert health.status_code == 200
+        assert live.json()["checks"]["event_loop"]["ok"] is True
+        assert ready.status_code == 503
+        assert ready.json()["status"] == "unavailable"
+        assert ready.json()["checks"]["probe_round"]["ok"] is True
+        assert ready.json()["checks"]["export"]["age_seconds"] >= 120
+        assert unknown.status_code == 404
+    
+    @pytest.mark.asyncio
+    async def test_livez_fails_after_blocking_call(self):
+        """Testa que uma chamada bloqueante no event loop derruba o /livez"""
+        server, _ = await self._start(heartbeat_interval=0.05, live_max_lag=0.2)
+        try:
+            time.sleep(0.4)  # Bloqueia o event loop
+            stalled = server.status()
+            await asyncio.sleep(0.1)
+            recovered = server.status()
+        finally:
+            await server.stop()
+        
+        assert stalled["live"] is False
+        assert stalled["ready"] is False
+        assert recovered["live"] is True
+    
+    @pytest.mark.asyncio
+    async def test_readiness_grace_period(self):
+        """Testa que, antes do primeiro sucesso, a idade conta a partir do start"""
+        server, _ = await self._start()
+        server.add_check("probe_round", lambda: None, 60)
+        try:
+            assert server.status()["ready"] is True
+            server.started -= 120
+            assert server.status()["ready"] is False
+        finally:
+            await server.stop()
+        
+        # stop() é idempotente
+        await server.stop()
+        assert server.server is None
+    
+    @pytest.mark.asyncio
+    async def test_metrics_endpoint(self):
+        """Testa /metrics servido pelo PrometheusMetricReader (texto, OpenMetrics e gzip)"""
+        import httpx
+        from opentelemetry.exporter.prometheus import PrometheusMetricReader
+        from prometheus_client import REGISTRY
+        
+        reader = PrometheusMetricReader()
+        provider = MeterProvider(
+            resource=Resource.create({'service.name': 'network-monitor'}),
+            metric_readers=[reader]
+        )
+        provider.get_meter('test').create_counter('network.ping.sent').add(3, {'target': 'host1'})
+        
+        server, url = await self._start(metrics_registry=REGISTRY)
+        try:
+            async with httpx.AsyncClient() as client:
+                text = await client.get(f"{url}/metrics", headers={'Accept-Encoding': 'identity'})
+                openmetrics = await client.get(f"{url}/metrics", headers={
+                    'Accept': 'application/openmetrics-text; version=1.0.0',
+                    'Accept-Encoding': 'gzip'
+                })
+        finally:
+            await server.stop()
+            # Remove o collector do registry global
+            provider.shutdown()
+        
+        assert text.headers['Content-Type'].startswith('text/plain')
+        assert 'Content-Encoding' not in text.headers
+        assert 'network_ping_sent_total{target="host1"} 3.0' in text.text
+        assert openmetrics.headers['Content-Type'].startswith('application/openmetrics-text')
+        assert openmetrics.headers['Content-Encoding'] == 'gzip'
+        assert openmetrics.text.endswith('# EOF\n')
+
+
+# ============================================================================
+# NETWORK MONITOR TESTS
+# ============================================================================
+
+class TestNetworkMonitor:
+    """Testes para NetworkMonitor"""
     
     @pytest.mark.asyncio
     async def test_initialization(self, test_config):
@@ -338,6 +1857,7 @@ class TestNetworkMonitor:
     @pytest.mark.parametrize("loop_method,monitor_attr", [
         ('_ping_loop', 'ping_monitor'),
         ('_http_loop', 'http_monitor'),
+        ('_tcp_loop', 'tcp_monitor'),
     ])
     async def test_monitoring_loops(self, test_config, loop_method, monitor_attr):
         """Testa loops de monitoramento (ping e HTTP)"""
@@ -384,10 +1904,568 @@ class TestNetworkMonitor:
             
             monitor._ping_loop = mock_ping_loop
             monitor._http_loop = mock_http_loop
+            monitor._tcp_loop = mock_http_loop
+            monitor._lag_loop = mock_http_loop
             
             await monitor.run()
             
             assert monitor.running is False
+    
+    @pytest.mark.asyncio
+    async def test_adaptive_interval_hook(self, test_config):
+        """Testa que o modo adaptativo ajusta o intervalo do job e exporta o gauge"""
+        test_config.adaptive_intervals = True
+        with patch('src.monitoring.monitor.MetricsManager'):
+            monitor = NetworkMonitor(test_config)
+            scheduler = monitor._scheduler()
+            job = scheduler.add("http", "example.com", 60, AsyncMock())
+            
+            scheduler.on_complete(job, {"target": "example.com", "error": "timeout"})
+            
+            assert job.interval == 30
+            assert monitor.intervals[("http", "example.com")].floor == 15
+            monitor.metrics_manager.probe_interval.set.assert_called_with(
+                30, {"target": "example.com", "probe": "http"}
+            )
+
+# ============================================================================
+# SCHEDULER TESTS
+# ============================================================================
+
+class TestProbeScheduler:
+    """Testes para o ProbeScheduler"""
+    
+    @staticmethod
+    def stop_after(seconds):
+        """Predicado should_run que expira após alguns segundos"""
+        deadline = time.monotonic() + seconds
+        return lambda: time.monotonic() < deadline
+    
+    @pytest.mark.parametrize("interval", [0, -5.0])
+    def test_non_positive_interval_rejected(self, interval):
+        """Testa que intervalos zero ou negativos (ex.: PING_INTERVAL=0) são rejeitados"""
+        scheduler = ProbeScheduler()
+        
+        with pytest.raises(ValueError, match="positive"):
+            scheduler.add("ping", "example.com", interval, AsyncMock())
+    
+    @pytest.mark.asyncio
+    async def test_bounded_concurrency(self):
+        """Testa que o número de probes em execução respeita o limite"""
+        scheduler = ProbeScheduler(max_concurrency=2)
+        in_flight = 0
+        peak = 0
+        
+        async def probe(target):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.02)
+            in_flight -= 1
+        
+        scheduler.add_targets("ping", [f"host{i}" for i in range(10)], 0.01, probe)
+        await scheduler.run(self.stop_after(0.2))
+        
+        assert peak == 2
+        assert scheduler.in_flight == 0
+    
+    @pytest.mark.asyncio
+    async def test_slow_target_does_not_delay_others(self):
+        """Testa que um target lento não atrasa os demais"""
+        scheduler = ProbeScheduler(max_concurrency=10)
+        runs = {"slow": 0, "fast": 0}
+        
+        async def probe(target):
+            runs[target] += 1
+            await asyncio.sleep(0.5 if target == "slow" else 0)
+        
+        scheduler.add("http", "slow", 0.02, lambda: probe("slow"))
+        scheduler.add("http", "fast", 0.02, lambda: probe("fast"))
+        await scheduler.run(self.stop_after(0.3))
+        
+        assert runs["slow"] == 1
+        assert runs["fast"] >= 5
+    
+    def test_phase_offset_deterministic(self):
+        """Testa que a fase por target é determinística e dentro do intervalo"""
+        phases = [phase_offset(f"ping:host{i}", 30, seed="agent-1") for i in range(100)]
+        
+        assert phases == [phase_offset(f"ping:host{i}", 30, seed="agent-1") for i in range(100)]
+        assert all(0 <= phase < 30 for phase in phases)
+        assert len(set(phases)) == 100
+        assert phase_offset("ping:host0", 30, seed="agent-2") != phases[0]
+    
+    @pytest.mark.asyncio
+    async def test_first_run_aligned_to_interval_grid(self):
+        """Testa que a primeira execução cai em múltiplo do intervalo + fase (relógio de parede)"""
+        scheduler = ProbeScheduler()
+        
+        job = scheduler.add("ping", "example.com", 30, AsyncMock(), phase=7.5)
+        
+        due_wall = time.time() + (job.next_due - time.monotonic())
+        offset = (due_wall - 7.5) % 30
+        assert min(offset, 30 - offset) < 0.01
+        assert 0 < job.next_due - time.monotonic() <= 30
+    
+    @pytest.mark.asyncio
+    async def test_fixed_rate_does_not_drift(self):
+        """Testa que o período é o intervalo (início a início), sem somar a duração do probe"""
+        scheduler = ProbeScheduler()
+        starts = []
+        
+        async def probe():
+            starts.append(time.monotonic())
+            await asyncio.sleep(0.03)
+        
+        scheduler.add("ping", "example.com", 0.05, probe, phase=0)
+        await scheduler.run(self.stop_after(0.5))
+        
+        periods = [b - a for a, b in zip(starts, starts[1:])]
+        assert len(periods) >= 5
+        assert sum(periods) / len(periods) == pytest.approx(0.05, abs=0.01)
+    
+    @pytest.mark.asyncio
+    async def test_overrun_skips_ticks_without_bursting(self):
+        """Testa que execuções atrasadas pulam ticks (contados) em vez de disparar em rajada"""
+        missed = []
+        scheduler = ProbeScheduler(on_missed=lambda job, ticks: missed.append(ticks))
+        starts = []
+        
+        async def probe():
+            starts.append(time.monotonic())
+            await asyncio.sleep(0.12)
+        
+        job = scheduler.add("http", "example.com", 0.05, probe, phase=0)
+        await scheduler.run(self.stop_after(0.45))
+        
+        periods = [b - a for a, b in zip(starts, starts[1:])]
+        assert all(period >= 0.12 for period in periods)
+        assert job.missed == sum(missed) > 0
+    
+    @pytest.mark.asyncio
+    async def test_probe_errors_keep_job_scheduled(self):
+        """Testa que exceções de um probe não removem o job"""
+        scheduler = ProbeScheduler()
+        probe = AsyncMock(side_effect=Exception("boom"))
+        
+        scheduler.add("ping", "example.com", 0.01, probe)
+        await scheduler.run(self.stop_after(0.1))
+        
+        assert probe.await_count >= 2
+    
+    @pytest.mark.asyncio
+    async def test_on_complete_can_change_interval(self):
+        """Testa que o hook on_complete recebe o resultado e pode mudar o intervalo"""
+        results = []
+        
+        def on_complete(job, result):
+            results.append(result)
+            job.interval = 0.1
+        
+        scheduler = ProbeScheduler(on_complete=on_complete)
+        job = scheduler.add("tcp", "example.com:443", 0.01, AsyncMock(return_value={"success": True}), phase=0)
+        await scheduler.run(self.stop_after(0.25))
+        
+        assert results[0] == {"success": True}
+        assert 2 <= len(results) <= 4
+        assert job.interval == 0.1
+
+
+# ============================================================================
+# PROBE BUDGET TESTS
+# ============================================================================
+
+class TestProbeBudget:
+    """Testes para o orçamento global de probes"""
+    
+    @pytest.mark.asyncio
+    async def test_in_flight_cap(self):
+        """Testa que o limite de probes simultâneos é respeitado entre tipos"""
+        budget = ProbeBudget(max_in_flight=2)
+        
+        assert await budget.acquire("ping")
+        assert await budget.acquire("http")
+        waiter = asyncio.create_task(budget.acquire("ping"))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        
+        budget.release("http")
+        assert await waiter
+        assert budget.in_flight == 2
+    
+    @patch.dict('os.environ', {'PROBE_WEIGHTS': 'ping=0,http=-1'})
+    def test_non_positive_weights_rejected(self):
+        """Testa que pesos zero ou negativos (PROBE_WEIGHTS=ping=0) são rejeitados na criação"""
+        config = Config.from_env()
+        
+        with pytest.raises(ValueError, match="weights must be positive"):
+            ProbeBudget(weights=config.probe_weights)
+    
+    @pytest.mark.asyncio
+    async def test_token_bucket_paces_starts(self):
+        """Testa que o token bucket espaça os inícios conforme a taxa"""
+        budget = ProbeBudget(max_in_flight=100, rate=50, burst=1)
+        start = time.monotonic()
+        
+        for _ in range(6):
+            assert await budget.acquire("ping")
+        
+        assert time.monotonic() - start == pytest.approx(0.1, abs=0.03)
+    
+    @pytest.mark.asyncio
+    async def test_weighted_fair_sharing(self):
+        """Testa divisão ponderada do orçamento entre tipos de probe com fila"""
+        budget = ProbeBudget(max_in_flight=1, weights={"ping": 3, "http": 1})
+        assert await budget.acquire("ping")
+        granted = []
+        
+        async def waiter(probe):
+            await budget.acquire(probe)
+            granted.append(probe)
+        
+        tasks = [asyncio.create_task(waiter(probe)) for probe in ["ping"] * 6 + ["http"] * 6]
+        await asyncio.sleep(0)
+        for _ in range(8):
+            budget.release("ping")
+            await asyncio.sleep(0)
+        
+        assert granted[:8].count("ping") == 6
+        assert granted[:8].count("http") == 2
+        for task in tasks:
+            task.cancel()
+    
+    @pytest.mark.asyncio
+    async def test_shed_after_max_queue_delay(self, metrics_manager):
+        """Testa descarte de probes que esperam além do limite, com métricas"""
+        budget = ProbeBudget(max_in_flight=1, max_queue_delay=0.02, metrics_manager=metrics_manager)
+        assert await budget.acquire("ping")
+        
+        assert await budget.acquire("http") is False
+        
+        budget.release("ping")
+        assert await budget.acquire("http") is True
+        assert budget.in_flight == 1
+        metrics_manager.probes_throttled.add.assert_called_once_with(
+            1, {"probe": "http", "outcome": "shed"}
+        )
+        assert metrics_manager.queue_delay.record.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_scheduler_drops_shed_ticks(self):
+        """Testa que o scheduler pula o tick de um probe descartado"""
+        budget = ProbeBudget(max_in_flight=1, max_queue_delay=0.01)
+        scheduler = ProbeScheduler(budget=budget)
+        probe = AsyncMock()
+        assert await budget.acquire("http")
+        
+        scheduler.add("ping", "example.com", 0.05, probe, phase=0)
+        await scheduler.run(TestProbeScheduler.stop_after(0.12))
+        
+        probe.assert_not_awaited()
+
+
+# ============================================================================
+# ADAPTIVE INTERVAL TESTS
+# ============================================================================
+
+class TestAdaptiveInterval:
+    """Testes para o controle adaptativo de intervalo"""
+    
+    def test_failures_shrink_to_floor(self):
+        """Testa que falhas reduzem o intervalo até o piso"""
+        controller = AdaptiveInterval(60, floor=15, ceiling=240)
+        
+        intervals = [controller.observe(None, failed=True) for _ in range(4)]
+        
+        assert intervals == [30, 15, 15, 15]
+    
+    def test_stable_target_grows_to_ceiling(self):
+        """Testa que um target estável tem o intervalo aumentado até o teto"""
+        controller = AdaptiveInterval(60, floor=15, ceiling=100, stable_rounds=3)
+        
+        intervals = [controller.observe(20.0, failed=False) for _ in range(9)]
+        
+        assert intervals[:2] == [60, 60]
+        assert intervals[2] == 75
+        assert intervals[-1] == 100
+    
+    def test_latency_deviation_is_anomalous(self):
+        """Testa que desvio de latência em relação à baseline EWMA reduz o intervalo"""
+        controller = AdaptiveInterval(60, floor=15, ceiling=240, warmup=5, stable_rounds=100)
+        for value in [20.0, 21.0, 19.0, 20.0, 20.5, 19.5]:
+            controller.observe(value, failed=False)
+        
+        assert not controller.is_anomalous(21.0, failed=False)
+        assert controller.observe(80.0, failed=False) == 30
+    
+    def test_no_latency_judgement_during_warmup(self):
+        """Testa que não há julgamento de latência antes do aquecimento"""
+        controller = AdaptiveInterval(60, floor=15, ceiling=240, warmup=5)
+        controller.observe(20.0, failed=False)
+        
+        assert not controller.is_anomalous(500.0, failed=False)
+    
+    @pytest.mark.parametrize("probe,result,expected", [
+        ('ping', {'avg_rtt_ms': 12.0, 'packet_loss_percent': 0.0, 'successful_pings': 10}, (12.0, False)),
+        ('ping', {'avg_rtt_ms': 12.0, 'packet_loss_percent': 10.0, 'successful_pings': 9}, (12.0, True)),
+        ('ping', {'avg_rtt_ms': 0, 'packet_loss_percent': 100.0, 'successful_pings': 0}, (None, True)),
+        ('http', {'duration_ms': 150.0, 'status_code': 200}, (150.0, False)),
+        ('http', {'duration_ms': 150.0, 'status_code': 503}, (150.0, True)),
+        ('tcp', {'connect_ms': 3.0, 'success': True}, (3.0, False)),
+        ('tcp', {'connect_ms': 300.0, 'success': True, 'loop_stalled': True}, (None, False)),
+        ('http', {'target': 'example.com', 'error': 'timeout'}, (None, True)),
+        ('ping', None, (None, True)),
+    ])
+    def test_health_signal(self, probe, result, expected):
+        """Testa extração de latência e falha dos resultados dos monitores"""
+        assert health_signal(probe, result) == expected
+
+
+# ============================================================================
+# CIRCUIT BREAKER TESTS
+# ============================================================================
+
+class TestCircuitBreaker:
+    """Testes para o circuit breaker por target"""
+    
+    def test_opens_after_consecutive_failures(self):
+        """Testa abertura após falhas consecutivas"""
+        breaker = CircuitBreaker(failure_threshold=3, base_backoff=30)
+        
+        breaker.record(False, now=0)
+        breaker.record(True, now=1)
+        breaker.record(False, now=2)
+        breaker.record(False, now=3)
+        assert breaker.state == CLOSED
+        
+        breaker.record(False, now=4)
+        assert breaker.state == OPEN
+        assert not breaker.allow(now=33)
+        assert breaker.allow(now=34)
+        assert breaker.state == HALF_OPEN
+    
+    def test_half_open_allows_single_probe(self):
+        """Testa que o estado half-open deixa passar apenas um probe"""
+        breaker = CircuitBreaker(failure_threshold=1, base_backoff=10)
+        breaker.record(False, now=0)
+        
+        assert breaker.allow(now=10)
+        assert not breaker.allow(now=10)
+    
+    def test_exponential_backoff(self):
+        """Testa back-off exponencial limitado e reset ao fechar"""
+        breaker = CircuitBreaker(failure_threshold=1, base_backoff=10, max_backoff=30)
+        now = 0
+        backoffs = []
+        for _ in range(4):
+            breaker.record(False, now=now)
+            backoffs.append(breaker.retry_at - now)
+            now = breaker.retry_at
+            assert breaker.allow(now=now)
+        
+        assert backoffs == [10, 20, 30, 30]
+        
+        breaker.record(True, now=now)
+        assert breaker.state == CLOSED
+        breaker.record(False, now=now)
+        assert breaker.retry_at - now == 10
+    
+    @pytest.mark.parametrize("probe,result,expected", [
+        ('ping', {'successful_pings': 0, 'packet_loss_percent': 100.0}, True),
+        ('ping', {'successful_pings': 3, 'packet_loss_percent': 70.0}, False),
+        ('http', {'status_code': 503}, False),
+        ('http', {'error': 'timeout'}, True),
+        ('tcp', {'success': False, 'error': 'refused'}, True),
+        ('tcp', {'success': True}, False),
+        ('ping', None, True),
+    ])
+    def test_is_unreachable(self, probe, result, expected):
+        """Testa quais resultados contam como falha do breaker"""
+        assert is_unreachable(probe, result) is expected
+    
+    @pytest.mark.asyncio
+    async def test_monitor_skips_open_target_and_recovers(self, test_config):
+        """Testa que alvos com breaker aberto não geram I/O e voltam via probe leve"""
+        test_config.breaker_failure_threshold = 1
+        test_config.breaker_base_backoff = 0.05
+        with patch('src.monitoring.monitor.MetricsManager'):
+            monitor = NetworkMonitor(test_config)
+            monitor.ping_monitor.check = AsyncMock(side_effect=[
+                {'target': 'example.com', 'successful_pings': 0},
+                {'target': 'example.com', 'successful_pings': 1},
+            ])
+            run = monitor._runner("ping", monitor._ping)
+            
+            await run('example.com')
+            skipped = await run('example.com')
+            await asyncio.sleep(0.06)
+            await run('example.com')
+            
+            assert skipped['skipped'] is True
+            assert monitor.ping_monitor.check.await_count == 2
+            assert monitor.ping_monitor.check.call_args.kwargs['ping_count'] == 1
+            assert monitor.breakers[("ping", "example.com")].state == CLOSED
+            states = [call.args[0] for call in monitor.metrics_manager.breaker_state.set.call_args_list]
+            assert states == [0, 1, 0]
+
+
+# ============================================================================
+# LOOP LAG TESTS
+# ============================================================================
+
+class TestLoopLagMonitor:
+    """Testes para o monitor de atraso do event loop"""
+    
+    @pytest.mark.asyncio
+    async def test_detects_blocking_call(self, metrics_manager):
+        """Testa que uma chamada bloqueante é registrada como travamento"""
+        loop_lag = LoopLagMonitor(metrics_manager, interval=0.005, stall_threshold=0.05)
+        running = True
+        task = asyncio.create_task(loop_lag.run(lambda: running))
+        
+        await asyncio.sleep(0.02)
+        start = time.perf_counter()
+        time.sleep(0.1)
+        end = time.perf_counter()
+        await asyncio.sleep(0.02)
+        running = False
+        await task
+        
+        assert len(loop_lag.stalls) == 1
+        assert loop_lag.overlaps_stall(start, end)
+        assert max(call.args[0] for call in metrics_manager.loop_lag.record.call_args_list) >= 50
+    
+    def test_overlap_window(self):
+        """Testa a interseção entre janela de medição e travamentos"""
+        loop_lag = LoopLagMonitor()
+        loop_lag.stalls.extend([(10.0, 10.2), (20.0, 20.5)])
+        
+        assert loop_lag.overlaps_stall(9.0, 10.1)
+        assert loop_lag.overlaps_stall(20.4, 21.0)
+        assert not loop_lag.overlaps_stall(10.3, 19.9)
+        assert not loop_lag.overlaps_stall(21.0, 22.0)
+    
+    @pytest.mark.parametrize("action,expected", [
+        ('tag', {"target": "example.com", "loop.stalled": True}),
+        ('discard', None),
+    ])
+    def test_sample_attributes(self, metrics_manager, action, expected):
+        """Testa marcação ou descarte de amostras contaminadas"""
+        loop_lag = LoopLagMonitor(metrics_manager, action=action)
+        loop_lag.stalls.append((1.0, 2.0))
+        attributes = {"target": "example.com"}
+        
+        assert loop_lag.sample_attributes("ping", attributes, 5.0, 6.0) is attributes
+        assert loop_lag.sample_attributes("ping", attributes, 0.5, 1.5) == expected
+        metrics_manager.contaminated_samples.add.assert_called_once_with(
+            1, {"probe": "ping", "action": action}
+        )
+    
+    def test_invalid_action(self):
+        """Testa ação de travamento inválida"""
+        with pytest.raises(ValueError):
+            LoopLagMonitor(action="drop")
+
+
+# ============================================================================
+# WORKER POOL TESTS
+# ============================================================================
+
+class TestWorkerPool:
+    """Testes para o particionamento e supervisão de workers"""
+    
+    TARGETS = [f"host{i}.example.com" for i in range(1000)]
+    
+    def test_partition_covers_all_targets(self):
+        """Testa que cada target vai para exatamente um worker, de forma equilibrada"""
+        partitions = partition_targets(self.TARGETS, 4)
+        
+        assigned = [target for targets in partitions.values() for target in targets]
+        assert sorted(assigned) == sorted(self.TARGETS)
+        assert all(150 < len(targets) < 350 for targets in partitions.values())
+    
+    def test_partition_stable_across_reloads(self):
+        """Testa que adicionar/remover targets não move os demais"""
+        before = partition_targets(self.TARGETS, 4)
+        after = partition_targets(self.TARGETS[100:] + ["new.example.com"], 4)
+        
+        owner = {target: worker for worker, targets in before.items() for target in targets}
+        for worker, targets in after.items():
+            for target in targets:
+                assert target == "new.example.com" or owner[target] == worker
+    
+    def test_adding_worker_moves_few_targets(self):
+        """Testa que um worker novo recebe ~1/N dos targets e os demais ficam onde estavam"""
+        before = partition_targets(self.TARGETS, 4)
+        after = partition_targets(self.TARGETS, 5)
+        
+        owner = {target: worker for worker, targets in before.items() for target in targets}
+        moved = [t for worker, targets in after.items() for t in targets if owner[t] != worker]
+        assert all(t in after[4] for t in moved)
+        assert len(moved) < len(self.TARGETS) * 0.35
+    
+    def test_start_spawns_worker_per_partition(self, test_config):
+        """Testa que cada worker recebe sua partição e seu id"""
+        test_config.workers = 2
+        pool = WorkerPool(test_config)
+        pool._context = Mock()
+        
+        pool.start()
+        
+        spawned = {
+            call.kwargs['args'][1]: call.kwargs['args'][0].targets
+            for call in pool._context.Process.call_args_list
+        }
+        assert spawned == {k: v for k, v in pool.partitions.items() if v}
+        assert sorted(sum(spawned.values(), [])) == sorted(test_config.targets)
+    
+    def test_tcp_targets_are_partitioned(self, test_config):
+        """Testa que os targets TCP também são divididos, e que um worker só com TCP é iniciado"""
+        test_config.workers = 3
+        test_config.targets = ['example.com']
+        test_config.tcp_targets = [f"host{i}.example.com:443" for i in range(30)]
+        pool = WorkerPool(test_config)
+        pool._context = Mock()
+        
+        pool.start()
+        
+        spawned = {
+            call.kwargs['args'][1]: call.kwargs['args'][0]
+            for call in pool._context.Process.call_args_list
+        }
+        tcp = [target for config in spawned.values() for target in config.tcp_targets]
+        assert sorted(tcp) == sorted(test_config.tcp_targets)
+        assert len(spawned) == 3
+        assert sum(1 for config in spawned.values() if config.targets) == 1
+    
+    def test_supervise_restarts_dead_workers(self, test_config):
+        """Testa que workers encerrados são reiniciados"""
+        test_config.workers = 2
+        pool = WorkerPool(test_config)
+        pool._context = Mock()
+        pool.start()
+        dead = next(iter(pool._processes.values()))
+        dead.is_alive.return_value = False
+        spawned = pool._context.Process.call_count
+        
+        pool.supervise()
+        
+        assert pool._context.Process.call_count == spawned + 1
+    
+    def test_readiness_follows_most_lagging_worker(self, test_config):
+        """Testa que a prontidão do pool usa o worker mais atrasado"""
+        test_config.workers = 2
+        pool = WorkerPool(test_config)
+        pool._context = Mock()
+        pool._health = {0: [100.0, 50.0], 1: [0.0, 60.0]}
+        
+        # Worker 1 ainda não completou nenhuma rodada
+        assert pool.last_round is None
+        assert pool.last_export() == 50.0
+        
+        pool._health[1][0] = 90.0
+        assert pool.last_round == 90.0
+
 
 # ============================================================================
 # INTEGRATION TESTS
@@ -396,19 +2474,30 @@ class TestNetworkMonitor:
 class TestIntegration:
     """Testes de integração simplificados"""
     
-    def test_health_check_server_threading(self):
-        """Testa servidor de health check em thread separada"""
+    @pytest.mark.asyncio
+    async def test_health_check_server_on_monitor_loop(self, test_config):
+        """Testa o health check no mesmo event loop do monitor: pronto após a primeira medição"""
         from src.utils.health_check import HealthCheckServer
-        import threading
-        import time
-        
-        server = HealthCheckServer(18080)
-        
-        server_thread = threading.Thread(target=server.start, daemon=True)
-        server_thread.start()
-        time.sleep(0.3)
         
-        assert server.server is not None
-        
-        server.stop()
-        time.sleep(0.1)
\ No newline at end of file
+        with patch('src.monitoring.monitor.MetricsManager'):
+            monitor = NetworkMonitor(test_config)
+        server = HealthCheckServer(0)
+        server.add_check("probe_round", lambda: monitor.last_round, 0.5)
+        await server.start()
+        try:
+            server.started -= 1
+            assert server.status()["ready"] is False
+            
+            scheduler = monitor._scheduler()
+            job = scheduler.add("ping", "example.com", 30, AsyncMock())
+            # Erros do probe e rodadas puladas pelo breaker não contam como progresso
+            scheduler.on_complete(job, {"target": "example.com", "error": "Operation not permitted"})
+            scheduler.on_complete(job, {"target": "example.com", "skipped": True})
+            assert server.status()["ready"] is False
+            
+            scheduler.on_complete(job, {"target": "example.com", "success": False})
+            
+            assert server.status()["ready"] is True
+            assert server.status()["live"] is True
+        finally:
+            await server.stop()
\ No newline at end of file
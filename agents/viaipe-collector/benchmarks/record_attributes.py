@@ -0,0 +1,74 @@
+"""
+Micro-benchmark: record_client_metrics-style gauge sets with fresh
+attribute dicts vs interned AttributeSets
+
+Usage: python benchmarks/record_attributes.py [--clients N] [--rounds N] [--repeat N]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from metrics.attributes import AttributeCache  # noqa: E402
+
+INSTRUMENTS = 8  # gauges set per client by record_client_metrics
+
+
+def run(clients: int, rounds: int, interned: bool) -> float:
+    """Returns nanoseconds per record call, after an untimed round creating every series"""
+    provider = MeterProvider(metric_readers=[InMemoryMetricReader()])
+    meter = provider.get_meter("benchmark")
+    gauges = [meter.create_gauge(f"viaipe.benchmark.{index}") for index in range(INSTRUMENTS)]
+    cache = AttributeCache("client_id", "client_name")
+    names = [(f"client-{index}", f"Client {index}") for index in range(clients)]
+    
+    def collection_round():
+        for client_id, client_name in names:
+            if interned:
+                attributes = cache.get(client_id, client_name)
+            else:
+                attributes = {"client_id": client_id, "client_name": client_name}
+            for gauge in gauges:
+                gauge.set(1.0, attributes)
+    
+    # Series creation is a one-off cost, not the steady state being compared
+    collection_round()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        collection_round()
+    elapsed = time.perf_counter() - start
+    provider.shutdown()
+    return elapsed * 1e9 / (clients * rounds * INSTRUMENTS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=11)
+    args = parser.parse_args()
+    
+    # Interleaved runs, so drift (CPU frequency, other load) hits both variants alike
+    results = {False: [], True: []}
+    for _ in range(args.repeat):
+        for interned in results:
+            results[interned].append(run(args.clients, args.rounds, interned))
+    
+    for label, interned in (("fresh dicts", False), ("interned", True)):
+        samples = sorted(results[interned])
+        print(
+            f"{label:>12}: median {statistics.median(samples):,.0f} ns/call "
+            f"(min {samples[0]:,.0f}, max {samples[-1]:,.0f})"
+        )
+    speedup = statistics.median(results[False]) / statistics.median(results[True]) - 1
+    print(f"{'speedup':>12}: {speedup:+.1%}")
+
+
+if __name__ == "__main__":
+    main()
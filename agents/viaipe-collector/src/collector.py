@@ -3,6 +3,9 @@ ViaIpe Collector service module
 """
 import asyncio
 import logging
+import time
+from typing import Optional
+
 import httpx
 
 from utils.config import Config
@@ -19,9 +22,32 @@ class ViaIpeCollector:
     def __init__(self, config: Config):
         self.config = config
         self.running = False
+        # Epoch of the last successful API collection (readiness)
+        self.last_collection: Optional[float] = None
         
         self.api_client = ViaIpeClient(config.api_url, config.timeout)
-        self.metrics_exporter = MetricsExporter(config.service_name, config.otel_endpoint)
+        self.metrics_exporter = MetricsExporter(
+            config.service_name,
+            config.otel_endpoint,
+            otel_protocol=config.otel_protocol,
+            export_interval_ms=config.otel_export_interval_ms,
+            export_timeout_ms=config.otel_export_timeout_ms,
+            temporality=config.otel_temporality,
+            compression=config.otel_compression,
+            max_export_batch_size=config.otel_max_export_batch_size,
+            wal_dir=config.wal_dir if config.wal_enabled else None,
+            wal_max_bytes=config.wal_max_bytes,
+            wal_segment_bytes=config.wal_segment_bytes,
+            wal_fsync=config.wal_fsync,
+            wal_replay_rate=config.wal_replay_rate,
+            export_queue_size=config.export_queue_size,
+            export_drop_policy=config.export_drop_policy,
+            export_priorities=config.export_priorities,
+            metrics_exporter=config.metrics_exporter,
+            victoriametrics_url=config.victoriametrics_url,
+            victoriametrics_max_batch_samples=config.victoriametrics_max_batch_samples,
+            prometheus_enabled=config.prometheus_enabled
+        )
         self.data_processor = DataProcessor(self.metrics_exporter)
         
         logger.info(f"ViaIpe Collector initialized with API: {config.api_url}")
@@ -34,6 +60,7 @@ class ViaIpeCollector:
             self.metrics_exporter.record_api_request(success=True)
             
             self.data_processor.process_api_data(data)
+            self.last_collection = time.time()
             
         except httpx.TimeoutException:
             self.metrics_exporter.record_api_request(success=False, error_type="timeout")
@@ -46,6 +73,10 @@ class ViaIpeCollector:
             logger.error(f"Unexpected error during data collection: {e}")
             self.metrics_exporter.record_api_request(success=False, error_type="unknown")
     
+    def last_export(self) -> Optional[float]:
+        """Epoch of the last export accepted by the backend (None = never)"""
+        return self.metrics_exporter.last_export()
+    
     async def collection_loop(self):
         """Data collection loop"""
         while self.running:
@@ -4,7 +4,6 @@ Coleta estatísticas da API ViaIpe e calcula métricas de qualidade
 """
 import asyncio
 import logging
-import threading
 
 from utils.config import Config
 from utils.health_check import HealthCheckServer
@@ -21,15 +20,28 @@ async def main():
     """Main function"""
     config = Config.from_env()
     
-    health_server = HealthCheckServer(config.health_port)
-    health_thread = threading.Thread(
-        target=health_server.start,
-        daemon=True
-    )
-    health_thread.start()
+    metrics_registry = None
+    if config.prometheus_enabled:
+        from prometheus_client import REGISTRY
+        metrics_registry = REGISTRY
     
     collector = ViaIpeCollector(config)
-    await collector.run()
+    
+    # Runs on this event loop, so a wedged collector also stops answering /livez
+    health_server = HealthCheckServer(
+        config.health_port,
+        metrics_registry=metrics_registry,
+        live_max_lag=config.health_live_max_lag
+    )
+    health_server.add_check("collection", lambda: collector.last_collection, config.health_ready_max_age)
+    if config.metrics_exporter != "none":
+        health_server.add_check("export", collector.last_export, config.health_export_max_age)
+    await health_server.start()
+    
+    try:
+        await collector.run()
+    finally:
+        await health_server.stop()
 
 
 if __name__ == "__main__":
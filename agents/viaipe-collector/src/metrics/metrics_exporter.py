@@ -2,25 +2,88 @@
 OpenTelemetry metrics setup module
 """
 import logging
+from typing import Dict, Optional
+
 from opentelemetry import metrics
+from opentelemetry.metrics import Observation
 from opentelemetry.sdk.metrics import MeterProvider
-from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
-from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
+from opentelemetry.sdk.metrics.export import MetricExporter, MetricExportResult, PeriodicExportingMetricReader
 from opentelemetry.sdk.resources import Resource
 
+from .attributes import AttributeCache, AttributeSet
+from .export import DROP_OLDEST, GRPC, QueueingExporter, TrackingExporter, create_otlp_exporter
+from .victoriametrics import VictoriaMetricsExporter
+from .wal import FSYNC_SEGMENT, WALExporter, WriteAheadLog
+
 logger = logging.getLogger(__name__)
 
 
 class MetricsExporter:
     """OpenTelemetry metrics manager"""
     
-    def __init__(self, service_name: str, otel_endpoint: str):
+    def __init__(
+        self,
+        service_name: str,
+        otel_endpoint: str,
+        otel_protocol: str = GRPC,
+        export_interval_ms: int = 10000,
+        export_timeout_ms: int = 10000,
+        temporality: str = "cumulative",
+        compression: str = "none",
+        max_export_batch_size: int = 0,
+        wal_dir: Optional[str] = None,
+        wal_max_bytes: int = 256 * 1024 * 1024,
+        wal_segment_bytes: int = 8 * 1024 * 1024,
+        wal_fsync: str = FSYNC_SEGMENT,
+        wal_replay_rate: float = 10.0,
+        export_queue_size: int = 8,
+        export_drop_policy: str = DROP_OLDEST,
+        export_priorities: Optional[Dict[str, int]] = None,
+        metrics_exporter: str = "otlp",
+        victoriametrics_url: str = "http://victoriametrics:8428",
+        victoriametrics_max_batch_samples: int = 10000,
+        prometheus_enabled: bool = False
+    ):
         self.service_name = service_name
         self.otel_endpoint = otel_endpoint
+        self.otel_protocol = otel_protocol
+        self.export_interval_ms = export_interval_ms
+        self.export_timeout_ms = export_timeout_ms
+        self.temporality = temporality
+        self.compression = compression
+        self.max_export_batch_size = max_export_batch_size
+        self.wal_dir = wal_dir
+        self.wal_max_bytes = wal_max_bytes
+        self.wal_segment_bytes = wal_segment_bytes
+        self.wal_fsync = wal_fsync
+        self.wal_replay_rate = wal_replay_rate
+        self.wal_exporter: Optional[WALExporter] = None
+        self.export_queue_size = export_queue_size
+        self.export_drop_policy = export_drop_policy
+        self.export_priorities = export_priorities or {}
+        self.export_queue: Optional[QueueingExporter] = None
+        self.export_tracker: Optional[TrackingExporter] = None
+        self.metrics_exporter = metrics_exporter
+        self.victoriametrics_url = victoriametrics_url
+        self.victoriametrics_max_batch_samples = victoriametrics_max_batch_samples
+        self.prometheus_enabled = prometheus_enabled
+        
+        # Interned attribute sets: one per client, reused every collection cycle
+        self._client_attributes = AttributeCache("client_id", "client_name")
+        self._error_attributes = AttributeCache("error")
+        self._success_attributes = AttributeSet(status="success")
+        self._no_attributes = AttributeSet()
+        self._export_attributes = {
+            result: AttributeSet(result=result.name.lower()) for result in MetricExportResult
+        }
         
         self._setup_otel()
 
         self._create_metrics()
+        if self.wal_exporter is not None:
+            self._create_wal_metrics()
+        if self.export_queue is not None:
+            self._create_queue_metrics()
     
     def _setup_otel(self):
         """Configures OpenTelemetry provider"""
@@ -30,20 +93,83 @@ class MetricsExporter:
             "deployment.environment": "production"
         })
         
-        exporter = OTLPMetricExporter(
-            endpoint=self.otel_endpoint,
-            insecure=True
-        )
-        
-        reader = PeriodicExportingMetricReader(exporter, export_interval_millis=10000)
+        readers = []
+        exporter = self._create_exporter()
+        if exporter is not None:
+            readers.append(self._push_reader(exporter))
+        if self.prometheus_enabled:
+            # Optional dependency: opentelemetry-exporter-prometheus
+            from opentelemetry.exporter.prometheus import PrometheusMetricReader
+            readers.append(PrometheusMetricReader())
         
-        provider = MeterProvider(resource=resource, metric_readers=[reader])
+        provider = MeterProvider(resource=resource, metric_readers=readers)
         metrics.set_meter_provider(provider)
         
         self.meter = metrics.get_meter(__name__)
         
         logger.info(f"OpenTelemetry configured for service: {self.service_name}")
     
+    def last_export(self) -> Optional[float]:
+        """Epoch of the last export accepted by the backend (None = never, or no push exporter)"""
+        return self.export_tracker.last_success if self.export_tracker is not None else None
+    
+    def _push_reader(self, exporter: MetricExporter) -> PeriodicExportingMetricReader:
+        """Wraps the exporter with the WAL and export queue and creates the periodic reader"""
+        # Below the WAL: readiness needs exports the backend actually accepted
+        self.export_tracker = TrackingExporter(exporter)
+        exporter = self.export_tracker
+        if self.wal_dir:
+            # Failed exports wait on disk until the collector is back
+            self.wal_exporter = WALExporter(
+                exporter,
+                WriteAheadLog(
+                    self.wal_dir,
+                    max_bytes=self.wal_max_bytes,
+                    segment_bytes=self.wal_segment_bytes,
+                    fsync=self.wal_fsync
+                ),
+                replay_rate=self.wal_replay_rate
+            )
+            exporter = self.wal_exporter
+        if self.export_queue_size:
+            # Slow exports no longer hold up the reader's collection cycle
+            self.export_queue = QueueingExporter(
+                exporter,
+                max_size=self.export_queue_size,
+                drop_policy=self.export_drop_policy,
+                priorities=self.export_priorities,
+                on_export=self._record_export
+            )
+            exporter = self.export_queue
+        
+        return PeriodicExportingMetricReader(
+            exporter,
+            export_interval_millis=self.export_interval_ms,
+            export_timeout_millis=self.export_timeout_ms
+        )
+    
+    def _create_exporter(self) -> Optional[MetricExporter]:
+        """Creates the backend exporter (OTLP, direct VictoriaMetrics import or none)"""
+        if self.metrics_exporter == "none":
+            return None
+        if self.metrics_exporter == "victoriametrics":
+            return VictoriaMetricsExporter(
+                self.victoriametrics_url,
+                timeout=self.export_timeout_ms / 1000,
+                compression=self.compression,
+                max_batch_samples=self.victoriametrics_max_batch_samples
+            )
+        if self.metrics_exporter == "otlp":
+            return create_otlp_exporter(
+                self.otel_endpoint,
+                protocol=self.otel_protocol,
+                timeout=self.export_timeout_ms / 1000,
+                compression=self.compression,
+                temporality=self.temporality,
+                max_export_batch_size=self.max_export_batch_size
+            )
+        raise ValueError(f"Invalid metrics exporter {self.metrics_exporter!r}, expected 'otlp', 'victoriametrics' or 'none'")
+    
     def _create_metrics(self):
         """Creates service metrics"""
 
@@ -113,6 +239,66 @@ class MetricsExporter:
             unit="1"
         )
     
+    def _create_wal_metrics(self):
+        """Creates the write-ahead log backlog instruments"""
+        wal = self.wal_exporter.wal
+        
+        def observe(value):
+            return lambda options: [Observation(value())]
+        
+        self.meter.create_observable_gauge(
+            name="viaipe.export.wal.backlog",
+            callbacks=[observe(lambda: wal.bytes)],
+            description="Size of the export batches waiting in the write-ahead log",
+            unit="By"
+        )
+        self.meter.create_observable_gauge(
+            name="viaipe.export.wal.batches",
+            callbacks=[observe(lambda: len(wal))],
+            description="Export batches waiting in the write-ahead log",
+            unit="1"
+        )
+        self.meter.create_observable_gauge(
+            name="viaipe.export.wal.replay_lag",
+            callbacks=[observe(wal.oldest_age)],
+            description="Age of the oldest export batch waiting in the write-ahead log",
+            unit="s"
+        )
+        self.meter.create_observable_counter(
+            name="viaipe.export.wal.dropped",
+            callbacks=[observe(lambda: wal.dropped)],
+            description="Export batches dropped from the write-ahead log (size limit or corruption)",
+            unit="1"
+        )
+    
+    def _create_queue_metrics(self):
+        """Creates the export queue instruments"""
+        queue = self.export_queue
+        
+        self.export_duration = self.meter.create_histogram(
+            name="viaipe.export.duration",
+            description="Duration of metric exports to the backend",
+            unit="ms"
+        )
+        self.meter.create_observable_gauge(
+            name="viaipe.export.queue.depth",
+            callbacks=[lambda options: [Observation(len(queue))]],
+            description="Exports waiting in the export queue",
+            unit="1"
+        )
+        self.meter.create_observable_counter(
+            name="viaipe.export.queue.dropped",
+            callbacks=[lambda options: [Observation(queue.dropped)]],
+            description="Exports dropped because the export queue was full",
+            unit="1"
+        )
+    
+    def _record_export(self, duration: float, result: MetricExportResult):
+        """Records one export (called from the export thread)"""
+        export_duration = getattr(self, "export_duration", None)
+        if export_duration is not None:
+            export_duration.record(duration * 1000, self._export_attributes[result])
+    
     def record_client_metrics(
         self,
         client_id: str,
@@ -133,10 +319,7 @@ class MetricsExporter:
             quality: Quality score (0-100)
             smoke_data: Smoke ping data (val, loss)
         """
-        attributes = {
-            "client_id": client_id,
-            "client_name": client_name
-        }
+        attributes = self._client_attributes.get(client_id, client_name)
         
         self.client_availability.set(availability, attributes)
         self.connection_quality.set(quality, attributes)
@@ -156,7 +339,7 @@ class MetricsExporter:
         Args:
             count: Number of clients
         """
-        self.clients_total.set(count, {})
+        self.clients_total.set(count, self._no_attributes)
     
     def record_api_request(self, success: bool, error_type: str = None):
         """
@@ -167,6 +350,6 @@ class MetricsExporter:
             error_type: Error type (if any)
         """
         if success:
-            self.api_requests.add(1, {"status": "success"})
+            self.api_requests.add(1, self._success_attributes)
         else:
-            self.api_errors.add(1, {"error": error_type or "unknown"})
+            self.api_errors.add(1, self._error_attributes.get(error_type or "unknown"))
@@ -0,0 +1,346 @@
+"""
+Direct VictoriaMetrics exporter module
+
+Kept identical in both agents (network-monitor and viaipe-collector).
+"""
+import decimal
+import gzip
+import logging
+import math
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import httpx
+from opentelemetry.sdk.metrics import (
+    Counter,
+    Histogram,
+    ObservableCounter,
+    ObservableGauge,
+    ObservableUpDownCounter,
+    UpDownCounter,
+    _Gauge as Gauge,
+)
+from opentelemetry.sdk.metrics.export import (
+    AggregationTemporality,
+    ExponentialHistogram,
+    Gauge as GaugeData,
+    Histogram as HistogramData,
+    Metric,
+    MetricExporter,
+    MetricExportResult,
+    MetricsData,
+    ResourceMetrics,
+    ScopeMetrics,
+    Sum,
+)
+
+from .export import append_points, concat_metrics_data
+
+logger = logging.getLogger(__name__)
+
+IMPORT_PATH = "/api/v1/import/prometheus"
+
+# Same unit suffixes as the collector's prometheusremotewrite translation,
+# so series names (and dashboards) do not change when bypassing it
+UNIT_NAMES: Dict[str, str] = {
+    "ms": "milliseconds",
+    "s": "seconds",
+    "us": "microseconds",
+    "ns": "nanoseconds",
+    "min": "minutes",
+    "h": "hours",
+    "d": "days",
+    "By": "bytes",
+    "KiBy": "kibibytes",
+    "MiBy": "mebibytes",
+    "KBy": "kilobytes",
+    "MBy": "megabytes",
+    "%": "percent",
+}
+PER_UNIT_NAMES: Dict[str, str] = {
+    "s": "second",
+    "m": "minute",
+    "h": "hour",
+    "d": "day",
+    "w": "week",
+    "mo": "month",
+    "y": "year",
+}
+
+_INVALID_NAME = re.compile(r"[^a-zA-Z0-9_:]")
+_INVALID_LABEL = re.compile(r"[^a-zA-Z0-9_]")
+
+Sample = Tuple[str, Dict[str, str], float, int]
+
+
+def metric_name(name: str, unit: str, monotonic_sum: bool = False, gauge: bool = False) -> str:
+    """
+    Converts an OTel metric name to its Prometheus series name
+    
+    Args:
+        name: OTel instrument name
+        unit: OTel unit
+        monotonic_sum: Whether the metric is a monotonic sum (gets _total)
+        gauge: Whether the metric is a gauge (unit "1" becomes _ratio)
+    
+    Returns:
+        Prometheus metric name
+    """
+    parts = [_INVALID_NAME.sub("_", name)]
+    unit = re.sub(r"\{.*?\}", "", unit or "")
+    if unit == "1":
+        if gauge:
+            parts.append("ratio")
+    elif unit:
+        per = unit.split("/", 1)
+        suffix = "_".join(UNIT_NAMES.get(part, part) for part in per[:1])
+        if len(per) > 1 and per[1]:
+            suffix += "_per_" + PER_UNIT_NAMES.get(per[1], per[1])
+        suffix = _INVALID_NAME.sub("_", suffix).strip("_")
+        if suffix and not parts[0].endswith("_" + suffix):
+            parts.append(suffix)
+    if monotonic_sum:
+        parts.append("total")
+    return re.sub(r"__+", "_", "_".join(parts))
+
+
+def label_name(key: str) -> str:
+    """Converts an attribute key to a Prometheus label name"""
+    label = _INVALID_LABEL.sub("_", key)
+    return f"key_{label}" if label[:1].isdigit() else label
+
+
+def format_value(value: float) -> str:
+    """Formats a sample value in the text exposition format"""
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def format_bound(bound: float) -> str:
+    """Formats a bucket bound like the collector does ("1", "0.25", "+Inf")"""
+    if math.isinf(bound):
+        return "+Inf" if bound > 0 else "-Inf"
+    text = format(decimal.Decimal(repr(float(bound))), "f")
+    return text.rstrip("0").rstrip(".") if "." in text else text
+
+
+def format_sample(sample: Sample) -> str:
+    """Formats one sample as an exposition line with a millisecond timestamp"""
+    name, labels, value, timestamp_ms = sample
+    if labels:
+        pairs = ",".join(
+            '{}="{}"'.format(key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for key, value in labels.items()
+        )
+        name = f"{name}{{{pairs}}}"
+    return f"{name} {format_value(value)} {timestamp_ms}"
+
+
+def resource_labels(attributes) -> Dict[str, str]:
+    """Maps resource attributes to the job/instance labels the collector would add"""
+    labels = {}
+    service = attributes.get("service.name")
+    if service:
+        namespace = attributes.get("service.namespace")
+        labels["job"] = f"{namespace}/{service}" if namespace else str(service)
+    instance = attributes.get("service.instance.id")
+    if instance:
+        labels["instance"] = str(instance)
+    return labels
+
+
+def _exponential_buckets(point) -> Iterator[Tuple[float, int]]:
+    """Yields (upper bound, cumulative count) of an exponential histogram's positive buckets"""
+    base = 2 ** (2 ** -point.scale)
+    cumulative = point.zero_count + sum(point.negative.bucket_counts)
+    yield 0.0, cumulative
+    for index, count in enumerate(point.positive.bucket_counts):
+        cumulative += count
+        yield base ** (point.positive.offset + index + 1), cumulative
+
+
+def to_samples(metrics_data: MetricsData) -> Iterator[Sample]:
+    """
+    Converts metrics data to Prometheus samples
+    
+    Args:
+        metrics_data: Data collected by the reader (cumulative temporality)
+    
+    Yields:
+        (name, labels, value, timestamp in ms) per sample
+    """
+    for _, _, metric, name, base_labels in _metrics(metrics_data):
+        for point in metric.data.data_points:
+            yield from _point_samples(metric.data, name, point, base_labels)
+
+
+def _metrics(
+    metrics_data: MetricsData
+) -> Iterator[Tuple[ResourceMetrics, ScopeMetrics, Metric, str, Dict[str, str]]]:
+    """Yields every cumulative metric with its series name and resource labels"""
+    for resource_metrics in metrics_data.resource_metrics:
+        base_labels = resource_labels(resource_metrics.resource.attributes)
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                data = metric.data
+                if isinstance(data, (Sum, HistogramData, ExponentialHistogram)) and \
+                        data.aggregation_temporality == AggregationTemporality.DELTA:
+                    logger.warning(f"Skipping delta metric {metric.name}: VictoriaMetrics needs cumulative data")
+                    continue
+                
+                monotonic = isinstance(data, Sum) and data.is_monotonic
+                name = metric_name(metric.name, metric.unit, monotonic, isinstance(data, GaugeData))
+                yield resource_metrics, scope_metrics, metric, name, base_labels
+
+
+def _point_samples(data, name: str, point, base_labels: Dict[str, str]) -> Iterator[Sample]:
+    """Yields the samples of one data point (a histogram point has one per bucket)"""
+    labels = {**base_labels, **{label_name(k): str(v) for k, v in point.attributes.items()}}
+    timestamp = point.time_unix_nano // 1_000_000
+    
+    if isinstance(data, (Sum, GaugeData)):
+        yield name, labels, point.value, timestamp
+        return
+    
+    if isinstance(data, HistogramData):
+        buckets: Iterable[Tuple[float, int]] = zip(
+            point.explicit_bounds,
+            _cumulative(point.bucket_counts)
+        )
+    else:
+        buckets = _exponential_buckets(point)
+    for bound, count in buckets:
+        yield f"{name}_bucket", {**labels, "le": format_bound(bound)}, count, timestamp
+    yield f"{name}_bucket", {**labels, "le": "+Inf"}, point.count, timestamp
+    yield f"{name}_sum", labels, point.sum, timestamp
+    yield f"{name}_count", labels, point.count, timestamp
+
+
+def _cumulative(counts: Iterable[int]) -> Iterator[int]:
+    total = 0
+    for count in counts:
+        total += count
+        yield total
+
+
+class VictoriaMetricsExporter(MetricExporter):
+    """Pushes metrics straight to VictoriaMetrics' Prometheus import API"""
+    
+    def __init__(
+        self,
+        url: str,
+        timeout: float = 10.0,
+        compression: str = "gzip",
+        max_batch_samples: int = 10000,
+        client: Optional[httpx.Client] = None
+    ):
+        """
+        Initializes the exporter
+        
+        Args:
+            url: VictoriaMetrics base URL (e.g. http://victoriametrics:8428)
+            timeout: Request timeout in seconds
+            compression: "gzip" or "none"
+            max_batch_samples: Maximum samples per request
+            client: HTTP client (a keep-alive client is created when omitted)
+        """
+        if compression not in ("gzip", "none"):
+            raise ValueError(f"Invalid compression {compression!r}, expected 'gzip' or 'none'")
+        # Counters and histograms are sent as running totals
+        super().__init__(preferred_temporality={
+            instrument: AggregationTemporality.CUMULATIVE
+            for instrument in (
+                Counter, UpDownCounter, Histogram, Gauge,
+                ObservableCounter, ObservableUpDownCounter, ObservableGauge
+            )
+        })
+        self.url = url.rstrip("/") + IMPORT_PATH
+        self.timeout = timeout
+        self.gzip = compression == "gzip"
+        self.max_batch_samples = max_batch_samples
+        # One pooled keep-alive connection reused across exports
+        self.client = client or httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=1, max_keepalive_connections=1)
+        )
+    
+    def export(self, metrics_data: MetricsData, timeout_millis: float = 10_000, **kwargs) -> MetricExportResult:
+        if self.export_unsent(metrics_data, timeout_millis) is None:
+            return MetricExportResult.SUCCESS
+        return MetricExportResult.FAILURE
+    
+    def export_unsent(self, metrics_data: MetricsData, timeout_millis: float = 10_000) -> Optional[MetricsData]:
+        """
+        Imports batch by batch, stopping at the first failed request
+        
+        Args:
+            metrics_data: Data collected by the reader
+            timeout_millis: Timeout of the whole export, shared by its requests
+        
+        Returns:
+            The data points of the failed and remaining batches (None when all
+            were imported), so a retry does not import the sent ones again
+        """
+        deadline = time.monotonic() + timeout_millis / 1000
+        batches = self._batches(metrics_data)
+        for samples, points in batches:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning("VictoriaMetrics export timed out, returning the remaining batches unsent")
+            if remaining <= 0 or not self._post(samples, remaining * 1000):
+                return concat_metrics_data([points, *(rest for _, rest in batches)])
+        return None
+    
+    def _post(self, samples: List[Sample], timeout_millis: float) -> bool:
+        """Sends one import request, returning whether it was accepted"""
+        body = "\n".join(format_sample(sample) for sample in samples).encode() + b"\n"
+        headers = {"Content-Type": "text/plain"}
+        if self.gzip:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        try:
+            response = self.client.post(
+                self.url, content=body, headers=headers,
+                timeout=min(self.timeout, timeout_millis / 1000)
+            )
+        except httpx.HTTPError as e:
+            logger.warning(f"VictoriaMetrics import failed: {e}")
+            return False
+        if response.status_code >= 300:
+            logger.warning(f"VictoriaMetrics import rejected with {response.status_code}: {response.text[:200]}")
+            return False
+        return True
+    
+    def _batches(self, metrics_data: MetricsData) -> Iterator[Tuple[List[Sample], MetricsData]]:
+        """
+        Yields batches of about max_batch_samples samples with their data points
+        
+        A histogram point is never split across requests, so a batch may exceed
+        max_batch_samples by up to one point's buckets.
+        """
+        samples: List[Sample] = []
+        batch: List[ResourceMetrics] = []
+        for resource_metrics, scope_metrics, metric, name, base_labels in _metrics(metrics_data):
+            points = []
+            for point in metric.data.data_points:
+                samples.extend(_point_samples(metric.data, name, point, base_labels))
+                points.append(point)
+                if len(samples) >= self.max_batch_samples:
+                    append_points(batch, resource_metrics, scope_metrics, metric, points)
+                    yield samples, MetricsData(resource_metrics=batch)
+                    samples, batch, points = [], [], []
+            if points:
+                append_points(batch, resource_metrics, scope_metrics, metric, points)
+        if samples:
+            yield samples, MetricsData(resource_metrics=batch)
+    
+    def force_flush(self, timeout_millis: float = 10_000) -> bool:
+        return True
+    
+    def shutdown(self, timeout_millis: float = 30_000, **kwargs) -> None:
+        self.client.close()
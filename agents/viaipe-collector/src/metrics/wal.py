@@ -0,0 +1,370 @@
+"""
+Disk-backed write-ahead log for metric exports
+
+Kept identical in both agents (network-monitor and viaipe-collector).
+"""
+import collections
+import io
+import logging
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from typing import Deque, List, NamedTuple, Optional, Tuple
+
+from opentelemetry.attributes import BoundedAttributes
+from opentelemetry.sdk.metrics.export import MetricExporter, MetricExportResult, MetricsData
+
+from .export import ExporterWrapper, export_unsent
+
+logger = logging.getLogger(__name__)
+
+FSYNC_ALWAYS = "always"
+FSYNC_SEGMENT = "segment"
+FSYNC_NEVER = "never"
+FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_SEGMENT, FSYNC_NEVER)
+
+# Record header: payload length, payload CRC32, write time (epoch seconds)
+_HEADER = struct.Struct("!IId")
+_SEGMENT_SUFFIX = ".wal"
+_CURSOR_FILE = "cursor"
+_CURSOR = struct.Struct("!QQ")
+
+
+class _Record(NamedTuple):
+    """Location of one record in the log"""
+    segment: int
+    offset: int
+    size: int
+    written_at: float
+
+
+def _reduce_attributes(attributes: BoundedAttributes):
+    # BoundedAttributes holds a lock and cannot be pickled as is
+    return BoundedAttributes, (attributes.maxlen, dict(attributes), True, attributes.max_value_len)
+
+
+def dump_metrics_data(metrics_data: MetricsData) -> bytes:
+    """
+    Serializes metrics data for the log
+    
+    Args:
+        metrics_data: Data collected by the reader
+    
+    Returns:
+        Pickled data
+    """
+    buffer = io.BytesIO()
+    pickler = pickle.Pickler(buffer, pickle.HIGHEST_PROTOCOL)
+    pickler.dispatch_table = {BoundedAttributes: _reduce_attributes}
+    pickler.dump(metrics_data)
+    return buffer.getvalue()
+
+
+class WriteAheadLog:
+    """Append-only, segment-rotated record log with a persisted read cursor"""
+    
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        segment_bytes: int = 8 * 1024 * 1024,
+        fsync: str = FSYNC_SEGMENT
+    ):
+        """
+        Opens (or creates) the log
+        
+        Args:
+            directory: Directory holding the segment files
+            max_bytes: Backlog size above which the oldest records are dropped
+            segment_bytes: Segment size that triggers rotation
+            fsync: "always" (every append), "segment" (on rotation and close) or "never"
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Invalid fsync policy {fsync!r}, expected one of {FSYNC_POLICIES}")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        
+        self.records: Deque[_Record] = collections.deque()
+        self.bytes = 0
+        self.dropped = 0
+        self._writer = None
+        self._write_segment = -1
+        self._peeked: Optional[_Record] = None
+        
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+    
+    def __len__(self) -> int:
+        return len(self.records)
+    
+    def oldest_age(self) -> float:
+        """Seconds since the oldest unreplayed record was written (0 when empty)"""
+        if not self.records:
+            return 0.0
+        return max(0.0, time.time() - self.records[0].written_at)
+    
+    def append(self, payload: bytes):
+        """
+        Appends a record, rotating the segment and enforcing max_bytes
+        
+        Args:
+            payload: Serialized record
+        """
+        if self._writer is None or self._writer.tell() >= self.segment_bytes:
+            self._rotate()
+        
+        written_at = time.time()
+        offset = self._writer.tell()
+        self._writer.write(_HEADER.pack(len(payload), zlib.crc32(payload), written_at) + payload)
+        self._writer.flush()
+        if self.fsync == FSYNC_ALWAYS:
+            os.fsync(self._writer.fileno())
+        
+        record = _Record(self._write_segment, offset, _HEADER.size + len(payload), written_at)
+        self.records.append(record)
+        self.bytes += record.size
+        
+        while self.bytes > self.max_bytes and len(self.records) > 1:
+            self.dropped += 1
+            self._advance()
+    
+    def peek(self) -> Optional[MetricsData]:
+        """
+        Returns the oldest record without consuming it
+        
+        Corrupt records are dropped and skipped.
+        
+        Returns:
+            The oldest metrics data, or None when the log is empty
+        """
+        while self.records:
+            record = self._peeked = self.records[0]
+            try:
+                with open(self._path(record.segment), "rb") as segment:
+                    segment.seek(record.offset)
+                    data = segment.read(record.size)
+                length, crc, _ = _HEADER.unpack_from(data)
+                payload = data[_HEADER.size:]
+                if len(payload) != length or zlib.crc32(payload) != crc:
+                    raise ValueError("checksum mismatch")
+                return pickle.loads(payload)
+            except Exception as e:
+                logger.warning(f"Dropping corrupt WAL record at {record.segment}:{record.offset}: {e}")
+                self.dropped += 1
+                self._advance()
+        return None
+    
+    def commit(self):
+        """Consumes the record returned by the last peek() (unless it was dropped since)"""
+        if self.records and self.records[0] is self._peeked:
+            self._advance()
+    
+    def close(self):
+        """Closes the active segment"""
+        if self._writer is not None:
+            if self.fsync != FSYNC_NEVER:
+                os.fsync(self._writer.fileno())
+            self._writer.close()
+            self._writer = None
+    
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:020d}{_SEGMENT_SUFFIX}")
+    
+    def _segments(self) -> List[int]:
+        return sorted(
+            int(name[:-len(_SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.endswith(_SEGMENT_SUFFIX) and name[:-len(_SEGMENT_SUFFIX)].isdigit()
+        )
+    
+    def _recover(self):
+        """Rebuilds the record index from the segments after the persisted cursor"""
+        cursor_segment, cursor_offset = self._load_cursor()
+        segments = self._segments()
+        
+        for segment in segments:
+            if segment < cursor_segment:
+                os.unlink(self._path(segment))
+                continue
+            offset = cursor_offset if segment == cursor_segment else 0
+            size = os.path.getsize(self._path(segment))
+            with open(self._path(segment), "rb") as file:
+                file.seek(offset)
+                while offset + _HEADER.size <= size:
+                    length, _, written_at = _HEADER.unpack(file.read(_HEADER.size))
+                    if offset + _HEADER.size + length > size:
+                        break
+                    self.records.append(_Record(segment, offset, _HEADER.size + length, written_at))
+                    self.bytes += _HEADER.size + length
+                    offset += _HEADER.size + length
+                    file.seek(offset)
+            if offset < size:
+                logger.warning(f"Ignoring {size - offset} bytes of torn record at the end of WAL segment {segment}")
+        
+        # New records always go to a fresh segment, never after a torn tail
+        self._write_segment = max(segments[-1], cursor_segment) if segments else cursor_segment
+        if self.records:
+            logger.info(f"WAL recovered {len(self.records)} records ({self.bytes} bytes) to replay")
+    
+    def _rotate(self):
+        """Closes the active segment and opens the next one"""
+        self.close()
+        self._write_segment += 1
+        self._writer = open(self._path(self._write_segment), "ab")
+    
+    def _advance(self):
+        """Removes the oldest record, deleting its segment once fully consumed"""
+        record = self.records.popleft()
+        self.bytes -= record.size
+        
+        if self.records:
+            cursor = (self.records[0].segment, self.records[0].offset)
+        else:
+            cursor = (record.segment, record.offset + record.size)
+        self._save_cursor(*cursor)
+        
+        if cursor[0] != record.segment:
+            # The active segment is never behind the cursor
+            for segment in self._segments():
+                if segment < cursor[0]:
+                    os.unlink(self._path(segment))
+    
+    def _load_cursor(self) -> Tuple[int, int]:
+        try:
+            with open(os.path.join(self.directory, _CURSOR_FILE), "rb") as file:
+                return _CURSOR.unpack(file.read(_CURSOR.size))
+        except (OSError, struct.error):
+            return 0, 0
+    
+    def _save_cursor(self, segment: int, offset: int):
+        # Write-and-rename so a crash never leaves a partial cursor
+        path = os.path.join(self.directory, _CURSOR_FILE)
+        with open(path + ".tmp", "wb") as file:
+            file.write(_CURSOR.pack(segment, offset))
+            if self.fsync == FSYNC_ALWAYS:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(path + ".tmp", path)
+
+
+class WALExporter(ExporterWrapper):
+    """Persists failed exports to a write-ahead log and replays them in order"""
+    
+    def __init__(
+        self,
+        exporter: MetricExporter,
+        wal: WriteAheadLog,
+        replay_rate: float = 10.0,
+        retry_interval: float = 5.0
+    ):
+        """
+        Initializes the exporter and starts the replay thread
+        
+        Args:
+            exporter: Exporter receiving live and replayed data
+            wal: Log holding the backlog
+            replay_rate: Maximum replayed exports per second
+            retry_interval: Seconds between replay attempts while the endpoint is down
+        """
+        super().__init__(exporter)
+        self.wal = wal
+        self.replay_rate = replay_rate
+        self.retry_interval = retry_interval
+        self.replayed = 0
+        # (head record, its unsent part) after a partially replayed record
+        self._unsent: Optional[Tuple[_Record, MetricsData]] = None
+        
+        # Guards the log; _replay_lock serializes replays
+        self._lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="wal-replay", daemon=True)
+        self._thread.start()
+    
+    def export(self, metrics_data: MetricsData, timeout_millis: float = 10_000, **kwargs) -> MetricExportResult:
+        with self._lock:
+            backlog = len(self.wal)
+        
+        # While a backlog exists new data queues behind it to keep the export order
+        if not backlog:
+            metrics_data = self._export(metrics_data, timeout_millis)
+            if metrics_data is None:
+                return MetricExportResult.SUCCESS
+        
+        # Only the part the backend did not accept is logged
+        try:
+            payload = dump_metrics_data(metrics_data)
+            with self._lock:
+                self.wal.append(payload)
+        except Exception as e:
+            logger.error(f"Failed to write metrics to the WAL: {e}")
+            return MetricExportResult.FAILURE
+        return MetricExportResult.SUCCESS
+    
+    def replay(self, limit: Optional[int] = None, timeout_millis: float = 10_000) -> bool:
+        """
+        Replays the backlog in order, paced by replay_rate
+        
+        When a record is only partly exported, its unsent part is retried next
+        (kept in memory, so a restart replays the whole record).
+        
+        Args:
+            limit: Maximum records to replay (None = until empty)
+            timeout_millis: Timeout of each replayed export
+        
+        Returns:
+            True when the backlog is empty
+        """
+        with self._replay_lock:
+            replayed = 0
+            while limit is None or replayed < limit:
+                with self._lock:
+                    metrics_data = self.wal.peek()
+                    head = self.wal.records[0] if metrics_data is not None else None
+                if metrics_data is None:
+                    return True
+                if self._unsent is not None and self._unsent[0] is head:
+                    metrics_data = self._unsent[1]
+                unsent = self._export(metrics_data, timeout_millis)
+                if unsent is not None:
+                    self._unsent = (head, unsent)
+                    return False
+                self._unsent = None
+                with self._lock:
+                    self.wal.commit()
+                replayed += 1
+                self.replayed += 1
+                if self.replay_rate and self._stop.wait(1 / self.replay_rate):
+                    break
+            with self._lock:
+                return not len(self.wal)
+    
+    def force_flush(self, timeout_millis: float = 10_000) -> bool:
+        self.replay(timeout_millis=timeout_millis)
+        return self.exporter.force_flush(timeout_millis=timeout_millis)
+    
+    def shutdown(self, timeout_millis: float = 30_000, **kwargs) -> None:
+        self._stop.set()
+        self._thread.join(timeout=timeout_millis / 1000)
+        with self._lock:
+            self.wal.close()
+        self.exporter.shutdown(timeout_millis=timeout_millis, **kwargs)
+    
+    def _export(self, metrics_data: MetricsData, timeout_millis: float) -> Optional[MetricsData]:
+        """Exports, returning the unsent data (None when everything was exported)"""
+        try:
+            return export_unsent(self.exporter, metrics_data, timeout_millis)
+        except Exception as e:
+            logger.warning(f"Metric export failed: {e}")
+            return metrics_data
+    
+    def _run(self):
+        """Replay thread: retries the backlog until shutdown"""
+        while not self._stop.wait(self.retry_interval):
+            if len(self.wal):
+                self.replay()
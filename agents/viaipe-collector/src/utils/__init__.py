@@ -1,8 +1,7 @@
 from .config import Config
-from .health_check import HealthCheckHandler, HealthCheckServer
+from .health_check import HealthCheckServer
 
 __all__ = [
     "Config",
-    "HealthCheckHandler",
     "HealthCheckServer"
 ]
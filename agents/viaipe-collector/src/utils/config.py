@@ -2,7 +2,8 @@
 Configuration module for ViaIpe Collector
 """
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Dict
 
 
 @dataclass
@@ -14,15 +15,68 @@ class Config:
     service_name: str
     health_port: int
     timeout: int
+    otel_protocol: str = "grpc"
+    otel_export_interval_ms: int = 10000
+    otel_export_timeout_ms: int = 10000
+    otel_temporality: str = "cumulative"
+    otel_compression: str = "none"
+    otel_max_export_batch_size: int = 0
+    wal_enabled: bool = False
+    wal_dir: str = "/app/wal"
+    wal_max_bytes: int = 256 * 1024 * 1024
+    wal_segment_bytes: int = 8 * 1024 * 1024
+    wal_fsync: str = "segment"
+    wal_replay_rate: float = 10.0
+    export_queue_size: int = 8
+    export_drop_policy: str = "oldest"
+    export_priorities: Dict[str, int] = field(default_factory=dict)
+    metrics_exporter: str = "otlp"
+    victoriametrics_url: str = "http://victoriametrics:8428"
+    victoriametrics_max_batch_samples: int = 10000
+    prometheus_enabled: bool = False
+    health_live_max_lag: float = 5.0
+    health_ready_max_age: float = 180.0
+    health_export_max_age: float = 180.0
 
     @classmethod
     def from_env(cls) -> 'Config':
         """Loads configuration from environment variables"""
+        poll_interval = int(os.getenv('VIAIPE_POLL_INTERVAL', '60'))
+        # Data only changes once per poll, so export on the same cadence by default
+        export_interval_ms = int(os.getenv('OTEL_METRIC_EXPORT_INTERVAL', str(poll_interval * 1000)))
         return cls(
             api_url=os.getenv('VIAIPE_API_URL', 'https://legadoviaipe.rnp.br/api/norte'),
-            poll_interval=int(os.getenv('VIAIPE_POLL_INTERVAL', '60')),
+            poll_interval=poll_interval,
             otel_endpoint=os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT', 'http://otel-collector:4317'),
             service_name=os.getenv('OTEL_SERVICE_NAME', 'viaipe-collector'),
             health_port=int(os.getenv('HEALTH_PORT', '8081')),
-            timeout=int(os.getenv('VIAIPE_TIMEOUT', '30'))
+            timeout=int(os.getenv('VIAIPE_TIMEOUT', '30')),
+            otel_protocol=os.getenv('OTEL_EXPORTER_OTLP_PROTOCOL', 'grpc').lower(),
+            otel_export_interval_ms=export_interval_ms,
+            otel_export_timeout_ms=int(os.getenv('OTEL_METRIC_EXPORT_TIMEOUT', '10000')),
+            otel_temporality=os.getenv('OTEL_EXPORTER_OTLP_METRICS_TEMPORALITY_PREFERENCE', 'cumulative').lower(),
+            otel_compression=os.getenv('OTEL_EXPORTER_OTLP_COMPRESSION', 'none').lower(),
+            otel_max_export_batch_size=int(os.getenv('OTEL_METRIC_EXPORT_MAX_BATCH_SIZE', '0')),
+            wal_enabled=os.getenv('WAL_ENABLED', 'false').lower() == 'true',
+            wal_dir=os.getenv('WAL_DIR', '/app/wal'),
+            wal_max_bytes=int(os.getenv('WAL_MAX_BYTES', str(256 * 1024 * 1024))),
+            wal_segment_bytes=int(os.getenv('WAL_SEGMENT_BYTES', str(8 * 1024 * 1024))),
+            wal_fsync=os.getenv('WAL_FSYNC', 'segment').lower(),
+            wal_replay_rate=float(os.getenv('WAL_REPLAY_RATE', '10')),
+            export_queue_size=int(os.getenv('EXPORT_QUEUE_SIZE', '8')),
+            export_drop_policy=os.getenv('EXPORT_DROP_POLICY', 'oldest').lower(),
+            export_priorities={
+                prefix.strip(): int(priority)
+                for prefix, _, priority in (
+                    item.partition('=') for item in os.getenv('EXPORT_PRIORITIES', '').split(',') if item
+                )
+            },
+            metrics_exporter=os.getenv('OTEL_METRICS_EXPORTER', 'otlp').lower(),
+            victoriametrics_url=os.getenv('VICTORIAMETRICS_URL', 'http://victoriametrics:8428'),
+            victoriametrics_max_batch_samples=int(os.getenv('VICTORIAMETRICS_MAX_BATCH_SAMPLES', '10000')),
+            prometheus_enabled=os.getenv('PROMETHEUS_ENABLED', 'false').lower() == 'true',
+            health_live_max_lag=float(os.getenv('HEALTH_LIVE_MAX_LAG', '5')),
+            # Not ready after missing three collections, or three exports
+            health_ready_max_age=float(os.getenv('HEALTH_READY_MAX_AGE', str(3 * poll_interval))),
+            health_export_max_age=float(os.getenv('HEALTH_EXPORT_MAX_AGE', str(3 * export_interval_ms / 1000)))
         )
@@ -0,0 +1,82 @@
+"""
+Tests for interned metric attribute sets
+"""
+import pickle
+
+import pytest
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+
+from src.metrics.attributes import AttributeCache, AttributeSet
+
+
+class TestAttributeSet:
+    """Test suite for AttributeSet"""
+
+    def test_behaves_like_dict(self):
+        """Test that an attribute set compares and merges like a plain dict"""
+        attributes = AttributeSet(client_id="c1", client_name="Client 1")
+        
+        assert attributes == {"client_id": "c1", "client_name": "Client 1"}
+        assert {**attributes, "extra": 1} == {"client_id": "c1", "client_name": "Client 1", "extra": 1}
+        assert frozenset(attributes.items()) is attributes.items()
+
+    def test_is_immutable(self):
+        """Test that mutating a shared attribute set fails"""
+        attributes = AttributeSet(client_id="c1")
+        
+        with pytest.raises(TypeError):
+            attributes["client_id"] = "c2"
+        with pytest.raises(TypeError):
+            attributes.update(client_id="c2")
+        assert attributes == {"client_id": "c1"}
+
+    def test_pickle_round_trip(self):
+        """Test that attribute sets survive pickling"""
+        attributes = AttributeSet(client_id="c1")
+        
+        restored = pickle.loads(pickle.dumps(attributes))
+        
+        assert isinstance(restored, AttributeSet)
+        assert restored == attributes
+
+    def test_recorded_by_sdk(self):
+        """Test that the SDK aggregates and exports interned sets"""
+        reader = InMemoryMetricReader()
+        provider = MeterProvider(metric_readers=[reader])
+        counter = provider.get_meter("test").create_counter("test.counter")
+        attributes = AttributeSet(client_id="c1")
+        
+        counter.add(1, attributes)
+        counter.add(2, {"client_id": "c1"})
+        
+        points = reader.get_metrics_data().resource_metrics[0].scope_metrics[0].metrics[0].data.data_points
+        provider.shutdown()
+        assert len(points) == 1
+        assert points[0].value == 3
+        assert dict(points[0].attributes) == {"client_id": "c1"}
+
+
+class TestAttributeCache:
+    """Test suite for AttributeCache"""
+
+    def test_interns_per_values(self):
+        """Test that the same values return the same object"""
+        cache = AttributeCache("client_id", "client_name")
+        
+        first = cache.get("c1", "Client 1")
+        
+        assert cache.get("c1", "Client 1") is first
+        assert first == {"client_id": "c1", "client_name": "Client 1"}
+        assert cache.get("c2", "Client 2") is not first
+        assert len(cache) == 2
+
+    def test_evicts_oldest_when_full(self):
+        """Test that the cache stays bounded"""
+        cache = AttributeCache("client_id", max_size=2)
+        first = cache.get("c1")
+        cache.get("c2")
+        cache.get("c3")
+        
+        assert len(cache) == 2
+        assert cache.get("c1") is not first
@@ -29,7 +29,7 @@ class TestViaIpeCollector:
     def mock_otel_setup(self):
         """Mock OpenTelemetry setup"""
         with patch('metrics.metrics_exporter.Resource'), \
-             patch('metrics.metrics_exporter.OTLPMetricExporter'), \
+             patch('metrics.metrics_exporter.create_otlp_exporter'), \
              patch('metrics.metrics_exporter.PeriodicExportingMetricReader'), \
              patch('metrics.metrics_exporter.MeterProvider'), \
              patch('metrics.metrics_exporter.metrics') as mock_metrics:
@@ -103,6 +103,7 @@ class TestViaIpeCollector:
             
             mock_fetch.assert_called_once()
             collector.metrics_exporter.record_api_request.assert_called_with(success=True)
+            assert collector.last_collection is not None
 
     async def test_fetch_and_process_data_timeout(self, collector):
         """Test handling of API timeout"""
@@ -115,6 +116,7 @@ class TestViaIpeCollector:
                 success=False,
                 error_type="timeout"
             )
+            assert collector.last_collection is None
 
     async def test_fetch_and_process_data_http_error(self, collector):
         """Test handling of HTTP error"""
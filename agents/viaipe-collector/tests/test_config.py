@@ -115,3 +115,91 @@ class TestConfig:
         assert config.poll_interval == 600
         assert config.health_port == 9999
         assert config.timeout == 90
+
+    def test_config_export_settings(self, monkeypatch):
+        """Test OTLP export settings, with the export interval following the poll interval"""
+        for key in ['OTEL_EXPORTER_OTLP_PROTOCOL', 'OTEL_METRIC_EXPORT_INTERVAL',
+                    'OTEL_EXPORTER_OTLP_METRICS_TEMPORALITY_PREFERENCE']:
+            monkeypatch.delenv(key, raising=False)
+        monkeypatch.setenv('VIAIPE_POLL_INTERVAL', '60')
+        monkeypatch.setenv('OTEL_EXPORTER_OTLP_COMPRESSION', 'GZIP')
+        monkeypatch.setenv('OTEL_METRIC_EXPORT_MAX_BATCH_SIZE', '1000')
+        
+        config = Config.from_env()
+        
+        assert config.otel_protocol == 'grpc'
+        assert config.otel_export_interval_ms == 60000
+        assert config.otel_temporality == 'cumulative'
+        assert config.otel_compression == 'gzip'
+        assert config.otel_max_export_batch_size == 1000
+        
+        monkeypatch.setenv('OTEL_METRIC_EXPORT_INTERVAL', '15000')
+        assert Config.from_env().otel_export_interval_ms == 15000
+
+    def test_config_wal_settings(self, monkeypatch):
+        """Test write-ahead log settings"""
+        monkeypatch.setenv('WAL_ENABLED', 'true')
+        monkeypatch.setenv('WAL_DIR', '/data/wal')
+        monkeypatch.setenv('WAL_REPLAY_RATE', '2.5')
+        
+        config = Config.from_env()
+        
+        assert config.wal_enabled is True
+        assert config.wal_dir == '/data/wal'
+        assert config.wal_fsync == 'segment'
+        assert config.wal_replay_rate == 2.5
+
+    def test_config_export_queue_settings(self, monkeypatch):
+        """Test export queue settings"""
+        monkeypatch.setenv('EXPORT_QUEUE_SIZE', '4')
+        monkeypatch.setenv('EXPORT_DROP_POLICY', 'PRIORITY')
+        monkeypatch.setenv('EXPORT_PRIORITIES', 'viaipe.client=2,viaipe.api=1')
+        
+        config = Config.from_env()
+        
+        assert config.export_queue_size == 4
+        assert config.export_drop_policy == 'priority'
+        assert config.export_priorities == {'viaipe.client': 2, 'viaipe.api': 1}
+
+    def test_config_victoriametrics_exporter(self, monkeypatch):
+        """Test direct VictoriaMetrics exporter settings"""
+        monkeypatch.setenv('OTEL_METRICS_EXPORTER', 'VictoriaMetrics')
+        monkeypatch.setenv('VICTORIAMETRICS_URL', 'http://vm:8428')
+        
+        config = Config.from_env()
+        
+        assert config.metrics_exporter == 'victoriametrics'
+        assert config.victoriametrics_url == 'http://vm:8428'
+        assert config.victoriametrics_max_batch_samples == 10000
+
+    def test_config_prometheus_settings(self, monkeypatch):
+        """Test Prometheus scrape endpoint settings"""
+        monkeypatch.delenv('PROMETHEUS_ENABLED', raising=False)
+        assert Config.from_env().prometheus_enabled is False
+        
+        monkeypatch.setenv('PROMETHEUS_ENABLED', 'true')
+        monkeypatch.setenv('OTEL_METRICS_EXPORTER', 'none')
+        
+        config = Config.from_env()
+        
+        assert config.prometheus_enabled is True
+        assert config.metrics_exporter == 'none'
+
+    def test_config_health_settings(self, monkeypatch):
+        """Test readiness ages default to three poll and export intervals"""
+        for key in ['HEALTH_LIVE_MAX_LAG', 'HEALTH_READY_MAX_AGE', 'HEALTH_EXPORT_MAX_AGE',
+                    'OTEL_METRIC_EXPORT_INTERVAL']:
+            monkeypatch.delenv(key, raising=False)
+        monkeypatch.setenv('VIAIPE_POLL_INTERVAL', '60')
+        
+        config = Config.from_env()
+        
+        assert config.health_live_max_lag == 5.0
+        assert config.health_ready_max_age == 180.0
+        assert config.health_export_max_age == 180.0
+        
+        monkeypatch.setenv('OTEL_METRIC_EXPORT_INTERVAL', '10000')
+        monkeypatch.setenv('HEALTH_READY_MAX_AGE', '90')
+        config = Config.from_env()
+        assert config.health_export_max_age == 30.0
+        assert config.health_ready_max_age == 90.0
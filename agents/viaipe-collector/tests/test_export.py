@@ -0,0 +1,281 @@
+"""
+Tests for the OTLP export pipeline
+"""
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from opentelemetry.sdk.metrics import Counter, Histogram, MeterProvider, UpDownCounter
+from opentelemetry.sdk.metrics.export import (
+    AggregationTemporality,
+    InMemoryMetricReader,
+    MetricExporter,
+    MetricExportResult,
+)
+
+from src.metrics.export import (
+    BatchingExporter,
+    QueueingExporter,
+    TrackingExporter,
+    create_otlp_exporter,
+    split_metrics_data,
+)
+
+
+def collect_metrics_data():
+    """Collects 5 gauge points and 2 counter points"""
+    reader = InMemoryMetricReader()
+    provider = MeterProvider(metric_readers=[reader])
+    meter = provider.get_meter("test")
+    gauge = meter.create_gauge("viaipe.client.availability")
+    counter = meter.create_counter("viaipe.api.requests")
+    for i in range(5):
+        gauge.set(99.0, {"client_id": f"c{i}"})
+    counter.add(1, {"status": "success"})
+    counter.add(1, {"status": "error"})
+    
+    data = reader.get_metrics_data()
+    provider.shutdown()
+    return data
+
+
+def point_counts(metrics_data):
+    """Returns (metric name, data point count) for every metric"""
+    return [
+        (metric.name, len(metric.data.data_points))
+        for resource_metrics in metrics_data.resource_metrics
+        for scope_metrics in resource_metrics.scope_metrics
+        for metric in scope_metrics.metrics
+    ]
+
+
+def named_metrics_data(name):
+    """Collects a single counter with the given name"""
+    reader = InMemoryMetricReader()
+    provider = MeterProvider(metric_readers=[reader])
+    provider.get_meter("test").create_counter(name).add(1)
+    data = reader.get_metrics_data()
+    provider.shutdown()
+    return data
+
+
+class BlockingExporter(MetricExporter):
+    """Exporter holding every export until `release` is set"""
+
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.exported = []
+
+    def export(self, metrics_data, timeout_millis=10_000, **kwargs):
+        self.started.set()
+        self.release.wait(5)
+        self.exported.append(metrics_data.resource_metrics[0].scope_metrics[0].metrics[0].name)
+        return MetricExportResult.SUCCESS
+
+    def force_flush(self, timeout_millis=10_000):
+        return True
+
+    def shutdown(self, timeout_millis=30_000, **kwargs):
+        pass
+
+
+class TestCreateOtlpExporter:
+    """Test suite for create_otlp_exporter"""
+
+    def test_grpc_delta_temporality(self):
+        """Test that the delta preference applies to counters and histograms only"""
+        exporter = create_otlp_exporter("localhost:4317", temporality="delta", compression="gzip")
+        
+        assert exporter._preferred_temporality[Counter] == AggregationTemporality.DELTA
+        assert exporter._preferred_temporality[Histogram] == AggregationTemporality.DELTA
+        assert exporter._preferred_temporality[UpDownCounter] == AggregationTemporality.CUMULATIVE
+        exporter.shutdown()
+
+    def test_http_endpoint_path(self):
+        """Test that /v1/metrics is appended to HTTP endpoints without a path"""
+        exporter = create_otlp_exporter("http://otel-collector:4318", protocol="http/protobuf")
+        
+        assert exporter._endpoint == "http://otel-collector:4318/v1/metrics"
+
+    def test_http_batching(self):
+        """Test that a batch size wraps the HTTP exporter"""
+        exporter = create_otlp_exporter(
+            "http://otel-collector:4318/custom", protocol="http/protobuf", max_export_batch_size=100
+        )
+        
+        assert isinstance(exporter, BatchingExporter)
+        assert exporter.exporter._endpoint == "http://otel-collector:4318/custom"
+
+    @pytest.mark.parametrize("kwargs", [
+        {"protocol": "thrift"},
+        {"compression": "zstd"},
+        {"temporality": "sometimes"},
+    ])
+    def test_invalid_settings(self, kwargs):
+        """Test that invalid settings are rejected"""
+        with pytest.raises(ValueError):
+            create_otlp_exporter("localhost:4317", **kwargs)
+
+
+class TestBatching:
+    """Test suite for split_metrics_data and BatchingExporter"""
+
+    def test_split_metrics_data(self):
+        """Test that batches hold at most max_points points and keep metric metadata"""
+        data = collect_metrics_data()
+        
+        batches = list(split_metrics_data(data, 3))
+        
+        assert [point_counts(batch) for batch in batches] == [
+            [("viaipe.client.availability", 3)],
+            [("viaipe.client.availability", 2), ("viaipe.api.requests", 1)],
+            [("viaipe.api.requests", 1)],
+        ]
+
+    def test_split_within_limit(self):
+        """Test that data under the limit is exported as a single batch"""
+        batches = list(split_metrics_data(collect_metrics_data(), 100))
+        
+        assert len(batches) == 1
+        assert point_counts(batches[0]) == [("viaipe.client.availability", 5), ("viaipe.api.requests", 2)]
+
+    def test_batching_exporter_stops_on_failure(self):
+        """Test that a failed batch aborts the remaining batches"""
+        inner = MagicMock()
+        inner._preferred_temporality = {}
+        inner._preferred_aggregation = {}
+        inner.export.side_effect = [MetricExportResult.SUCCESS, MetricExportResult.FAILURE]
+        exporter = BatchingExporter(inner, 2)
+        
+        assert exporter.export(collect_metrics_data()) is MetricExportResult.FAILURE
+        assert inner.export.call_count == 2
+
+    def test_batching_exporter_returns_unsent(self):
+        """Test that only the failed batch and the ones after it come back unsent"""
+        inner = MagicMock()
+        inner._preferred_temporality = {}
+        inner._preferred_aggregation = {}
+        inner.export.side_effect = [MetricExportResult.SUCCESS, MetricExportResult.FAILURE]
+        exporter = BatchingExporter(inner, 2)
+        
+        unsent = exporter.export_unsent(collect_metrics_data())
+        
+        # Batches: 2 + 2 gauge points, 1 gauge + 1 counter point, 1 counter point
+        assert point_counts(unsent) == [
+            ("viaipe.client.availability", 2),
+            ("viaipe.client.availability", 1),
+            ("viaipe.api.requests", 1),
+            ("viaipe.api.requests", 1),
+        ]
+        assert inner.export.call_count == 2
+
+    def test_tracking_exporter_records_successes_only(self):
+        """Test that only exports accepted by the backend update last_success"""
+        inner = MagicMock()
+        inner._preferred_temporality = {}
+        inner._preferred_aggregation = {}
+        inner.export.side_effect = [MetricExportResult.FAILURE, MetricExportResult.SUCCESS]
+        exporter = TrackingExporter(inner)
+        
+        exporter.export(collect_metrics_data())
+        assert exporter.last_success is None
+        
+        exporter.export(collect_metrics_data())
+        assert time.time() - exporter.last_success < 1
+
+
+class TestQueueingExporter:
+    """Test suite for QueueingExporter"""
+
+    @staticmethod
+    def fill(queue, inner, names):
+        """Occupies the export thread, then queues the named exports"""
+        queue.export(named_metrics_data("in.flight"))
+        assert inner.started.wait(5)
+        return [queue.export(named_metrics_data(name)) for name in names]
+
+    def test_export_returns_while_backend_is_stuck(self):
+        """Test that export() only enqueues, even when the exporter hangs"""
+        inner = BlockingExporter()
+        queue = QueueingExporter(inner, max_size=4)
+        
+        start = time.perf_counter()
+        self.fill(queue, inner, ["viaipe.client.availability"])
+        
+        assert time.perf_counter() - start < 1
+        assert len(queue) == 1
+        assert queue.force_flush(timeout_millis=10) is False
+        inner.release.set()
+        assert queue.force_flush() is True
+        queue.shutdown()
+        assert inner.exported == ["in.flight", "viaipe.client.availability"]
+
+    def test_drop_oldest(self):
+        """Test that the oldest queued export is dropped when full"""
+        inner = BlockingExporter()
+        results = []
+        queue = QueueingExporter(inner, max_size=1, on_export=lambda duration, result: results.append(result))
+        
+        self.fill(queue, inner, ["a", "b"])
+        inner.release.set()
+        queue.shutdown()
+        
+        assert inner.exported == ["in.flight", "b"]
+        assert queue.dropped == 1
+        assert results == [MetricExportResult.SUCCESS] * 2
+
+    def test_drop_newest(self):
+        """Test that the incoming export is rejected when full"""
+        inner = BlockingExporter()
+        queue = QueueingExporter(inner, max_size=1, drop_policy="newest")
+        
+        results = self.fill(queue, inner, ["a", "b"])
+        inner.release.set()
+        queue.shutdown()
+        
+        assert results == [MetricExportResult.SUCCESS, MetricExportResult.FAILURE]
+        assert inner.exported == ["in.flight", "a"]
+
+    def test_drop_by_priority(self):
+        """Test that the lowest-priority export is dropped first"""
+        inner = BlockingExporter()
+        queue = QueueingExporter(
+            inner, max_size=1, drop_policy="priority", priorities={"viaipe.client": 2, "viaipe": 1}
+        )
+        
+        results = self.fill(queue, inner, ["viaipe.api.requests", "viaipe.client.availability", "other"])
+        inner.release.set()
+        queue.shutdown()
+        
+        assert results[-1] is MetricExportResult.FAILURE
+        assert inner.exported == ["in.flight", "viaipe.client.availability"]
+
+    def test_drop_by_priority_per_metric(self):
+        """Test that priorities apply per metric, since every collection holds every instrument"""
+        inner = BlockingExporter()
+        queue = QueueingExporter(
+            inner, max_size=2, drop_policy="priority", priorities={"viaipe.client": 2, "viaipe": 1}
+        )
+        
+        split = queue.split_by_priority(collect_metrics_data())
+        assert [(priority, point_counts(data)) for priority, data in split] == [
+            (2, [("viaipe.client.availability", 5)]), (1, [("viaipe.api.requests", 2)])
+        ]
+        
+        self.fill(queue, inner, [])
+        results = [queue.export(collect_metrics_data()) for _ in range(2)]
+        inner.release.set()
+        queue.shutdown()
+        
+        # The second collection evicts the first one's requests and drops its own
+        assert results == [MetricExportResult.SUCCESS, MetricExportResult.FAILURE]
+        assert inner.exported == ["in.flight", "viaipe.client.availability", "viaipe.client.availability"]
+        assert queue.dropped == 2
+
+    def test_invalid_policy(self):
+        """Test that an unknown drop policy is rejected"""
+        with pytest.raises(ValueError):
+            QueueingExporter(MagicMock(), drop_policy="random")
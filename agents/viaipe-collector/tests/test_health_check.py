@@ -1,131 +1,166 @@
 """
 Tests for health check server
 """
-import pytest
-from unittest.mock import MagicMock, patch
+import asyncio
+import time
 
-from src.utils.health_check import HealthCheckHandler, HealthCheckServer
+import httpx
+import pytest
 
+from src.utils.health_check import HealthCheckServer
 
-class TestHealthCheckHandler:
-    """Test suite for HealthCheckHandler"""
 
-    @pytest.fixture
-    def handler(self):
-        """Create a handler instance"""
-        # Mock the request socket to prevent actual network operations
-        mock_request = MagicMock()
-        mock_request.makefile = MagicMock(side_effect=lambda *args, **kwargs: MagicMock())
-        
-        # Create handler without calling __init__ to avoid BaseHTTPRequestHandler initialization
-        handler = HealthCheckHandler.__new__(HealthCheckHandler)
-        handler.request = mock_request
-        handler.client_address = ('127.0.0.1', 12345)
-        handler.server = MagicMock()
-        handler.send_response = MagicMock()
-        handler.send_header = MagicMock()
-        handler.end_headers = MagicMock()
-        handler.wfile = MagicMock()
-        return handler
-
-    def test_do_get_health_endpoint(self, handler):
-        """Test GET request to /health endpoint"""
-        handler.path = '/health'
-        handler.do_GET()
-        
-        handler.send_response.assert_called_once_with(200)
-        handler.send_header.assert_called_once_with('Content-Type', 'application/json')
-        handler.end_headers.assert_called_once()
-        handler.wfile.write.assert_called_once_with(b'{"status": "healthy"}')
-
-    def test_do_get_unknown_endpoint(self, handler):
-        """Test GET request to unknown endpoint"""
-        handler.path = '/unknown'
-        handler.do_GET()
-        
-        handler.send_response.assert_called_once_with(404)
-        handler.end_headers.assert_called_once()
-        handler.wfile.write.assert_not_called()
-
-    def test_do_get_root_endpoint(self, handler):
-        """Test GET request to root endpoint"""
-        handler.path = '/'
-        handler.do_GET()
-        
-        handler.send_response.assert_called_once_with(404)
-        handler.end_headers.assert_called_once()
-
-    def test_log_message_disabled(self, handler):
-        """Test that log_message does nothing (disabled)"""
-        # Should not raise any exception
-        handler.log_message("test format", "arg1", "arg2")
+@pytest.fixture
+async def health_server():
+    """Start a server on an ephemeral port with fast heartbeats"""
+    server = HealthCheckServer(port=0, heartbeat_interval=0.05, live_max_lag=0.2)
+    await server.start()
+    server.url = f"http://127.0.0.1:{server.server.sockets[0].getsockname()[1]}"
+    yield server
+    await server.stop()
 
 
+@pytest.mark.asyncio
 class TestHealthCheckServer:
     """Test suite for HealthCheckServer"""
 
-    def test_server_initialization(self):
-        """Test server initialization"""
-        server = HealthCheckServer(port=8081)
+    async def test_livez_reports_event_loop_lag(self, health_server):
+        """Test /livez answers 200 with the heartbeat lag while the loop is responsive"""
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{health_server.url}/livez")
+        
+        body = response.json()
+        assert response.status_code == 200
+        assert body["status"] == "ok"
+        assert body["checks"]["event_loop"]["ok"] is True
+        assert body["checks"]["event_loop"]["max_lag_seconds"] == 0.2
+
+    async def test_livez_fails_after_loop_stall(self, health_server):
+        """Test /livez fails while the heartbeat is overdue after a blocking call"""
+        time.sleep(0.4)  # Blocks the event loop
+        
+        status = health_server.status()
+        
+        assert status["live"] is False
+        assert status["checks"]["event_loop"]["lag_seconds"] >= 0.2
+
+    async def test_health_is_alias_of_livez(self, health_server):
+        """Test the legacy /health endpoint reports liveness"""
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{health_server.url}/health")
+        
+        assert response.status_code == 200
+        assert response.json()["live"] is True
+
+    async def test_readyz_with_fresh_collection_and_export(self, health_server):
+        """Test /readyz is 200 when every check succeeded recently"""
+        health_server.add_check("collection", lambda: time.time() - 1, 60)
+        health_server.add_check("export", time.time, 60)
+        
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{health_server.url}/readyz")
+        
+        body = response.json()
+        assert response.status_code == 200
+        assert body["ready"] is True
+        assert 1 <= body["checks"]["collection"]["age_seconds"] < 2
+        assert body["checks"]["export"]["ok"] is True
+
+    async def test_readyz_with_stale_export(self, health_server):
+        """Test /readyz is 503 when the last export is too old, while /livez stays 200"""
+        health_server.add_check("collection", time.time, 60)
+        health_server.add_check("export", lambda: time.time() - 120, 60)
+        
+        async with httpx.AsyncClient() as client:
+            ready = await client.get(f"{health_server.url}/readyz")
+            live = await client.get(f"{health_server.url}/livez")
+        
+        assert ready.status_code == 503
+        assert ready.json()["status"] == "unavailable"
+        assert ready.json()["checks"]["export"]["ok"] is False
+        assert live.status_code == 200
+
+    async def test_readyz_grace_period_before_first_success(self, health_server):
+        """Test a check that never succeeded counts its age from the server start"""
+        health_server.add_check("collection", lambda: None, 60)
+        assert health_server.status()["ready"] is True
+        
+        health_server.started -= 120
+        
+        status = health_server.status()
+        assert status["ready"] is False
+        assert status["checks"]["collection"]["last_success"] is None
+
+    async def test_unknown_endpoint(self, health_server):
+        """Test unknown paths (and /metrics without a registry) return 404"""
+        async with httpx.AsyncClient() as client:
+            for path in ("/", "/unknown", "/metrics"):
+                response = await client.get(f"{health_server.url}{path}")
+                assert response.status_code == 404
+
+    async def test_stop_closes_server(self):
+        """Test stop() closes the listener and cancels the heartbeat, and is idempotent"""
+        server = HealthCheckServer(port=0)
+        await server.start()
+        heartbeat = server._heartbeat
+        
+        await server.stop()
+        await asyncio.sleep(0)
         
-        assert server.port == 8081
         assert server.server is None
+        assert heartbeat.cancelled()
+        await server.stop()
+
+    async def test_malformed_request_is_dropped(self, health_server):
+        """Test a malformed request line closes the connection without a response"""
+        port = health_server.server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"garbage\r\n\r\n")
+        await writer.drain()
+        
+        assert await reader.read() == b""
+        writer.close()
 
-    def test_server_initialization_custom_port(self):
-        """Test server initialization with custom port"""
-        server = HealthCheckServer(port=9090)
-        
-        assert server.port == 9090
-
-    def test_start_server(self):
-        """Test starting the server"""
-        server = HealthCheckServer(port=8081)
-        
-        with patch('src.utils.health_check.HTTPServer') as mock_http_server:
-            mock_server_instance = MagicMock()
-            mock_http_server.return_value = mock_server_instance
-            
-            # Run start in a way that we can control
-            with patch.object(mock_server_instance, 'serve_forever', side_effect=KeyboardInterrupt):
-                try:
-                    server.start()
-                except KeyboardInterrupt:
-                    pass
-            
-            # Verify server was created
-            mock_http_server.assert_called_once_with(('0.0.0.0', 8081), HealthCheckHandler)
-            assert server.server == mock_server_instance
-
-    def test_stop_server(self):
-        """Test stopping the server"""
-        server = HealthCheckServer(port=8081)
-        server.server = MagicMock()
-        
-        server.stop()
-        
-        server.server.shutdown.assert_called_once()
-
-    def test_stop_server_when_not_started(self):
-        """Test stopping server when it hasn't been started"""
-        server = HealthCheckServer(port=8081)
-        
-        # Should not raise exception
-        server.stop()
-
-    def test_server_binds_to_all_interfaces(self):
-        """Test that server binds to 0.0.0.0"""
-        server = HealthCheckServer(port=8081)
-        
-        with patch('src.utils.health_check.HTTPServer') as mock_http_server:
-            mock_server_instance = MagicMock()
-            mock_http_server.return_value = mock_server_instance
-            
-            with patch.object(mock_server_instance, 'serve_forever', side_effect=KeyboardInterrupt):
-                try:
-                    server.start()
-                except KeyboardInterrupt:
-                    pass
-            
-            # Verify it binds to all interfaces (0.0.0.0)
-            call_args = mock_http_server.call_args
-            assert call_args[0][0] == ('0.0.0.0', 8081)
+
+@pytest.mark.asyncio
+class TestMetricsEndpoint:
+    """Test suite for the Prometheus /metrics endpoint"""
+
+    @pytest.fixture
+    async def metrics_url(self):
+        """Start a server serving a registry with one counter"""
+        from prometheus_client import CollectorRegistry, Counter
+        
+        registry = CollectorRegistry()
+        Counter('viaipe_api_requests', 'Number of API requests', registry=registry).inc(3)
+        
+        server = HealthCheckServer(port=0, metrics_registry=registry)
+        await server.start()
+        yield f"http://127.0.0.1:{server.server.sockets[0].getsockname()[1]}/metrics"
+        await server.stop()
+
+    async def test_text_format(self, metrics_url):
+        """Test the Prometheus text format is served by default"""
+        async with httpx.AsyncClient() as client:
+            response = await client.get(metrics_url, headers={'Accept-Encoding': 'identity'})
+        
+        assert response.status_code == 200
+        assert response.headers['Content-Type'].startswith('text/plain')
+        assert 'Content-Encoding' not in response.headers
+        assert 'viaipe_api_requests_total 3.0' in response.text
+
+    async def test_openmetrics_format(self, metrics_url):
+        """Test OpenMetrics is served when the scraper asks for it"""
+        async with httpx.AsyncClient() as client:
+            response = await client.get(metrics_url, headers={'Accept': 'application/openmetrics-text; version=1.0.0'})
+        
+        assert response.headers['Content-Type'].startswith('application/openmetrics-text')
+        assert response.text.endswith('# EOF\n')
+
+    async def test_gzip_encoding(self, metrics_url):
+        """Test the body is gzipped when the scraper accepts it"""
+        async with httpx.AsyncClient() as client:
+            response = await client.get(metrics_url, headers={'Accept-Encoding': 'gzip'})
+        
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'viaipe_api_requests_total 3.0' in response.text
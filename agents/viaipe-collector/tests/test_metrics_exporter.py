@@ -14,7 +14,7 @@ class TestMetricsExporter:
     def mock_otel_setup(self):
         """Mock OpenTelemetry setup"""
         with patch('src.metrics.metrics_exporter.Resource'), \
-             patch('src.metrics.metrics_exporter.OTLPMetricExporter'), \
+             patch('src.metrics.metrics_exporter.create_otlp_exporter'), \
              patch('src.metrics.metrics_exporter.PeriodicExportingMetricReader'), \
              patch('src.metrics.metrics_exporter.MeterProvider'), \
              patch('src.metrics.metrics_exporter.metrics') as mock_metrics:
@@ -204,3 +204,18 @@ class TestMetricsExporter:
         # Should have been called twice
         assert exporter.client_availability.set.call_count == 2
         assert exporter.connection_quality.set.call_count == 2
+
+    def test_prometheus_only_pipeline(self, mock_otel_setup):
+        """Test metrics_exporter=none with Prometheus enabled keeps only the pull reader"""
+        with patch('src.metrics.metrics_exporter.MeterProvider') as mock_provider, \
+             patch('opentelemetry.exporter.prometheus.PrometheusMetricReader') as mock_reader:
+            exporter = MetricsExporter(
+                service_name="test-service",
+                otel_endpoint="http://test-otel:4317",
+                metrics_exporter="none",
+                prometheus_enabled=True
+            )
+        
+        assert mock_provider.call_args.kwargs['metric_readers'] == [mock_reader.return_value]
+        assert exporter.export_queue is None
+        assert exporter.wal_exporter is None
@@ -0,0 +1,167 @@
+"""
+Tests for the direct VictoriaMetrics exporter
+"""
+import gzip
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+import pytest
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader, MetricExportResult
+from opentelemetry.sdk.resources import Resource
+
+from src.metrics.victoriametrics import VictoriaMetricsExporter, format_sample, metric_name
+from src.metrics.wal import WALExporter, WriteAheadLog
+
+
+@pytest.fixture
+def import_server():
+    """Local stand-in for VictoriaMetrics recording every import request"""
+    requests = []
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            if self.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            requests.append((self.path, self.client_address[1], body.decode()))
+            self.send_response(server.statuses.pop(0) if server.statuses else server.status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.status = 204
+    server.statuses = []
+    server.requests = requests
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def collect():
+    """Collects metrics shaped like the collector's"""
+    reader = InMemoryMetricReader()
+    provider = MeterProvider(
+        resource=Resource.create({"service.name": "viaipe-collector", "service.namespace": "monitoring"}),
+        metric_readers=[reader]
+    )
+    meter = provider.get_meter("test")
+    availability = meter.create_gauge("viaipe.client.availability", unit="%")
+    for client in ("c1", "c2", "c3"):
+        availability.set(99.5, {"client_id": client})
+    meter.create_counter("viaipe.api.requests", unit="1").add(2, {"status": "success"})
+    data = reader.get_metrics_data()
+    provider.shutdown()
+    return data
+
+
+class TestNaming:
+    """Test suite for Prometheus name conversion"""
+
+    def test_names_match_dashboards(self):
+        """Test that names match the collector's prometheusremotewrite output"""
+        assert metric_name("viaipe.client.availability", "%", gauge=True) == "viaipe_client_availability_percent"
+        assert metric_name("viaipe.bandwidth.peak.out", "bps", gauge=True) == "viaipe_bandwidth_peak_out_bps"
+        assert metric_name("viaipe.connection.quality", "score", gauge=True) == "viaipe_connection_quality_score"
+        assert metric_name("viaipe.api.errors", "1", monotonic_sum=True) == "viaipe_api_errors_total"
+        assert metric_name("viaipe.clients.total", "1", gauge=True) == "viaipe_clients_total_ratio"
+
+    def test_format_sample_escapes_labels(self):
+        """Test label value escaping and timestamp formatting"""
+        line = format_sample(("up", {"client_name": 'Uni "A"\\B'}, 1.0, 1700000000000))
+        
+        assert line == 'up{client_name="Uni \\"A\\"\\\\B"} 1.0 1700000000000'
+
+
+class TestVictoriaMetricsExporter:
+    """Test suite for VictoriaMetricsExporter"""
+
+    def test_export_gzip_import(self, import_server):
+        """Test that samples reach the import API gzip-compressed with job labels"""
+        exporter = VictoriaMetricsExporter(import_server.url, compression="gzip")
+        
+        assert exporter.export(collect()) is MetricExportResult.SUCCESS
+        exporter.shutdown()
+        
+        (path, _, body), = import_server.requests
+        samples = [line.rsplit(" ", 1)[0] for line in body.splitlines()]
+        assert path == "/api/v1/import/prometheus"
+        assert 'viaipe_client_availability_percent{job="monitoring/viaipe-collector",client_id="c2"} 99.5' in samples
+        assert 'viaipe_api_requests_total{job="monitoring/viaipe-collector",status="success"} 2' in samples
+
+    def test_batching_over_one_connection(self, import_server):
+        """Test that large exports are split and sent over a reused connection"""
+        exporter = VictoriaMetricsExporter(import_server.url, compression="none", max_batch_samples=2)
+        
+        exporter.export(collect())
+        exporter.export(collect())
+        exporter.shutdown()
+        
+        assert [len(body.splitlines()) for _, _, body in import_server.requests] == [2, 2, 2, 2]
+        assert len({port for _, port, _ in import_server.requests}) == 1
+
+    def test_requests_share_one_deadline(self):
+        """Test that the requests of one export share its timeout instead of each getting all of it"""
+        timeouts = []
+        
+        def post(url, content, headers, timeout):
+            timeouts.append(timeout)
+            time.sleep(0.06)
+            return MagicMock(status_code=204)
+        
+        client = MagicMock()
+        client.post.side_effect = post
+        exporter = VictoriaMetricsExporter("http://vm:8428", max_batch_samples=1, client=client)
+        
+        # 4 single-sample batches: the third one starts past the deadline
+        unsent = exporter.export_unsent(collect(), timeout_millis=100)
+        
+        assert len(timeouts) == 2
+        assert 0 < timeouts[1] < 0.05
+        assert sum(
+            len(metric.data.data_points)
+            for resource_metrics in unsent.resource_metrics
+            for scope_metrics in resource_metrics.scope_metrics
+            for metric in scope_metrics.metrics
+        ) == 2
+
+    def test_failed_batch_returns_only_unsent_points(self, import_server, tmp_path):
+        """Test that a failure on the second batch leaves only that batch for the WAL to replay"""
+        exporter = WALExporter(
+            VictoriaMetricsExporter(import_server.url, compression="none", max_batch_samples=2),
+            WriteAheadLog(str(tmp_path)), replay_rate=0, retry_interval=3600
+        )
+        import_server.statuses = [204, 500]
+        
+        assert exporter.export(collect()) is MetricExportResult.SUCCESS
+        assert len(exporter.wal) == 1
+        assert exporter.replay() is True
+        exporter.shutdown()
+        
+        bodies = [body for _, _, body in import_server.requests]
+        assert len(bodies) == 3
+        assert 'client_id="c1"' in bodies[0] and 'client_id="c2"' in bodies[0]
+        assert bodies[2] == bodies[1]
+        assert 'client_id="c3"' in bodies[2] and "viaipe_api_requests_total" in bodies[2]
+
+    def test_rejected_import_fails(self, import_server):
+        """Test that an error response fails the export"""
+        import_server.status = 400
+        exporter = VictoriaMetricsExporter(import_server.url)
+        
+        assert exporter.export(collect()) is MetricExportResult.FAILURE
+        exporter.shutdown()
+
+    def test_invalid_compression(self):
+        """Test that an unknown compression is rejected"""
+        with pytest.raises(ValueError):
+            VictoriaMetricsExporter("http://localhost:8428", compression="snappy")
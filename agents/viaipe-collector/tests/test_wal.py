@@ -0,0 +1,154 @@
+"""
+Tests for the export write-ahead log
+"""
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader, MetricExporter, MetricExportResult
+from opentelemetry.sdk.resources import Resource
+
+from src.metrics.attributes import AttributeSet
+from src.metrics.wal import WALExporter, WriteAheadLog, dump_metrics_data
+
+
+class FlakyExporter(MetricExporter):
+    """Exporter failing while `down` is set"""
+
+    def __init__(self):
+        super().__init__()
+        self.down = False
+        self.exported = []
+
+    def export(self, metrics_data, timeout_millis=10_000, **kwargs):
+        if self.down:
+            return MetricExportResult.FAILURE
+        self.exported.append(metrics_data)
+        return MetricExportResult.SUCCESS
+
+    def force_flush(self, timeout_millis=10_000):
+        return True
+
+    def shutdown(self, timeout_millis=30_000, **kwargs):
+        pass
+
+
+def collect(value):
+    """Collects one gauge point with the given value"""
+    reader = InMemoryMetricReader()
+    provider = MeterProvider(resource=Resource.create({"service.name": "test"}), metric_readers=[reader])
+    gauge = provider.get_meter("test").create_gauge("viaipe.client.availability")
+    gauge.set(value, AttributeSet(client_id="c1", client_name="Client 1"))
+    data = reader.get_metrics_data()
+    provider.shutdown()
+    return data
+
+
+def point_value(metrics_data):
+    """Returns the value of the first data point"""
+    return metrics_data.resource_metrics[0].scope_metrics[0].metrics[0].data.data_points[0].value
+
+
+class TestWriteAheadLog:
+    """Test suite for WriteAheadLog"""
+
+    def test_round_trip_across_segments(self, tmp_path):
+        """Test that records come back in order and consumed segments are deleted"""
+        wal = WriteAheadLog(str(tmp_path), segment_bytes=1)
+        for value in (10.0, 20.0, 30.0):
+            wal.append(dump_metrics_data(collect(value)))
+        
+        values = []
+        while (data := wal.peek()) is not None:
+            values.append(point_value(data))
+            wal.commit()
+        
+        assert values == [10.0, 20.0, 30.0]
+        assert data is None
+        assert len(list(tmp_path.glob("*.wal"))) == 1
+
+    def test_resource_survives_serialization(self, tmp_path):
+        """Test that resource attributes and interned attributes are restored"""
+        wal = WriteAheadLog(str(tmp_path))
+        wal.append(dump_metrics_data(collect(1.0)))
+        
+        data = wal.peek()
+        
+        assert data.resource_metrics[0].resource.attributes["service.name"] == "test"
+        point = data.resource_metrics[0].scope_metrics[0].metrics[0].data.data_points[0]
+        assert point.attributes == {"client_id": "c1", "client_name": "Client 1"}
+
+    def test_reopen_resumes_after_cursor(self, tmp_path):
+        """Test that a reopened log skips replayed records and torn tails"""
+        wal = WriteAheadLog(str(tmp_path), fsync="always")
+        for value in (1.0, 2.0):
+            wal.append(dump_metrics_data(collect(value)))
+        wal.peek()
+        wal.commit()
+        wal.close()
+        with open(next(tmp_path.glob("*.wal")), "ab") as segment:
+            segment.write(b"\x00\x00")
+        
+        reopened = WriteAheadLog(str(tmp_path))
+        
+        assert len(reopened) == 1
+        assert point_value(reopened.peek()) == 2.0
+
+    def test_corrupt_record_is_dropped(self, tmp_path):
+        """Test that a record failing its checksum is skipped"""
+        wal = WriteAheadLog(str(tmp_path))
+        for value in (1.0, 2.0):
+            wal.append(dump_metrics_data(collect(value)))
+        wal.close()
+        path = next(tmp_path.glob("*.wal"))
+        contents = bytearray(path.read_bytes())
+        contents[20] ^= 0xFF
+        path.write_bytes(bytes(contents))
+        
+        assert point_value(wal.peek()) == 2.0
+        assert wal.dropped == 1
+
+    def test_size_limit_drops_oldest(self, tmp_path):
+        """Test that the backlog stays under max_bytes"""
+        payload = dump_metrics_data(collect(1.0))
+        wal = WriteAheadLog(str(tmp_path), max_bytes=len(payload) * 3)
+        for _ in range(5):
+            wal.append(payload)
+        
+        assert len(wal) == 2
+        assert wal.dropped == 3
+
+
+class TestWALExporter:
+    """Test suite for WALExporter"""
+
+    def test_buffers_while_down_and_replays_in_order(self, tmp_path):
+        """Test that failed exports are persisted and replayed before new data"""
+        inner = FlakyExporter()
+        exporter = WALExporter(inner, WriteAheadLog(str(tmp_path)), replay_rate=0, retry_interval=3600)
+        inner.down = True
+        
+        assert exporter.export(collect(1.0)) is MetricExportResult.SUCCESS
+        assert exporter.replay() is False
+        inner.down = False
+        exporter.export(collect(2.0))
+        
+        assert inner.exported == []
+        assert exporter.replay() is True
+        exporter.export(collect(3.0))
+        exporter.shutdown()
+        
+        assert [point_value(data) for data in inner.exported] == [1.0, 2.0, 3.0]
+
+    def test_backlog_replayed_after_restart(self, tmp_path):
+        """Test that a new exporter replays the backlog left by a previous process"""
+        inner = FlakyExporter()
+        inner.down = True
+        first = WALExporter(inner, WriteAheadLog(str(tmp_path)), retry_interval=3600)
+        first.export(collect(1.0))
+        first.shutdown()
+        
+        inner.down = False
+        second = WALExporter(inner, WriteAheadLog(str(tmp_path)), replay_rate=0, retry_interval=3600)
+        assert second.force_flush() is True
+        second.shutdown()
+        
+        assert [point_value(data) for data in inner.exported] == [1.0]
+        assert second.replayed == 1